@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Decoder threading benchmark for Unity Render Streaming Python client
+
+Encodes a synthetic moving scene at several resolutions (single slice per
+frame, no B-frames, like Unity's WebRTC encoders) and decodes it with
+aiortc's own decoders under each DecoderConfig. Reports decode throughput,
+whether it keeps up with the stream's frame rate, and the frames of delay
+frame threading adds:
+
+    python benchmarks/decoder_threads.py
+    python benchmarks/decoder_threads.py --resolutions 1920x1080 3840x2160 --threads 1 2 4 8
+    python benchmarks/decoder_threads.py --slices 4     # multi-slice stream, where slice threading helps
+"""
+
+import argparse
+import os
+import sys
+import time
+from fractions import Fraction
+from typing import Dict, List
+
+CLIENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CLIENT_DIR)
+
+import av  # noqa: E402
+import numpy as np  # noqa: E402
+from aiortc.codecs.h264 import H264Decoder  # noqa: E402
+from aiortc.codecs.vpx import Vp8Decoder  # noqa: E402
+from aiortc.jitterbuffer import JitterFrame  # noqa: E402
+
+from src.decoder_config import THREAD_TYPES, DecoderConfig  # noqa: E402
+from src.stream_constraints import StreamConstraints  # noqa: E402
+
+ENCODERS = {"h264": "libx264", "vp8": "libvpx"}
+DECODERS = {"h264": H264Decoder, "vp8": Vp8Decoder}
+
+
+def encode_stream(codec: str, width: int, height: int, frames: int, fps: int, slices: int,
+                  preset: str) -> List[bytes]:
+    """Encode a moving gradient with noise; returns one payload per frame"""
+    encoder = av.CodecContext.create(ENCODERS[codec], "w")
+    encoder.width, encoder.height = width, height
+    encoder.pix_fmt = "yuv420p"
+    encoder.time_base = Fraction(1, fps)
+    encoder.framerate = fps
+    encoder.bit_rate = width * height * 4
+    if codec == "h264":
+        # threads=1 keeps x264 from splitting frames into slices on its own
+        encoder.options = {"preset": preset, "tune": "zerolatency", "threads": "1",
+                           "slices": str(slices)}
+    else:
+        encoder.options = {"deadline": "realtime", "cpu-used": "8", "lag-in-frames": "0"}
+
+    rng = np.random.default_rng(1)
+    noise = rng.integers(0, 32, (height, width, 3), dtype=np.uint8)
+    ramp = np.linspace(0, 255, width, dtype=np.float32)
+    payloads: List[bytes] = []
+
+    def collect(packets):
+        payloads.extend(bytes(packet) for packet in packets)
+
+    for index in range(frames):
+        row = ((ramp + index * 8) % 256).astype(np.uint8)
+        image = np.empty((height, width, 3), np.uint8)
+        image[:] = row[None, :, None]
+        image += np.roll(noise, index * 4, axis=1)
+        frame = av.VideoFrame.from_ndarray(image, format="bgr24")
+        frame.pts = index
+        collect(encoder.encode(frame))
+    collect(encoder.encode(None))
+    return payloads
+
+
+def decode_stream(codec: str, payloads: List[bytes], config: DecoderConfig) -> Dict[str, float]:
+    """Decode payloads with aiortc's decoder configured by config"""
+    decoder = DECODERS[codec]()
+    config.apply(decoder)
+    decoded = 0
+    delay = None
+    start = time.perf_counter()
+    for index, payload in enumerate(payloads):
+        frames = decoder.decode(JitterFrame(data=payload, timestamp=index * 3000))
+        if frames and delay is None:
+            delay = index
+        decoded += len(frames)
+    decoded += len(decoder.codec.decode(None))
+    elapsed = time.perf_counter() - start
+    return {
+        "decoded": decoded,
+        "fps": decoded / elapsed if elapsed else 0.0,
+        "ms_per_frame": elapsed * 1000 / max(decoded, 1),
+        "delay_frames": delay or 0,
+    }
+
+
+def resolution(value: str):
+    """argparse type for WIDTHxHEIGHT"""
+    try:
+        width, height = StreamConstraints.parse_resolution(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {value!r}")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"expected a positive WIDTHxHEIGHT, got {value!r}")
+    return width, height
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare video decoder threading settings")
+    parser.add_argument("--codec", default="h264", choices=list(ENCODERS))
+    parser.add_argument("--resolutions", nargs="+", type=resolution, metavar="WxH",
+                        default=[(1280, 720), (1920, 1080), (3840, 2160)],
+                        help="Resolutions to test (default: 1280x720 1920x1080 3840x2160)")
+    parser.add_argument("--frames", type=int, default=60, help="Frames per stream (default: 60)")
+    parser.add_argument("--fps", type=int, default=30, help="Stream frame rate to keep up with (default: 30)")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 0],
+                        help="Decoder thread counts, 0 = one per core (default: 1 2 4 0)")
+    parser.add_argument("--thread-types", nargs="+", default=["slice", "frame"], choices=THREAD_TYPES,
+                        help="Thread types to test (default: slice frame)")
+    parser.add_argument("--slices", type=int, default=1, help="H.264 slices per frame (default: 1)")
+    parser.add_argument("--preset", default="superfast",
+                        help="x264 preset; superfast keeps CABAC and deblocking like hardware "
+                             "encoders, ultrafast streams are cheaper to decode (default: superfast)")
+    args = parser.parse_args()
+
+    print(f"{args.codec.upper()}, {args.frames} frames, {args.slices} slice(s)/frame, "
+          f"{os.cpu_count()} CPU core(s), real time = {args.fps} fps")
+    print(f"{'resolution':>10} {'threads':>8} {'type':6} {'fps':>8} {'ms/frame':>9} {'delay':>6} {'real time':>10}")
+    for width, height in args.resolutions:
+        size = f"{width}x{height}"
+        payloads = encode_stream(args.codec, width, height, args.frames, args.fps, args.slices, args.preset)
+        tested = set()
+        for thread_type in args.thread_types:
+            for threads in args.threads:
+                config = DecoderConfig(threads, thread_type)
+                # A single thread is the same decoder whatever the type
+                key = (config.effective_threads, thread_type if config.effective_threads > 1 else "")
+                if key in tested:
+                    continue
+                tested.add(key)
+                result = decode_stream(args.codec, payloads, config)
+                label = f"{threads or 'auto'}" + (f" ({config.effective_threads})" if not threads else "")
+                print(f"{size:>10} {label:>8} {thread_type:6} {result['fps']:8.1f} "
+                      f"{result['ms_per_frame']:9.2f} {result['delay_frames']:6d} "
+                      f"{result['fps'] / args.fps:9.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for Unity Render Streaming Python client
+
+Each scenario runs in a fresh interpreter, is timed over several runs and
+is checked against the heavy modules it must not load. Exits non-zero on a
+regression, so it can guard CI:
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 20 --budget-scale 2.0
+    python benchmarks/import_time.py --importtime "import unity_client"
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import List, Tuple
+
+CLIENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["cv2", "PIL", "aiortc", "av", "websockets", "soundfile"]
+
+
+@dataclass
+class Scenario:
+    """Code to time in a fresh interpreter and the modules it must not load"""
+    name: str
+    code: str
+    forbidden: List[str]
+    budget_ms: float
+
+
+# Budgets are generous multiples of a typical run; the forbidden module
+# lists are the precise guard and do not depend on the machine.
+SCENARIOS = [
+    Scenario("import src", "import src", HEAVY_MODULES + ["numpy"], 50),
+    Scenario("import unity_client", "import unity_client", HEAVY_MODULES, 400),
+    Scenario("unity_client --help",
+             "import sys, unity_client; sys.argv = ['unity_client.py', '--help']\n"
+             "import asyncio\n"
+             "try:\n"
+             "    asyncio.run(unity_client.main())\n"
+             "except SystemExit:\n"
+             "    pass",
+             HEAVY_MODULES, 450),
+    Scenario("src.sdp_utils", "from src.sdp_utils import prefer_codec", HEAVY_MODULES + ["numpy"], 100),
+    Scenario("src.input_remoting", "from src.input_remoting import InputRemotingSender",
+             HEAVY_MODULES + ["numpy"], 200),
+    Scenario("src.frame_archive (reader)", "from src.frame_archive import FrameArchive",
+             HEAVY_MODULES, 400),
+    Scenario("src.client (headless)", "from src.client import UnityRenderStreamingClient",
+             ["cv2", "PIL"], 1500),
+]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def run_scenario(scenario: Scenario) -> Tuple[float, List[str]]:
+    """Run a scenario once; returns (seconds, loaded forbidden modules)"""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(code=scenario.code)],
+        cwd=CLIENT_DIR, capture_output=True, text=True, check=True)
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    loaded = set(report["modules"])
+    return report["elapsed"], [name for name in scenario.forbidden if name in loaded]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure client import and startup time")
+    parser.add_argument("--runs", type=int, default=7,
+                        help="Runs per scenario; the median is reported (default: 7)")
+    parser.add_argument("--budget-scale", type=float, default=1.0,
+                        help="Multiply every time budget, e.g. for slow CI machines")
+    parser.add_argument("--importtime", metavar="CODE", default=None,
+                        help="Print the 15 slowest imports of CODE (python -X importtime) and exit")
+    args = parser.parse_args()
+
+    if args.importtime:
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", args.importtime],
+                                cwd=CLIENT_DIR, capture_output=True, text=True)
+        rows = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|", 2)
+            rows.append((int(cumulative), name.strip()))
+        for cumulative, name in sorted(rows, reverse=True)[:15]:
+            print(f"{cumulative / 1000:9.1f} ms  {name}")
+        return 0
+
+    failures = 0
+    print(f"{'scenario':32} {'median':>9} {'min':>9} {'budget':>9}  status")
+    for scenario in SCENARIOS:
+        times = []
+        loaded: List[str] = []
+        for _ in range(args.runs):
+            elapsed, loaded = run_scenario(scenario)
+            times.append(elapsed * 1000)
+        median = statistics.median(times)
+        budget = scenario.budget_ms * args.budget_scale
+
+        problems = []
+        if loaded:
+            problems.append(f"loaded {', '.join(loaded)}")
+        if median > budget:
+            problems.append("over budget")
+        failures += bool(problems)
+        print(f"{scenario.name:32} {median:7.1f}ms {min(times):7.1f}ms {budget:7.0f}ms  "
+              f"{'FAIL: ' + '; '.join(problems) if problems else 'ok'}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
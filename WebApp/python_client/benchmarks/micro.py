@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for Unity Render Streaming Python client
+
+Times the hot and startup-critical functions (SDP rewriting, ICE candidate
+parsing, signaling message dispatch, frame conversion and the display
+overlay) on synthetic SDPs, candidates and frames, without a network or a
+window. Results are compared with micro_baseline.json and the run fails if
+a function got slower than its threshold allows, so it can guard CI:
+
+    python benchmarks/micro.py
+    python benchmarks/micro.py --filter sdp ice
+    python benchmarks/micro.py --update          # store new baselines after an intended change
+
+Each time is taken relative to a pure-Python calibration loop timed in
+alternation with it, so a baseline recorded on one machine stays usable on
+a faster or slower one and on machines whose speed drifts during the run.
+Frame conversions depend on memory bandwidth more than the calibration
+does and get wider thresholds; --threshold-scale widens all of them.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+
+CLIENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CLIENT_DIR)
+
+import av  # noqa: E402
+import numpy as np  # noqa: E402
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "micro_baseline.json")
+
+
+@dataclass
+class Benchmark:
+    """A function to time, built by setup(); calls is how many operations one call performs"""
+    name: str
+    setup: Callable[[], Tuple[Callable[[], object], int]]
+    threshold: float = 0.3
+
+
+# Synthetic inputs shaped like what Unity and browsers send
+
+def synthetic_offer(h264_variants: int = 6) -> str:
+    """Offer with audio, a video section listing VP8, VP9, several H.264 profiles and RTX, and a data channel"""
+    video = []
+    payload_type = 96
+
+    def add(rtpmap: str, fmtp: str = ""):
+        nonlocal payload_type
+        primary = payload_type
+        video.append((primary, f"a=rtpmap:{primary} {rtpmap}/90000", fmtp))
+        video.append((primary + 1, f"a=rtpmap:{primary + 1} rtx/90000", f"apt={primary}"))
+        payload_type += 2
+
+    add("VP8")
+    add("VP9", "profile-id=0")
+    profiles = ["42001f", "42e01f", "4d001f", "64001f", "640c1f", "f4001f"]
+    for index in range(h264_variants):
+        mode = index % 2
+        add("H264", f"level-asymmetry-allowed=1;packetization-mode={mode};"
+                    f"profile-level-id={profiles[index % len(profiles)]}")
+    add("AV1")
+
+    lines = [
+        "v=0", "o=- 4611731400430051336 2 IN IP4 127.0.0.1", "s=-", "t=0 0",
+        "a=group:BUNDLE 0 1 2", "a=extmap-allow-mixed", "a=msid-semantic: WMS",
+        "m=audio 9 UDP/TLS/RTP/SAVPF 111 63 9 0 8", "c=IN IP4 0.0.0.0", "a=mid:0",
+        "a=ice-ufrag:abcd", "a=ice-pwd:abcdefghijklmnopqrstuvwx", "a=ice-options:trickle",
+        "a=fingerprint:sha-256 " + ":".join(["AB"] * 32), "a=setup:actpass",
+        "a=sendrecv", "a=rtcp-mux",
+        "a=rtpmap:111 opus/48000/2", "a=fmtp:111 minptime=10;useinbandfec=1",
+        "a=rtpmap:63 red/48000/2", "a=fmtp:63 111/111",
+        "a=rtpmap:9 G722/8000", "a=rtpmap:0 PCMU/8000", "a=rtpmap:8 PCMA/8000",
+        "m=video 9 UDP/TLS/RTP/SAVPF " + " ".join(str(pt) for pt, _, _ in video),
+        "c=IN IP4 0.0.0.0", "a=mid:1", "a=ice-ufrag:abcd", "a=ice-pwd:abcdefghijklmnopqrstuvwx",
+        "a=setup:actpass", "a=sendonly", "a=rtcp-mux", "a=rtcp-rsize",
+        "a=extmap:2 http://www.webrtc.org/experiments/rtp-hdrext/abs-send-time",
+    ]
+    for pt, rtpmap, fmtp in video:
+        lines.append(rtpmap)
+        if "rtx" not in rtpmap:
+            lines += [f"a=rtcp-fb:{pt} goog-remb", f"a=rtcp-fb:{pt} transport-cc",
+                      f"a=rtcp-fb:{pt} ccm fir", f"a=rtcp-fb:{pt} nack", f"a=rtcp-fb:{pt} nack pli"]
+        if fmtp:
+            lines.append(f"a=fmtp:{pt} {fmtp}")
+    lines += [
+        "a=ssrc-group:FID 1111 2222", "a=ssrc:1111 cname:unity", "a=ssrc:2222 cname:unity",
+        "m=application 9 UDP/DTLS/SCTP webrtc-datachannel", "c=IN IP4 0.0.0.0", "a=mid:2",
+        "a=sctp-port:5000", "a=max-message-size:262144",
+    ]
+    return "\r\n".join(lines) + "\r\n"
+
+
+CANDIDATES = [
+    "candidate:842163049 1 udp 1677729535 203.0.113.7 51234 typ srflx raddr 192.168.1.20 rport 51234 "
+    "generation 0 ufrag abcd network-cost 999",
+    "candidate:3442447574 1 udp 2122260223 192.168.1.20 51234 typ host generation 0 ufrag abcd",
+    "candidate:1051897822 1 tcp 1518280447 192.168.1.20 9 typ host tcptype active generation 0",
+]
+
+
+def synthetic_frame(width: int, height: int) -> av.VideoFrame:
+    """A decoded-looking yuv420p frame with a gradient and noise"""
+    rng = np.random.default_rng(1)
+    image = np.empty((height, width, 3), np.uint8)
+    image[:] = np.linspace(0, 255, width, dtype=np.uint8)[None, :, None]
+    image += rng.integers(0, 32, image.shape, dtype=np.uint8)
+    return av.VideoFrame.from_ndarray(image, format="bgr24").reformat(format="yuv420p")
+
+
+def synthetic_image(width: int, height: int) -> np.ndarray:
+    return synthetic_frame(width, height).to_ndarray(format="bgr24")
+
+
+# Benchmarks
+
+def bench_prefer_codec(codec: str, profile=None):
+    from src.sdp_utils import prefer_codec
+    sdp = synthetic_offer()
+    return lambda: prefer_codec(sdp, codec, profile), 1
+
+
+def bench_negotiated_codec():
+    from src.sdp_utils import negotiated_codec, prefer_codec
+    sdp = prefer_codec(synthetic_offer(), "h264")
+    return lambda: negotiated_codec(sdp), 1
+
+
+def bench_sdp_constraints():
+    from src.stream_constraints import StreamConstraints, apply_sdp_constraints
+    sdp = synthetic_offer()
+    constraints = StreamConstraints(1500, 15, 1280, 720)
+    return lambda: apply_sdp_constraints(sdp, constraints), 1
+
+
+def bench_ice_string():
+    from src.webrtc_peer import parse_ice_candidate
+    messages = [{"candidate": candidate, "sdpMid": 1, "sdpMLineIndex": "1"} for candidate in CANDIDATES]
+
+    def run():
+        for message in messages:
+            parse_ice_candidate(message)
+    return run, len(messages)
+
+
+def bench_ice_fields():
+    from src.webrtc_peer import parse_ice_candidate
+    message = {"candidate": {}, "foundation": "842163049", "component": 1, "protocol": "udp",
+               "priority": 1677729535, "ip": "203.0.113.7", "port": 51234, "type": "srflx",
+               "sdpMid": "1", "sdpMLineIndex": 1}
+    return lambda: parse_ice_candidate(message), 1
+
+
+def bench_process_message(message_type: str):
+    from src.signaling import WebSocketSignaling
+    signaling = WebSocketSignaling("ws://localhost/")
+    signaling.on_offer = signaling.on_answer = signaling.on_candidate = lambda data: None
+    data = {"from": "3f2b", "data": {"connectionId": "3f2b"}}
+    if message_type == "candidate":
+        data["type"] = "candidate"
+        data["data"].update(candidate=CANDIDATES[0], sdpMid="1", sdpMLineIndex=1)
+    else:
+        data["type"] = message_type
+        data["data"].update(sdp=synthetic_offer(), polite=False)
+    batch = 100
+    loop = asyncio.new_event_loop()
+
+    async def dispatch():
+        for _ in range(batch):
+            await signaling._process_message(data)
+    return lambda: loop.run_until_complete(dispatch()), batch
+
+
+def bench_to_bgr(width: int, height: int):
+    from src.pipeline import FramePipeline
+    pipeline = FramePipeline()
+    frame = synthetic_frame(width, height)
+    return lambda: pipeline._to_bgr(frame), 1
+
+
+def bench_convert(frame_format: str):
+    from src.sinks import convert_frame
+    image = synthetic_image(1280, 720)
+    return lambda: convert_frame(image, frame_format), 1
+
+
+def bench_overlay():
+    from unity_client import EnhancedVideoReceiver
+    receiver = EnhancedVideoReceiver(display=False)
+    # Longest overlay text, without creating the screenshot directory
+    receiver.enable_screenshots = True
+    image = synthetic_image(1280, 720)
+    return lambda: receiver._draw_overlay(image, 1234), 1
+
+
+BENCHMARKS: List[Benchmark] = [
+    Benchmark("sdp.prefer_codec h264", lambda: bench_prefer_codec("h264")),
+    Benchmark("sdp.prefer_codec h264 profile", lambda: bench_prefer_codec("h264", "constrained-baseline")),
+    Benchmark("sdp.prefer_codec vp8", lambda: bench_prefer_codec("vp8")),
+    Benchmark("sdp.negotiated_codec", bench_negotiated_codec),
+    Benchmark("sdp.apply_constraints", bench_sdp_constraints),
+    Benchmark("ice.parse candidate string", bench_ice_string),
+    Benchmark("ice.parse candidate fields", bench_ice_fields),
+    Benchmark("signaling.offer", lambda: bench_process_message("offer")),
+    Benchmark("signaling.candidate", lambda: bench_process_message("candidate")),
+    Benchmark("frame.to_bgr 720p", lambda: bench_to_bgr(1280, 720), 0.75),
+    Benchmark("frame.to_bgr 1080p", lambda: bench_to_bgr(1920, 1080), 0.75),
+    Benchmark("frame.convert rgb24 720p", lambda: bench_convert("rgb24"), 0.75),
+    Benchmark("frame.convert gray 720p", lambda: bench_convert("gray"), 0.75),
+    Benchmark("frame.convert jpeg 720p", lambda: bench_convert("jpeg"), 0.75),
+    Benchmark("display.overlay 720p", bench_overlay, 0.75),
+]
+
+
+def calibration():
+    """Fixed pure-Python workload the results are normalized by"""
+    table = {}
+    for index in range(2000):
+        key = f"k{index % 97}"
+        table[key] = table.get(key, 0) + index * index
+    return sorted(table.values())
+
+
+def _timer(function: Callable[[], object]) -> Tuple[timeit.Timer, int]:
+    """Timer and the number of calls that take about 20 ms"""
+    timer = timeit.Timer(function)
+    number, elapsed = timer.autorange()
+    return timer, max(1, round(number * 0.02 / elapsed))
+
+
+def measure(function: Callable[[], object], calls: int, repeat: int) -> Tuple[float, float, float]:
+    """
+    Time a function in repeats alternating with the calibration workload
+
+    Each repeat is paired with a calibration repeat run right before it, so
+    a machine slowing down for a while (shared CI runners, frequency
+    scaling) slows both and their ratio stays put.
+
+    Returns:
+        (best microseconds per operation, best calibration microseconds,
+        median time relative to the calibration)
+    """
+    timer, number = _timer(function)
+    calibration_timer, calibration_number = _timer(calibration)
+    times, units, ratios = [], [], []
+    for _ in range(repeat):
+        unit = calibration_timer.timeit(calibration_number) / calibration_number
+        elapsed = timer.timeit(number) / number / calls
+        times.append(elapsed)
+        units.append(unit)
+        ratios.append(elapsed / unit)
+    return min(times) * 1e6, min(units) * 1e6, statistics.median(ratios)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time hot client functions against stored baselines")
+    parser.add_argument("--filter", nargs="+", default=None, metavar="TEXT",
+                        help="Only run benchmarks whose name contains one of TEXT")
+    parser.add_argument("--repeat", type=int, default=25, help="Timing repeats, the best is kept (default: 25)")
+    parser.add_argument("--update", action="store_true", help="Store the results as the new baselines")
+    parser.add_argument("--threshold-scale", type=float, default=1.0,
+                        help="Multiply every regression threshold, e.g. for noisy CI machines")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline file (default: micro_baseline.json)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    baselines: Dict[str, Dict] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baselines = json.load(baseline_file).get("benchmarks", {})
+
+    benchmarks = [benchmark for benchmark in BENCHMARKS
+                  if not args.filter or any(text in benchmark.name for text in args.filter)]
+    if not benchmarks:
+        parser.error(f"no benchmark matches --filter {' '.join(args.filter)}")
+    results: Dict[str, Dict[str, float]] = {}
+    failures = 0
+    units: List[float] = []
+    if not args.json:
+        print(f"{platform.python_implementation()} {platform.python_version()}, {os.cpu_count()} CPU(s)")
+        print(f"{'benchmark':32} {'us/op':>10} {'relative':>9} {'baseline':>9} {'change':>8}  status")
+    for benchmark in benchmarks:
+        function, calls = benchmark.setup()
+        micros, unit, relative = measure(function, calls, args.repeat)
+        units.append(unit)
+        results[benchmark.name] = {"us": micros, "relative": relative}
+
+        baseline = baselines.get(benchmark.name)
+        threshold = benchmark.threshold * args.threshold_scale
+        if baseline is None:
+            change, status = "", "new"
+        else:
+            ratio = relative / baseline["relative"]
+            change = f"{(ratio - 1) * 100:+.0f}%"
+            status = "ok" if ratio <= 1 + threshold else f"FAIL: over +{threshold * 100:.0f}%"
+            failures += ratio > 1 + threshold
+        if not args.json:
+            print(f"{benchmark.name:32} {micros:10.2f} {relative:9.4f} "
+                  f"{baseline['relative'] if baseline else float('nan'):9.4f} {change:>8}  {status}")
+
+    if args.json:
+        print(json.dumps({"calibration_us": min(units), "benchmarks": results}, indent=2))
+    if args.update:
+        stored = {"benchmarks": baselines}
+        stored["benchmarks"].update(results)
+        stored["calibration_us"] = min(units)
+        stored["machine"] = {"python": platform.python_version(), "platform": platform.platform(),
+                             "cpus": os.cpu_count()}
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(stored, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+        print(f"Baselines written to {args.baseline}")
+        return 0
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Playout latency benchmark for Unity Render Streaming Python client
+
+Simulates a 30 fps video sender over a lossy, jittery link and feeds the
+packets through the real jitter buffers of each playout mode, then through
+a consumer that takes frames in order (default) or skips to the newest one
+(low-latency). Reports the latency/smoothness trade-off:
+
+    python benchmarks/playout_latency.py
+    python benchmarks/playout_latency.py --loss 0 0.02 0.1 --jitter-ms 15 --consumer-ms 40
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+from typing import Dict, List, Tuple
+
+CLIENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CLIENT_DIR)
+
+from aiortc.rtp import RtpPacket  # noqa: E402
+
+from src.playout import PLAYOUT_MODES, create_jitter_buffer, LOW_LATENCY  # noqa: E402
+
+CLOCK_RATE = 90000
+
+
+def simulate_link(frames: int, fps: float, loss: float, jitter_ms: float, delay_ms: float,
+                  rtt_ms: float, keyframe_interval: int, rng: random.Random):
+    """
+    Packetize frames and compute their arrival times
+
+    Returns:
+        (arrivals, capture_times): arrivals as (time, RtpPacket) sorted by time,
+        capture time of each frame by RTP timestamp
+    """
+    arrivals: List[Tuple[float, RtpPacket]] = []
+    capture_times: Dict[int, float] = {}
+    sequence_number = 0
+    for index in range(frames):
+        capture = index / fps
+        timestamp = int(index * CLOCK_RATE / fps)
+        capture_times[timestamp] = capture
+        count = 60 if index % keyframe_interval == 0 else rng.randint(4, 12)
+        for position in range(count):
+            packet = RtpPacket(payload_type=96, sequence_number=sequence_number % 65536,
+                               timestamp=timestamp, marker=position == count - 1)
+            packet._data = b"x" * 1000
+            sequence_number += 1
+
+            # Paced at one packet per 0.2 ms; lost packets come back after a NACK round trip
+            sent = capture + position * 0.0002
+            arrival = sent + (delay_ms + rng.uniform(0, jitter_ms)) / 1000
+            attempts = 0
+            while rng.random() < loss and attempts < 3:
+                arrival += (rtt_ms + rng.uniform(0, jitter_ms)) / 1000
+                attempts += 1
+            if attempts < 3:
+                arrivals.append((arrival, packet))
+    arrivals.sort(key=lambda item: item[0])
+    return arrivals, capture_times
+
+
+def run_mode(mode: str, arrivals, capture_times, consumer_ms: float) -> Dict[str, float]:
+    """Feed arrivals through a mode's jitter buffer and consumer"""
+    jitter_buffer = create_jitter_buffer("video", mode)
+    released: List[Tuple[float, int]] = []
+    for arrival, packet in arrivals:
+        _, frame = jitter_buffer.add(packet)
+        if frame is not None:
+            released.append((arrival, frame.timestamp))
+
+    # Consumer: takes consumer_ms per frame; low-latency skips to the newest released frame
+    shown: List[Tuple[float, int]] = []
+    now = 0.0
+    position = 0
+    while position < len(released):
+        now = max(now, released[position][0])
+        if mode == LOW_LATENCY:
+            while position + 1 < len(released) and released[position + 1][0] <= now:
+                position += 1
+        shown.append((now, released[position][1]))
+        now += consumer_ms / 1000
+        position += 1
+
+    latencies = [(time - capture_times[timestamp]) * 1000 for time, timestamp in shown]
+    intervals = [(b[0] - a[0]) * 1000 for a, b in zip(shown, shown[1:])]
+    latencies.sort()
+    return {
+        "shown": len(shown),
+        "released": len(released),
+        "median_ms": statistics.median(latencies) if latencies else 0.0,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+        "max_ms": latencies[-1] if latencies else 0.0,
+        "interval_sd_ms": statistics.pstdev(intervals) if len(intervals) > 1 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare playout modes under simulated loss")
+    parser.add_argument("--frames", type=int, default=900, help="Frames to simulate (default: 900)")
+    parser.add_argument("--fps", type=float, default=30.0, help="Sender frame rate (default: 30)")
+    parser.add_argument("--loss", type=float, nargs="+", default=[0.0, 0.01, 0.05],
+                        help="Packet loss rates to test (default: 0 0.01 0.05)")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Network jitter (default: 10)")
+    parser.add_argument("--delay-ms", type=float, default=20.0, help="One-way delay (default: 20)")
+    parser.add_argument("--rtt-ms", type=float, default=40.0, help="NACK retransmission delay (default: 40)")
+    parser.add_argument("--consumer-ms", type=float, default=10.0,
+                        help="Consumer time per frame; above 1000/fps it falls behind (default: 10)")
+    parser.add_argument("--keyframe-interval", type=int, default=60, help="Frames per keyframe (default: 60)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{args.frames} frames at {args.fps:g} fps, {args.delay_ms:g} ms delay, "
+          f"{args.jitter_ms:g} ms jitter, {args.consumer_ms:g} ms consumer")
+    print(f"{'loss':>6} {'mode':12} {'shown':>6} {'median':>9} {'p95':>9} {'max':>9} {'interval sd':>12}")
+    for loss in args.loss:
+        arrivals, capture_times = simulate_link(args.frames, args.fps, loss, args.jitter_ms,
+                                                args.delay_ms, args.rtt_ms, args.keyframe_interval,
+                                                random.Random(args.seed))
+        for mode in PLAYOUT_MODES:
+            result = run_mode(mode, arrivals, capture_times, args.consumer_ms)
+            print(f"{loss:6.1%} {mode:12} {result['shown']:6d} {result['median_ms']:7.1f}ms "
+                  f"{result['p95_ms']:7.1f}ms {result['max_ms']:7.1f}ms {result['interval_sd_ms']:10.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,8 +23,8 @@ class CustomFrameHandler:
         self.fps_counter = 0
         self.last_time = asyncio.get_event_loop().time()
     
-    def process_frame(self, frame):
-        """Custom frame processing"""
+    def process_frame(self, frame, frame_count):
+        """Custom frame processing (a pipeline transform)"""
         self.frame_count += 1
         self.fps_counter += 1
         
@@ -86,17 +86,8 @@ async def main():
         save_audio=False
     )
     
-    # Setup custom frame processing
-    original_process_frame = client.video_receiver._process_frame
-    
-    async def custom_process_frame(frame):
-        """Custom frame processing wrapper"""
-        # Apply custom processing
-        processed_frame = frame_handler.process_frame(frame)
-        # Call original processing with modified frame
-        return await original_process_frame(processed_frame)
-    
-    client.video_receiver._process_frame = custom_process_frame
+    # Setup custom frame processing; transforms run before display and saving
+    client.video_receiver.pipeline.add_transform(frame_handler.process_frame)
     
     # Setup custom data channel handling
     client.datachannel_handler.on_message = data_handler.handle_message
@@ -1,20 +1,63 @@
 """
 Python package initialization for Unity Render Streaming client
+
+Submodules are imported on first attribute access (PEP 562), so
+`from src.sdp_utils import ...` or `import src` does not pull in aiortc,
+OpenCV or PyAV until a class that needs them is used.
 """
 
-from .client import UnityRenderStreamingClient
-from .signaling import WebSocketSignaling
-from .webrtc_peer import WebRTCPeer
-from .media_handlers import VideoReceiver, AudioReceiver, DataChannelHandler
+import importlib
 
 __version__ = "1.0.0"
 __author__ = "Unity Render Streaming Python Client"
 
-__all__ = [
-    "UnityRenderStreamingClient",
-    "WebSocketSignaling", 
-    "WebRTCPeer",
-    "VideoReceiver",
-    "AudioReceiver", 
-    "DataChannelHandler"
-]
\ No newline at end of file
+# Public name -> submodule that defines it
+_LAZY_ATTRIBUTES = {
+    "UnityRenderStreamingClient": "client",
+    "WebSocketSignaling": "signaling",
+    "WebRTCPeer": "webrtc_peer",
+    "VideoReceiver": "media_handlers",
+    "AudioReceiver": "media_handlers",
+    "StreamingAudioWriter": "media_handlers",
+    "DataChannelHandler": "media_handlers",
+    "AVSynchronizer": "av_sync",
+    "AVChunk": "av_sync",
+    "MuxedRecorder": "av_sync",
+    "InputRemotingSender": "input_remoting",
+    "FrameWaiters": "closed_loop",
+    "StepResult": "closed_loop",
+    "FrameHub": "frame_stream",
+    "FrameSubscription": "frame_stream",
+    "ReceivedFrame": "frame_stream",
+    "SessionRecorder": "session_capture",
+    "ReplayTrack": "session_capture",
+    "FrameArchive": "frame_archive",
+    "FramePipeline": "pipeline",
+    "KeyframeRecovery": "keyframe_recovery",
+    "SinkGraph": "sinks",
+    "FrameSink": "sinks",
+    "CallbackSink": "sinks",
+    "FileSink": "sinks",
+    "SharedMemoryRingSink": "sinks",
+    "SharedMemoryRingReader": "sinks",
+    "RebroadcastSink": "rebroadcast",
+    "RelayServer": "relay",
+    "StreamingDaemon": "daemon",
+    "DaemonClient": "daemon",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    # Cache so later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,436 @@
+"""
+Audio/video synchronisation for Unity Render Streaming Python client
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from fractions import Fraction
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Share of elapsed media time by which a track's clock may be slewed towards
+# its sender report mapping (0.05 removes a 100 ms step in 2 s)
+SLEW_RATE = 0.05
+
+
+def interleave_audio(frame) -> np.ndarray:
+    """Convert a decoded av.AudioFrame to a (samples, channels) array"""
+    samples = frame.to_ndarray()
+    if frame.format.is_planar:
+        return samples.T
+    return samples.reshape(-1, len(frame.layout.channels))
+
+
+@dataclass
+class AVChunk:
+    """Audio and video received for one interval of the presentation clock"""
+    start: float
+    end: float
+    video_frames: List[Tuple[float, Any]] = field(default_factory=list)
+    audio: Optional[np.ndarray] = None
+    sample_rate: Optional[int] = None
+
+
+class PresentationClock:
+    """Monotonic clock shared by all tracks of a connection"""
+
+    def __init__(self):
+        # Offset from the sender's NTP clock to time.monotonic()
+        self.ntp_offset: Optional[float] = None
+
+    def from_ntp(self, ntp_time: float, arrival: float) -> float:
+        """
+        Map a sender NTP time onto the presentation clock
+
+        The offset follows the smallest observed transit time so it is the
+        same for every track regardless of their individual delays.
+        """
+        candidate = arrival - ntp_time
+        if self.ntp_offset is None or candidate < self.ntp_offset:
+            self.ntp_offset = candidate
+        return ntp_time + self.ntp_offset
+
+
+class MediaClock:
+    """Maps one track's frame timestamps onto the presentation clock"""
+
+    def __init__(self, kind: str, presentation_clock: PresentationClock):
+        """
+        Initialize media clock
+
+        Args:
+            kind: Track kind ('audio' or 'video')
+            presentation_clock: Clock shared with the other tracks
+        """
+        self.kind = kind
+        self.presentation_clock = presentation_clock
+        self.tap = None
+        self.sender_report: Optional[Tuple[float, int]] = None
+        self._arrival_anchor: Optional[float] = None
+        # Step between the arrival and the sender report mapping, slewed out gradually
+        self._correction = 0.0
+        self._last_time: Optional[float] = None
+
+        self.logger = logging.getLogger(__name__)
+
+    def attach(self, tap):
+        """Use RTCP sender reports observed by a ReceiverTap"""
+        self.tap = tap
+        tap.on_sender_report.append(self.update_sender_report)
+        if tap.last_sender_report:
+            self.update_sender_report(*tap.last_sender_report)
+
+    def update_sender_report(self, ntp_seconds: float, rtp_timestamp: int):
+        """Record the latest (NTP, RTP timestamp) pair from the sender"""
+        if self.sender_report is None:
+            self.logger.info(f"Synchronising {self.kind} track with RTCP sender reports")
+        self.sender_report = (ntp_seconds, rtp_timestamp)
+
+    def presentation_time(self, frame, arrival: float) -> float:
+        """
+        Get the presentation time of a decoded frame
+
+        Frames before the first sender report are anchored at their arrival.
+        Switching to the sender report mapping keeps the track continuous:
+        the step between the two is carried as a correction and slewed out
+        at SLEW_RATE, so times never go backwards and chunks stay aligned.
+
+        Args:
+            frame: Decoded av frame with pts/time_base
+            arrival: time.monotonic() when the frame was received
+        """
+        media_time = float(frame.pts * frame.time_base)
+        rtp_origin = self.tap.rtp_origin if self.tap else None
+
+        if self.sender_report is None or rtp_origin is None:
+            # No sender report yet: anchor the track's media time at first arrival
+            if self._arrival_anchor is None:
+                self._arrival_anchor = arrival - media_time
+            self._last_time = self._arrival_anchor + media_time
+            return self._last_time
+
+        ntp_seconds, sr_timestamp = self.sender_report
+        clock_rate = 1 / float(frame.time_base)
+        frame_timestamp = (rtp_origin + frame.pts) & 0xFFFFFFFF
+        # Signed 32-bit difference handles RTP timestamp wrap-around
+        delta = ((frame_timestamp - sr_timestamp + (1 << 31)) & 0xFFFFFFFF) - (1 << 31)
+        t = self.presentation_clock.from_ntp(ntp_seconds + delta / clock_rate, arrival)
+
+        if self._arrival_anchor is not None:
+            # First mapped frame of a track that started on arrival times
+            self._correction = self._arrival_anchor + media_time - t
+            self._arrival_anchor = None
+            self.logger.info(f"Slewing {self.kind} clock by {-self._correction * 1000:.0f} ms "
+                             f"onto the sender report mapping")
+        elif self._correction and self._last_time is not None:
+            # Remove at most SLEW_RATE of the media time elapsed since the last frame
+            step = max(t + self._correction - self._last_time, 0.0) * SLEW_RATE
+            self._correction = (max(self._correction - step, 0.0) if self._correction > 0
+                                else min(self._correction + step, 0.0))
+        self._last_time = t + self._correction
+        return self._last_time
+
+
+class AVSynchronizer:
+    """Aligns audio and video frames on a shared clock and emits A/V chunks"""
+
+    def __init__(self, chunk_duration: float = 1.0, max_delay: float = 0.5,
+                 max_queued_chunks: int = 8):
+        """
+        Initialize A/V synchronizer
+
+        Args:
+            chunk_duration: Length of each emitted chunk in seconds
+            max_delay: How long to wait for a lagging track before emitting without it
+            max_queued_chunks: Chunks buffered per subscriber before dropping the oldest
+        """
+        self.chunk_duration = chunk_duration
+        self.max_delay = max_delay
+        self.max_queued_chunks = max_queued_chunks
+
+        self.presentation_clock = PresentationClock()
+        self.clocks: Dict[str, MediaClock] = {
+            kind: MediaClock(kind, self.presentation_clock) for kind in ("video", "audio")
+        }
+        self.chunks_emitted = 0
+        self.chunks_dropped = 0
+
+        self._video: Deque[Tuple[float, Any]] = deque()
+        self._audio: Deque[Tuple[float, np.ndarray]] = deque()
+        self._sample_rate: Optional[int] = None
+        self._watermarks: Dict[str, float] = {}
+        self._next_start: Optional[float] = None
+        self._subscribers: List[asyncio.Queue] = []
+        self._closed = False
+
+        self.logger = logging.getLogger(__name__)
+
+    def attach(self, kind: str, tap):
+        """
+        Map a track's timestamps using the sender reports seen by its receiver
+
+        Args:
+            kind: Track kind ('audio' or 'video')
+            tap: ReceiverTap of the track's RTCRtpReceiver
+        """
+        self.clocks[kind].attach(tap)
+
+    def push_video(self, frame):
+        """Add a decoded av.VideoFrame"""
+        if frame.pts is None:
+            return
+        t = self.clocks["video"].presentation_time(frame, time.monotonic())
+        self._video.append((t, frame))
+        self._advance("video", t, t)
+
+    def push_audio(self, frame):
+        """Add a decoded av.AudioFrame"""
+        if frame.pts is None:
+            return
+        t = self.clocks["audio"].presentation_time(frame, time.monotonic())
+        if self._sample_rate != frame.sample_rate:
+            self._audio.clear()
+            self._sample_rate = frame.sample_rate
+        self._audio.append((t, interleave_audio(frame)))
+        self._advance("audio", t, t + frame.samples / frame.sample_rate)
+
+    def _advance(self, kind: str, start: float, watermark: float):
+        """Move a track's watermark forward and emit every chunk both tracks cover"""
+        self._watermarks[kind] = max(watermark, self._watermarks.get(kind, watermark))
+        if self._next_start is None:
+            self._next_start = start
+
+        while True:
+            end = self._next_start + self.chunk_duration
+            leading = max(self._watermarks.values())
+            lagging = min(self._watermarks.values())
+            if lagging < end and leading < end + self.max_delay:
+                break
+            self._emit(self._next_start, end)
+            self._next_start = end
+
+    def _emit(self, start: float, end: float):
+        """Cut [start, end) out of the buffers and hand it to subscribers"""
+        chunk = AVChunk(start=start, end=end)
+
+        while self._video and self._video[0][0] < end:
+            t, frame = self._video.popleft()
+            if t >= start:
+                chunk.video_frames.append((t, frame))
+
+        if self._sample_rate:
+            pieces = []
+            while self._audio:
+                t, samples = self._audio[0]
+                first = max(0, int(round((start - t) * self._sample_rate)))
+                last = min(len(samples), int(round((end - t) * self._sample_rate)))
+                if first < last:
+                    pieces.append(samples[first:last])
+                if t + len(samples) / self._sample_rate > end:
+                    # Remainder belongs to the next chunk
+                    break
+                self._audio.popleft()
+            if pieces:
+                chunk.audio = np.concatenate(pieces)
+                chunk.sample_rate = self._sample_rate
+
+        self.chunks_emitted += 1
+        for subscriber in self._subscribers:
+            if subscriber.full():
+                subscriber.get_nowait()
+                self.chunks_dropped += 1
+            subscriber.put_nowait(chunk)
+
+    async def chunks(self):
+        """
+        Iterate over aligned A/V chunks as they become available
+
+        Yields:
+            AVChunk: Audio and video for consecutive clock intervals
+        """
+        subscriber: asyncio.Queue = asyncio.Queue(maxsize=self.max_queued_chunks)
+        self._subscribers.append(subscriber)
+        try:
+            while True:
+                if self._closed and subscriber.empty():
+                    break
+                chunk = await subscriber.get()
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            self._subscribers.remove(subscriber)
+
+    def close(self):
+        """Flush the remaining buffered media and end all chunk iterators"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._next_start is not None and self._watermarks:
+            end = max(self._watermarks.values())
+            while self._next_start < end:
+                self._emit(self._next_start, self._next_start + self.chunk_duration)
+                self._next_start += self.chunk_duration
+        for subscriber in self._subscribers:
+            if subscriber.full():
+                subscriber.get_nowait()
+            subscriber.put_nowait(None)
+
+
+class MuxedRecorder:
+    """Records synchronised A/V chunks into a single container file"""
+
+    VIDEO_TIME_BASE = 90000
+
+    def __init__(self, output_file: str, video_codec: str = "libx264",
+                 audio_codec: str = "aac", frame_rate: int = 30,
+                 max_queued_chunks: int = 16):
+        """
+        Initialize muxed recorder
+
+        Args:
+            output_file: Output container path (e.g. recording.mkv or .mp4)
+            video_codec: FFmpeg video encoder name
+            audio_codec: FFmpeg audio encoder name
+            frame_rate: Nominal video frame rate for the encoder
+            max_queued_chunks: Chunks buffered for the writer thread before dropping
+        """
+        self.output_file = output_file
+        self.video_codec = video_codec
+        self.audio_codec = audio_codec
+        self.frame_rate = frame_rate
+        self.chunks_written = 0
+        self.chunks_dropped = 0
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queued_chunks)
+        self._thread: Optional[threading.Thread] = None
+        self._container = None
+        self._video_stream = None
+        self._audio_stream = None
+        self._origin: Optional[float] = None
+        self._last_video_pts = -1
+        self._next_audio_pts = 0
+
+        self.logger = logging.getLogger(__name__)
+
+    async def record(self, synchronizer: AVSynchronizer):
+        """Write every chunk produced by a synchronizer until it is closed"""
+        async for chunk in synchronizer.chunks():
+            self.write_chunk(chunk)
+
+    def write_chunk(self, chunk: AVChunk) -> bool:
+        """Queue a chunk for the writer thread (never blocks the caller)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="muxed-recorder", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(chunk)
+            return True
+        except queue.Full:
+            self.chunks_dropped += 1
+            self.logger.warning(f"Recorder falling behind, dropped {self.chunks_dropped} chunks")
+            return False
+
+    def _open(self, chunk: AVChunk):
+        """Create the container and streams from the first chunk with media"""
+        import av
+
+        self._container = av.open(self.output_file, mode="w")
+        self._origin = chunk.start
+
+        if chunk.video_frames:
+            first = chunk.video_frames[0][1]
+            self._video_stream = self._container.add_stream(self.video_codec, rate=self.frame_rate)
+            self._video_stream.width = first.width
+            self._video_stream.height = first.height
+            self._video_stream.pix_fmt = "yuv420p"
+            self._video_stream.time_base = Fraction(1, self.VIDEO_TIME_BASE)
+
+        if chunk.audio is not None:
+            layout = "mono" if chunk.audio.shape[1] == 1 else "stereo"
+            self._audio_stream = self._container.add_stream(
+                self.audio_codec, rate=chunk.sample_rate, layout=layout)
+
+        self.logger.info(f"Recording synchronised A/V to {self.output_file}")
+
+    def _write(self, chunk: AVChunk):
+        """Encode and mux one chunk"""
+        import av
+
+        if self._container is None:
+            if not chunk.video_frames and chunk.audio is None:
+                return
+            self._open(chunk)
+
+        if self._video_stream is not None:
+            for t, frame in chunk.video_frames:
+                pts = int(round((t - self._origin) * self.VIDEO_TIME_BASE))
+                if pts <= self._last_video_pts:
+                    continue
+                if (frame.width, frame.height, frame.format.name) != (
+                        self._video_stream.width, self._video_stream.height, "yuv420p"):
+                    frame = frame.reformat(width=self._video_stream.width,
+                                           height=self._video_stream.height, format="yuv420p")
+                frame.pts = pts
+                frame.time_base = self._video_stream.time_base
+                self._last_video_pts = pts
+                self._container.mux(self._video_stream.encode(frame))
+
+        if self._audio_stream is not None and chunk.audio is not None:
+            samples = chunk.audio
+            if samples.shape[1] > 2:
+                samples = samples[:, :2]
+            sample_format = "s16" if samples.dtype == np.int16 else "flt"
+            audio_frame = av.AudioFrame.from_ndarray(
+                np.ascontiguousarray(samples, dtype=np.int16 if sample_format == "s16" else np.float32)
+                .reshape(1, -1),
+                format=sample_format, layout=self._audio_stream.layout.name)
+            audio_frame.sample_rate = chunk.sample_rate
+            # Keep audio continuous; gaps before the first chunk become silence offset
+            start_pts = int(round((chunk.start - self._origin) * chunk.sample_rate))
+            audio_frame.pts = max(start_pts, self._next_audio_pts)
+            self._next_audio_pts = audio_frame.pts + audio_frame.samples
+            self._container.mux(self._audio_stream.encode(audio_frame))
+
+        self.chunks_written += 1
+
+    def _run(self):
+        """Writer thread: encode queued chunks"""
+        try:
+            while True:
+                chunk = self._queue.get()
+                if chunk is None:
+                    break
+                self._write(chunk)
+        except Exception as e:
+            self.logger.error(f"Error writing recording: {e}")
+        finally:
+            self._finish()
+
+    def _finish(self):
+        """Flush encoders and close the container"""
+        if self._container is None:
+            return
+        try:
+            for stream in (self._video_stream, self._audio_stream):
+                if stream is not None:
+                    self._container.mux(stream.encode(None))
+        finally:
+            self._container.close()
+            self._container = None
+
+    def close(self):
+        """Finish writing queued chunks and close the file (blocks until done)"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self.logger.info(f"Saved recording to {self.output_file} "
+                         f"({self.chunks_written} chunks, {self.chunks_dropped} dropped)")
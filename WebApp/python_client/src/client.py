@@ -6,15 +6,22 @@ import asyncio
 import logging
 import argparse
 import sys
-import os
-from typing import Optional
+from typing import List, Optional
 
-# Add the src directory to the path for imports
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
-from signaling import WebSocketSignaling
-from webrtc_peer import WebRTCPeer
-from media_handlers import VideoReceiver, AudioReceiver, DataChannelHandler
+from .signaling import WebSocketSignaling
+from .webrtc_peer import WebRTCPeer
+from .media_handlers import VideoReceiver, AudioReceiver, DataChannelHandler, track_output_path
+from .av_sync import AVSynchronizer, MuxedRecorder
+from .receiver_tap import find_receiver, tap_receiver, track_index
+from .sdp_utils import H264_PROFILES, SUPPORTED_CODECS
+from .frame_stream import DROP_OLDEST
+from .session_capture import ReplayTrack, SessionRecorder
+from .frame_archive import ENCODINGS, FrameArchive
+from .keyframe_recovery import KEYFRAME_METHODS, KeyframeRecovery
+from .playout import DEFAULT, PLAYOUT_MODES, create_jitter_buffer
+from .decoder_config import THREAD_TYPES, DecoderConfig
+from .loop_watchdog import LoopWatchdog, install_uvloop
+from .profiler import StageProfiler
 
 
 class UnityRenderStreamingClient:
@@ -24,7 +31,24 @@ class UnityRenderStreamingClient:
                  connection_id: Optional[str] = None,
                  display_video: bool = True,
                  save_frames: bool = False,
-                 save_audio: bool = False):
+                 save_audio: bool = False,
+                 sync_av: bool = False,
+                 record_file: Optional[str] = None,
+                 video_codec: Optional[str] = "h264",
+                 h264_profile: Optional[str] = None,
+                 capture_file: Optional[str] = None,
+                 archive_file: Optional[str] = None,
+                 archive_encoding: str = "raw",
+                 keyframe_request: Optional[str] = "pli",
+                 playout: str = DEFAULT,
+                 jitter_buffer_packets: Optional[int] = None,
+                 detect_duplicates: bool = False,
+                 video_tracks: int = 1,
+                 decoder_threads: Optional[int] = None,
+                 decoder_thread_type: str = "slice",
+                 watchdog_threshold: Optional[float] = None,
+                 profile_file: Optional[str] = None,
+                 profile_frames: int = 300):
         """
         Initialize Unity Render Streaming client
         
@@ -34,22 +58,123 @@ class UnityRenderStreamingClient:
             display_video: Whether to display video
             save_frames: Whether to save video frames
             save_audio: Whether to save audio
+            sync_av: Whether to align audio and video on a shared clock
+            record_file: Optional container file for a synchronised A/V recording
+            video_codec: Video codec to prefer in the answer (None keeps Unity's order)
+            h264_profile: H.264 profile to prefer in the answer
+            capture_file: Optional file capturing RTP, signaling and data channel traffic
+            archive_file: Optional memory-mapped frame archive to append frames to
+            archive_encoding: Frame encoding in the archive ('raw', 'jpeg' or 'png')
+            keyframe_request: 'pli' or 'fir' request sent after decode errors,
+                freezes and timeouts (None disables keyframe recovery)
+            playout: DEFAULT, or LOW_LATENCY to release frames as soon as they
+                are complete and skip stale ones
+            jitter_buffer_packets: Video jitter buffer capacity (power of two)
+            detect_duplicates: Skip conversion and frame saving for frames
+                repeating the previous picture
+            video_tracks: Video receivers to create up front, so frames(track=n)
+                works before connecting; more are added if Unity sends more tracks
+            decoder_threads: Video decoder threads, 0 for one per core (None keeps
+                FFmpeg's defaults)
+            decoder_thread_type: 'slice', 'frame' or 'auto' (see decoder_config)
+            watchdog_threshold: Sample the stack of event loop stalls longer than
+                this many seconds (None disables the loop watchdog)
+            profile_file: Sample all threads from start() over profile_frames
+                frames and write flamegraph stacks here, plus a per-stage
+                report next to it as .json (None disables profiling)
+            profile_frames: Frames of the first video track to profile
         """
         self.server_url = server_url
         self.connection_id = connection_id
+        self.video_codec = video_codec
+        self.h264_profile = h264_profile
+        self.playout = playout
+        self.jitter_buffer_packets = jitter_buffer_packets
+        self.display_video = display_video
+        self.save_frames = save_frames
+        self.save_audio = save_audio
+        self.detect_duplicates = detect_duplicates
+        self.archive_file = archive_file
+        self.archive_encoding = archive_encoding
+        self.decoder_config = None
+        if decoder_threads is not None or decoder_thread_type != "slice":
+            self.decoder_config = DecoderConfig(decoder_threads or 0, decoder_thread_type)
+        self.loop_watchdog = LoopWatchdog(watchdog_threshold) if watchdog_threshold else None
+        self.profiler = StageProfiler(profile_file, profile_frames) if profile_file else None
+        
+        # Ask Unity for a keyframe instead of waiting for its next periodic one (per track)
+        self.keyframe_request = keyframe_request
         
-        # Initialize components
+        # Initialize components; each camera Unity streams gets its own
+        # receiver, pipeline, metrics and sinks (the first is video_receiver)
         self.signaling = WebSocketSignaling(server_url)
         self.peer = None
-        self.video_receiver = VideoReceiver(display_video, save_frames)
-        self.audio_receiver = AudioReceiver(save_audio)
+        self.video_receivers: List[VideoReceiver] = []
+        self.audio_receivers: List[AudioReceiver] = []
+        self.frame_archives: List[FrameArchive] = []
+        self._started = False
+        for track in range(max(video_tracks, 1)):
+            self._add_video_receiver(track)
+        self._add_audio_receiver(0)
+        if self.profiler:
+            self.profiler.frame_counter = lambda: self.video_receiver.frame_count
+            self.profiler.stats_source = lambda: {track: self.pipeline_stats(track)
+                                                  for track in range(len(self.video_receivers))}
+        self.video_receiver = self.video_receivers[0]
+        self.audio_receiver = self.audio_receivers[0]
         self.datachannel_handler = DataChannelHandler()
         
+        # A/V synchronisation and muxed recording
+        self.synchronizer = None
+        self.recorder = None
+        self._record_task = None
+        if sync_av or record_file:
+            self.synchronizer = AVSynchronizer()
+            self.video_receiver.on_decoded_frame = self.synchronizer.push_video
+            self.audio_receiver.on_decoded_frame = self.synchronizer.push_audio
+        if record_file:
+            self.recorder = MuxedRecorder(record_file)
+        
+        # Session capture for offline replay
+        self.session_recorder = None
+        if capture_file:
+            self.session_recorder = SessionRecorder(capture_file)
+            self.session_recorder.attach_signaling(self.signaling)
+            self.session_recorder.attach_datachannels(self.datachannel_handler)
+        
         self.logger = logging.getLogger(__name__)
         
         # Setup signaling event handlers
         self._setup_signaling_handlers()
     
+    def _add_video_receiver(self, track: int) -> VideoReceiver:
+        """Create the receiver, keyframe recovery and archive of a video track"""
+        if track:
+            # Several tracks: convert each one's frames on its own thread
+            for video_receiver in self.video_receivers:
+                video_receiver.pipeline.convert_in_thread = True
+        video_receiver = VideoReceiver(
+            self.display_video, self.save_frames, output_dir=track_output_path("output", track),
+            playout=self.playout, detect_duplicates=self.detect_duplicates,
+            window_name="Unity Render Streaming" if track == 0 else f"Unity Render Streaming - Track {track + 1}",
+            window_position=(100 + 40 * track, 100 + 40 * track), convert_in_thread=track > 0)
+        if self.keyframe_request:
+            video_receiver.pipeline.recovery = KeyframeRecovery(self.keyframe_request)
+        self.video_receivers.append(video_receiver)
+        if self.archive_file:
+            frame_archive = FrameArchive(track_output_path(self.archive_file, track), "w",
+                                         encoding=self.archive_encoding)
+            self.frame_archives.append(frame_archive)
+            if self._started:
+                self.add_frame_handler(frame_archive.append_frame, maxsize=8, track=track)
+        return video_receiver
+    
+    def _add_audio_receiver(self, track: int) -> AudioReceiver:
+        """Create the receiver of an audio track"""
+        audio_receiver = AudioReceiver(self.save_audio, output_file=track_output_path("output.wav", track))
+        self.audio_receivers.append(audio_receiver)
+        return audio_receiver
+    
     def _setup_signaling_handlers(self):
         """Setup signaling event handlers"""
         
@@ -68,7 +193,8 @@ class UnityRenderStreamingClient:
         self.logger.info(f"Connected with ID: {connection_id}, polite: {is_polite}")
         
         # Create WebRTC peer
-        self.peer = WebRTCPeer(self.signaling, connection_id, is_polite)
+        self.peer = WebRTCPeer(self.signaling, connection_id=connection_id, is_polite=is_polite,
+                               video_codec=self.video_codec, h264_profile=self.h264_profile)
         self._setup_peer_handlers()
     
     def _on_disconnect(self, data: dict):
@@ -108,41 +234,151 @@ class UnityRenderStreamingClient:
     
     def _on_track(self, track):
         """Handle incoming media track"""
-        self.logger.info(f"Received {track.kind} track")
+        index = track_index(self.peer.pc, track) if self.peer else 0
+        self.logger.info(f"Received {track.kind} track {index + 1}")
+        if track.kind == "video":
+            while len(self.video_receivers) <= index:
+                self._add_video_receiver(len(self.video_receivers))
+        elif track.kind == "audio":
+            while len(self.audio_receivers) <= index:
+                self._add_audio_receiver(len(self.audio_receivers))
+        
+        # Map the track's RTP timestamps with its sender reports
+        receiver = find_receiver(self.peer.pc, track) if self.peer else None
+        if receiver and (self.playout != DEFAULT or self.jitter_buffer_packets):
+            capacity = self.jitter_buffer_packets if track.kind == "video" else None
+            tap_receiver(receiver).replace_jitter_buffer(
+                create_jitter_buffer(track.kind, self.playout, capacity))
+        if receiver and self.synchronizer and index == 0:
+            # Only the first camera and microphone are synchronised and recorded
+            self.synchronizer.attach(track.kind, tap_receiver(receiver))
+        if receiver and self.session_recorder:
+            self.session_recorder.attach_receiver(tap_receiver(receiver), index)
         
         if track.kind == "video":
-            asyncio.create_task(self.video_receiver.handle_track(track))
+            video_receiver = self.video_receivers[index]
+            if receiver and self.decoder_config:
+                tap_receiver(receiver).configure_decoder(self.decoder_config)
+            if receiver and video_receiver.pipeline.recovery:
+                video_receiver.pipeline.recovery.attach(tap_receiver(receiver))
+            asyncio.create_task(video_receiver.handle_track(track))
         elif track.kind == "audio":
-            asyncio.create_task(self.audio_receiver.handle_track(track))
+            asyncio.create_task(self.audio_receivers[index].handle_track(track))
     
     def _on_connection_state_change(self, state: str):
         """Handle connection state changes"""
         self.logger.info(f"WebRTC connection state: {state}")
         
         if state == "connected":
+            self._mark("connected")
             self.logger.info("WebRTC connection established successfully!")
         elif state == "failed":
             self.logger.error("WebRTC connection failed")
         elif state == "disconnected":
             self.logger.info("WebRTC connection disconnected")
     
+    def frames(self, maxsize: int = 1, policy: str = DROP_OLDEST, track: int = 0):
+        """
+        Iterate over received video frames: async for frame in client.frames()
+        
+        Each call is an independent subscriber with its own bounded queue, so a
+        slow consumer only drops its own frames.
+        
+        Args:
+            maxsize: Frames buffered while the consumer is busy
+            policy: DROP_OLDEST (keep newest) or DROP_NEWEST (keep backlog)
+            track: Video track to follow (0 = first camera)
+        """
+        return self.video_receivers[track].frame_hub.frames(maxsize, policy)
+    
+    def add_frame_handler(self, handler, maxsize: int = 1, policy: str = DROP_OLDEST, track: int = 0):
+        """
+        Run a sync or async frame handler without blocking reception
+        
+        Returns:
+            asyncio.Task: Consumer task; cancel it to remove the handler
+        """
+        return self.video_receivers[track].frame_hub.add_handler(handler, maxsize, policy)
+    
+    def add_sink(self, sink, track: int = 0, **options):
+        """
+        Add a frame sink with its own rate, format and worker
+        
+        Args:
+            sink: FrameSink, or a callable taking (frame, frame_count)
+            track: Video track whose frames the sink receives
+            **options: FrameSink options for callables (max_rate, frame_format, worker, writes)
+            
+        Returns:
+            FrameSink: The added sink (pass it to remove_sink())
+        """
+        return self.video_receivers[track].pipeline.add_sink(sink, **options)
+    
+    def remove_sink(self, sink, track: int = 0):
+        """Remove a frame sink and stop its worker"""
+        self.video_receivers[track].pipeline.remove_sink(sink)
+    
+    def pipeline_stats(self, track: int = 0) -> dict:
+        """Frame counters and per-stage timings of a track's video pipeline, and loop lag"""
+        stats = self.video_receivers[track].stats()
+        if self.loop_watchdog:
+            stats["loop"] = self.loop_watchdog.stats()
+        return stats
+    
+    def _mark(self, milestone: str):
+        """Record a connection setup milestone in the profile"""
+        if self.profiler:
+            self.profiler.mark(milestone)
+    
     async def start(self):
         """Start the client"""
         self.logger.info("Starting Unity Render Streaming client...")
+        if self.loop_watchdog:
+            self.loop_watchdog.start()
+        if self.profiler:
+            self.profiler.start()
         
         # Connect to signaling server
         if not await self.signaling.start():
             raise RuntimeError("Failed to connect to signaling server")
+        self._mark("signaling_connected")
         
         # Create connection
         connection_id = await self.signaling.create_connection(self.connection_id)
+        self._mark("connection_created")
         self.logger.info(f"Created connection: {connection_id}")
         
+        self._start_recording()
+        self._start_archives()
+        
         return connection_id
     
+    def _start_recording(self):
+        """Mux synchronised A/V chunks into the recording as they are emitted"""
+        if self.recorder:
+            self._record_task = asyncio.create_task(self.recorder.record(self.synchronizer))
+    
+    async def _finish_recording(self):
+        """Flush synchronised media and finish the recording"""
+        if self.synchronizer:
+            self.synchronizer.close()
+        if self._record_task:
+            await self._record_task
+            self._record_task = None
+            await asyncio.get_running_loop().run_in_executor(None, self.recorder.close)
+    
+    def _start_archives(self):
+        """Append received frames to the archives (tracks added later start their own)"""
+        for track, frame_archive in enumerate(self.frame_archives):
+            self.add_frame_handler(frame_archive.append_frame, maxsize=8, track=track)
+        self._started = True
+    
     async def stop(self):
         """Stop the client"""
         self.logger.info("Stopping Unity Render Streaming client...")
+        if self.profiler:
+            # Writes a partial profile if the window did not complete
+            self.profiler.stop()
         
         # Close peer connection
         if self.peer:
@@ -152,7 +388,48 @@ class UnityRenderStreamingClient:
         await self.signaling.stop()
         
         # Cleanup media handlers
-        self.video_receiver.cleanup()
+        for video_receiver in self.video_receivers:
+            video_receiver.cleanup()
+            if video_receiver.pipeline.recovery:
+                video_receiver.pipeline.recovery.stop()
+        
+        await self._finish_recording()
+        if self.session_recorder:
+            await asyncio.get_running_loop().run_in_executor(None, self.session_recorder.close)
+        for frame_archive in self.frame_archives:
+            frame_archive.close()
+        if self.loop_watchdog:
+            self.loop_watchdog.stop()
+    
+    async def replay(self, capture_file: str, speed: Optional[float] = 1.0):
+        """
+        Feed a capture through the media handlers without any network
+        
+        Args:
+            capture_file: File written with capture_file=...
+            speed: Playback rate relative to the capture; None or 0 for max speed
+        """
+        self.logger.info(f"Replaying {capture_file} at {f'{speed}x' if speed else 'max'} speed")
+        if self.loop_watchdog:
+            self.loop_watchdog.start()
+        if self.profiler:
+            self.profiler.start()
+        self._start_recording()
+        self._start_archives()
+        await asyncio.gather(
+            *(video_receiver.handle_track(ReplayTrack(capture_file, "video", speed, playout=self.playout,
+                                                      track=track, decoder_config=self.decoder_config))
+              for track, video_receiver in enumerate(self.video_receivers)),
+            self.audio_receiver.handle_track(ReplayTrack(capture_file, "audio", speed, playout=self.playout)))
+        if self.profiler:
+            self.profiler.stop()
+        for video_receiver in self.video_receivers:
+            video_receiver.cleanup()
+        await self._finish_recording()
+        for frame_archive in self.frame_archives:
+            frame_archive.close()
+        if self.loop_watchdog:
+            self.loop_watchdog.stop()
     
     async def run(self):
         """Run the client until interrupted"""
@@ -186,6 +463,47 @@ async def main():
                        help="Save video frames to disk")
     parser.add_argument("--save-audio", action="store_true",
                        help="Save audio to file")
+    parser.add_argument("--sync-av", action="store_true",
+                       help="Align audio and video on a shared presentation clock")
+    parser.add_argument("--record", metavar="FILE",
+                       help="Record synchronised audio/video to a container file (e.g. session.mkv)")
+    parser.add_argument("--codec", default="h264", choices=SUPPORTED_CODECS,
+                       help="Preferred video codec")
+    parser.add_argument("--h264-profile", default=None, choices=H264_PROFILES,
+                       help="Preferred H.264 profile (default: any)")
+    parser.add_argument("--playout", default=DEFAULT, choices=PLAYOUT_MODES,
+                       help="low-latency releases frames as soon as they are complete and "
+                            "skips stale ones (default: default)")
+    parser.add_argument("--jitter-buffer", type=int, default=None, metavar="PACKETS",
+                       help="Video jitter buffer capacity, a power of two (default: 128)")
+    parser.add_argument("--detect-duplicates", action="store_true",
+                       help="Skip conversion and frame saving for repeated pictures")
+    parser.add_argument("--decoder-threads", type=int, default=None, metavar="N",
+                       help="Video decoder threads, 0 for one per core (default: FFmpeg's)")
+    parser.add_argument("--decoder-thread-type", default="slice", choices=THREAD_TYPES,
+                       help="slice, frame (+1 frame latency per extra thread) or auto (default: slice)")
+    parser.add_argument("--keyframe-request", default="pli", choices=list(KEYFRAME_METHODS) + ["off"],
+                       help="Keyframe request sent after decode errors, freezes and timeouts (default: pli)")
+    parser.add_argument("--video-tracks", type=int, default=1, metavar="N",
+                       help="Video tracks to prepare for; extra tracks Unity sends are received too (default: 1)")
+    parser.add_argument("--capture", metavar="FILE",
+                       help="Capture RTP, signaling and data channel traffic for replay")
+    parser.add_argument("--replay", metavar="FILE",
+                       help="Replay a capture file instead of connecting")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                       help="Replay rate relative to the capture, 0 for max speed (default: 1.0)")
+    parser.add_argument("--archive", metavar="FILE",
+                       help="Append received frames to a memory-mapped frame archive")
+    parser.add_argument("--archive-encoding", default="raw", choices=list(ENCODINGS),
+                       help="Frame encoding in the archive (default: raw)")
+    parser.add_argument("--watchdog", type=float, metavar="MS",
+                       help="Measure event loop lag and sample the stack of stalls longer than MS")
+    parser.add_argument("--uvloop", action="store_true",
+                       help="Run on uvloop instead of asyncio's loop (pip install uvloop)")
+    parser.add_argument("--profile", metavar="FILE",
+                       help="Profile setup and the first frames; flamegraph stacks to FILE, report to .json")
+    parser.add_argument("--profile-frames", type=int, default=300, metavar="N",
+                       help="Frames to profile with --profile (default: 300)")
     parser.add_argument("--verbose", "-v", action="store_true",
                        help="Enable verbose logging")
     
@@ -204,11 +522,34 @@ async def main():
         connection_id=args.connection_id,
         display_video=not args.no_display,
         save_frames=args.save_frames,
-        save_audio=args.save_audio
+        save_audio=args.save_audio,
+        sync_av=args.sync_av,
+        record_file=args.record,
+        video_codec=args.codec,
+        h264_profile=args.h264_profile,
+        capture_file=args.capture,
+        archive_file=args.archive,
+        archive_encoding=args.archive_encoding,
+        keyframe_request=None if args.keyframe_request == "off" else args.keyframe_request,
+        playout=args.playout,
+        jitter_buffer_packets=args.jitter_buffer,
+        detect_duplicates=args.detect_duplicates,
+        video_tracks=args.video_tracks,
+        decoder_threads=args.decoder_threads,
+        decoder_thread_type=args.decoder_thread_type,
+        watchdog_threshold=args.watchdog / 1000 if args.watchdog else None,
+        profile_file=args.profile,
+        profile_frames=args.profile_frames
     )
     
-    await client.run()
+    if args.replay:
+        await client.replay(args.replay, args.replay_speed)
+    else:
+        await client.run()
 
 
 if __name__ == "__main__":
+    # The loop policy has to be in place before asyncio.run creates the loop
+    if "--uvloop" in sys.argv[1:]:
+        install_uvloop()
     asyncio.run(main())
\ No newline at end of file
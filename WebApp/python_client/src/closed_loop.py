@@ -0,0 +1,141 @@
+"""
+Action-to-frame stepping for Unity Render Streaming Python client
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional
+
+import numpy as np
+
+
+@dataclass
+class StepResult:
+    """First frame received after an action settled"""
+    frame: np.ndarray
+    frame_count: int
+    action_time: float
+    frame_time: float
+    frames_waited: int
+
+    @property
+    def latency(self) -> float:
+        """Seconds from sending the action to receiving the frame"""
+        return self.frame_time - self.action_time
+
+
+class _Waiter:
+    __slots__ = ("future", "action_time", "not_before", "remaining", "predicate", "frames_seen")
+
+    def __init__(self, future, action_time, not_before, remaining, predicate):
+        self.future = future
+        self.action_time = action_time
+        self.not_before = not_before
+        self.remaining = remaining
+        self.predicate = predicate
+        self.frames_seen = 0
+
+
+class FrameWaiters:
+    """Resolves step futures from the frame stream, without polling"""
+
+    def __init__(self, history: int = 1000):
+        """
+        Initialize frame waiters
+
+        Args:
+            history: Number of recent step latencies kept for statistics
+        """
+        self.latencies: Deque[float] = deque(maxlen=history)
+        self._waiters: List[_Waiter] = []
+
+    @property
+    def pending(self) -> int:
+        return len(self._waiters)
+
+    def wait(self, action_time: Optional[float] = None, settle_frames: int = 1,
+             settle_time: float = 0.0,
+             predicate: Optional[Callable[[np.ndarray], bool]] = None) -> asyncio.Future:
+        """
+        Get a future for the first frame that satisfies a settle condition
+
+        Only frames delivered at least settle_time after action_time count;
+        of those, the settle_frames-th one matching predicate resolves the future.
+
+        Args:
+            action_time: time.monotonic() when the action was sent (default: now)
+            settle_frames: Frame to return among those counted (1 = first)
+            settle_time: Seconds after the action before frames count
+            predicate: Optional check a frame must pass to resolve the step
+
+        Returns:
+            asyncio.Future: Resolves to a StepResult
+        """
+        if action_time is None:
+            action_time = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(_Waiter(future, action_time, action_time + settle_time,
+                                     max(1, settle_frames), predicate))
+        return future
+
+    def push(self, frame: np.ndarray, frame_count: int, now: Optional[float] = None):
+        """
+        Offer a received frame to all pending steps
+
+        Args:
+            frame: Decoded frame; shared by every step it resolves
+            frame_count: Receiver frame number
+            now: Delivery time (default: time.monotonic())
+        """
+        if not self._waiters:
+            return
+        if now is None:
+            now = time.monotonic()
+
+        remaining = []
+        for waiter in self._waiters:
+            if waiter.future.done():
+                continue
+            if now < waiter.not_before:
+                remaining.append(waiter)
+                continue
+            waiter.frames_seen += 1
+            if waiter.predicate is not None:
+                try:
+                    matched = waiter.predicate(frame)
+                except Exception as e:
+                    waiter.future.set_exception(e)
+                    continue
+                if not matched:
+                    remaining.append(waiter)
+                    continue
+            waiter.remaining -= 1
+            if waiter.remaining > 0:
+                remaining.append(waiter)
+                continue
+
+            result = StepResult(frame, frame_count, waiter.action_time, now, waiter.frames_seen)
+            self.latencies.append(result.latency)
+            waiter.future.set_result(result)
+        self._waiters = remaining
+
+    def cancel_all(self):
+        """Cancel every pending step"""
+        for waiter in self._waiters:
+            waiter.future.cancel()
+        self._waiters = []
+
+    def latency_stats(self) -> Dict[str, float]:
+        """Summary of recent action-to-frame latencies in seconds"""
+        if not self.latencies:
+            return {"count": 0}
+        values = np.fromiter(self.latencies, dtype=np.float64)
+        return {
+            "count": len(values),
+            "mean": float(values.mean()),
+            "p50": float(np.percentile(values, 50)),
+            "p95": float(np.percentile(values, 95)),
+            "max": float(values.max()),
+        }
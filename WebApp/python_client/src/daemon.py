@@ -0,0 +1,492 @@
+"""
+Persistent streaming daemon for Unity Render Streaming Python client
+
+Short analysis jobs that start the client themselves pay for the
+interpreter, imports, signaling, ICE, DTLS and the first keyframe every
+time. The daemon keeps one warm session per configured Unity host and
+reconnects it when it drops. Jobs attach over a Unix domain socket to
+subscribe to frames, send input or step, then detach. Attaching takes
+milliseconds.
+
+Requests and responses are JSON lines. A frame is a JSON header line
+followed by its raw bytes. Each subscription uses its own connection.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import tempfile
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+import numpy as np
+
+from .frame_stream import DROP_OLDEST, ReceivedFrame
+from .stream_constraints import FrameRateLimiter
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "unity_render_streaming.sock")
+
+# InputRemotingSender methods jobs may call by name
+INPUT_ACTIONS = ("mouse_move", "mouse_button", "mouse_click", "mouse_scroll", "key_down", "key_up",
+                 "key_press", "type_text", "touch", "tap", "gamepad")
+
+# Reconnect backoff in seconds; a session that stayed up this long resets it
+_RETRY_MIN = 1.0
+_RETRY_MAX = 30.0
+_STABLE_SESSION = 30.0
+
+
+def _encode(message: Dict[str, Any]) -> bytes:
+    return json.dumps(message, default=str).encode() + b"\n"
+
+
+class DaemonSession:
+    """One warm client session to a Unity host, recreated whenever it ends"""
+
+    def __init__(self, name: str, server_url: str, client_factory: Callable[[str], Any]):
+        """
+        Initialize daemon session
+
+        Args:
+            name: Host name jobs refer to
+            server_url: Signaling server URL of the Unity host
+            client_factory: Creates a client for a server URL (a
+                UnityStreamingClient or any object with run(), shutdown_event,
+                frames(), step(), input_ready and input_sender)
+        """
+        self.name = name
+        self.server_url = server_url
+        self.client_factory = client_factory
+        self.client = None
+
+        # Counters
+        self.generation = 0
+        self.connected_since: Optional[float] = None
+
+        self._changed = asyncio.Condition()
+        self._stopping = False
+        self.logger = logging.getLogger(__name__)
+
+    async def _set_client(self, client):
+        async with self._changed:
+            self.client = client
+            if client is not None:
+                self.generation += 1
+            self._changed.notify_all()
+
+    async def next_client(self, after_generation: int = 0):
+        """Wait for a client newer than after_generation; None once the daemon stops"""
+        async with self._changed:
+            await self._changed.wait_for(
+                lambda: self._stopping or (self.client is not None and self.generation > after_generation))
+            return None if self._stopping else self.client
+
+    async def run(self, on_client: Optional[Callable[[], None]] = None):
+        """Keep a client connected until stop(), retrying with backoff"""
+        retry = _RETRY_MIN
+        while not self._stopping:
+            try:
+                client = self.client_factory(self.server_url)
+            except Exception as e:
+                self.logger.error(f"Error creating client for {self.name}: {e}")
+                return
+            if on_client:
+                on_client()
+            await self._set_client(client)
+            started = time.monotonic()
+            self.connected_since = started
+            try:
+                await client.run()
+            except Exception as e:
+                self.logger.error(f"Session to {self.name} ({self.server_url}) failed: {e}")
+            finally:
+                self.connected_since = None
+                await self._set_client(None)
+            if self._stopping:
+                break
+            if time.monotonic() - started > _STABLE_SESSION:
+                retry = _RETRY_MIN
+            self.logger.info(f"Session to {self.name} ended, reconnecting in {retry:.0f}s")
+            await asyncio.sleep(retry)
+            retry = min(retry * 2, _RETRY_MAX)
+
+    async def stop(self):
+        """Shut the current client down and stop reconnecting"""
+        async with self._changed:
+            self._stopping = True
+            self._changed.notify_all()
+        if self.client is not None:
+            self.client.shutdown_event.set()
+
+    def info(self) -> Dict[str, Any]:
+        """Connection state, uptime and frame count of the session"""
+        client = self.client
+        pc = getattr(client, "pc", None)
+        video_receiver = getattr(client, "video_receiver", None)
+        if client is None:
+            state = "reconnecting"
+        else:
+            state = pc.connectionState if pc is not None else "connecting"
+        return {
+            "server": self.server_url,
+            "state": state,
+            "sessions": self.generation,
+            "uptime_s": time.monotonic() - self.connected_since if self.connected_since else 0.0,
+            "frames": video_receiver.frame_count if video_receiver else 0,
+            "input_ready": bool(client is not None and client.input_ready.is_set()),
+        }
+
+
+class StreamingDaemon:
+    """Serves warm Unity sessions to jobs over a Unix domain socket"""
+
+    def __init__(self, hosts: Dict[str, str], client_factory: Callable[[str], Any],
+                 socket_path: str = DEFAULT_SOCKET, jpeg_quality: int = 90):
+        """
+        Initialize streaming daemon
+
+        Args:
+            hosts: Host name -> signaling server URL; the first is the default
+            client_factory: Creates a client for a server URL (see DaemonSession)
+            socket_path: Unix domain socket jobs attach to
+            jpeg_quality: JPEG quality for subscriptions asking for jpeg frames
+        """
+        if not hosts:
+            raise ValueError("The daemon needs at least one host")
+        self.socket_path = socket_path
+        self.jpeg_quality = jpeg_quality
+        self.sessions = {name: DaemonSession(name, url, client_factory) for name, url in hosts.items()}
+        self.default_host = next(iter(hosts))
+
+        # Counters
+        self.attached = 0
+        self.connections_served = 0
+
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._stopped = asyncio.Event()
+        self.logger = logging.getLogger(__name__)
+
+    def _install_signal_handlers(self):
+        # Clients install their own Ctrl+C handler; the daemon's takes
+        # precedence so a signal stops the daemon instead of one session
+        loop = asyncio.get_running_loop()
+
+        def handler(signum, frame):
+            loop.call_soon_threadsafe(self.stop)
+
+        signal.signal(signal.SIGINT, handler)
+        if hasattr(signal, "SIGTERM"):
+            signal.signal(signal.SIGTERM, handler)
+
+    async def _claim_socket(self):
+        """Remove a stale socket file, refusing to replace a running daemon"""
+        if not os.path.exists(self.socket_path):
+            return
+        try:
+            _, writer = await asyncio.open_unix_connection(self.socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(self.socket_path)
+            return
+        writer.close()
+        raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+
+    async def serve(self):
+        """Connect to every host and serve jobs until stop()"""
+        await self._claim_socket()
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        self._install_signal_handlers()
+        tasks = [asyncio.create_task(session.run(self._install_signal_handlers))
+                 for session in self.sessions.values()]
+        hosts = ", ".join(f"{name}={session.server_url}" for name, session in self.sessions.items())
+        self.logger.info(f"🛰️ Daemon listening on {self.socket_path} for {hosts}")
+        try:
+            await self._stopped.wait()
+        finally:
+            self._server.close()
+            for session in self.sessions.values():
+                await session.stop()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.logger.info(f"Daemon stopped after {self.connections_served} connections")
+
+    def stop(self):
+        """Stop serving; serve() shuts the sessions down and returns"""
+        self._stopped.set()
+
+    def _session(self, request: Dict[str, Any]) -> DaemonSession:
+        name = request.get("host") or self.default_host
+        session = self.sessions.get(name)
+        if session is None:
+            raise ValueError(f"Unknown host: {name}")
+        return session
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer requests from one attached job until it detaches"""
+        self.attached += 1
+        self.connections_served += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    operation = request.get("op")
+                    if operation == "subscribe":
+                        # The connection carries frames until the subscription ends
+                        await self._subscribe(request, writer)
+                        break
+                    if operation == "step":
+                        await self._step(request, writer)
+                        continue
+                    response = await self._handle_request(operation, request)
+                except ConnectionError:
+                    raise
+                except Exception as e:
+                    response = {"ok": False, "error": str(e)}
+                writer.write(_encode(response))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        except Exception as e:
+            self.logger.error(f"Error serving attached job: {e}")
+        finally:
+            self.attached -= 1
+            writer.close()
+
+    async def _handle_request(self, operation: Optional[str], request: Dict[str, Any]) -> Dict[str, Any]:
+        if operation == "hosts":
+            return {"ok": True, "default": self.default_host,
+                    "hosts": {name: session.info() for name, session in self.sessions.items()}}
+        if operation == "stats":
+            client = self._session(request).client
+            if client is None:
+                raise RuntimeError("Session is reconnecting")
+            return {"ok": True, "stats": client.pipeline_stats(request.get("track", 0))}
+        if operation == "input":
+            client = self._session(request).client
+            self._send_input(client, request)
+            return {"ok": True}
+        raise ValueError(f"Unknown operation: {operation}")
+
+    @staticmethod
+    def _action(request: Dict[str, Any]) -> Optional[Callable]:
+        """Input action of a request as a callable taking the InputRemotingSender"""
+        action = request.get("action")
+        if action is None:
+            return None
+        if action not in INPUT_ACTIONS:
+            raise ValueError(f"Unknown input action: {action}")
+        args = request.get("args", [])
+        kwargs = request.get("kwargs", {})
+        return lambda sender: getattr(sender, action)(*args, **kwargs)
+
+    def _send_input(self, client, request: Dict[str, Any]):
+        if client is None or not client.input_ready.is_set():
+            raise RuntimeError("Input channel is not open")
+        action = self._action(request)
+        if action is None:
+            raise ValueError("Missing input action")
+        action(client.input_sender)
+        client.input_sender.flush()
+
+    async def _frame_message(self, image: np.ndarray, frame_count: int, received_time: float,
+                             duplicate: bool, frame_format: str) -> bytes:
+        """Header line and bytes of a frame in the requested format"""
+        from .sinks import BGR24, convert_frame
+
+        if frame_format != BGR24:
+            # Encoding and channel swaps cost milliseconds; keep them off the loop
+            image = await asyncio.get_running_loop().run_in_executor(
+                None, convert_frame, image, frame_format, self.jpeg_quality)
+        header = {"frame": frame_count, "time": received_time, "duplicate": duplicate,
+                  "format": frame_format, "shape": list(image.shape), "dtype": str(image.dtype),
+                  "size": image.nbytes}
+        return _encode(header) + image.tobytes()
+
+    async def _subscribe(self, request: Dict[str, Any], writer: asyncio.StreamWriter):
+        """Stream frames of a track, following the session across reconnects"""
+        from .sinks import BGR24, FORMATS
+
+        session = self._session(request)
+        track = request.get("track", 0)
+        frame_format = request.get("format", BGR24)
+        if frame_format not in FORMATS:
+            raise ValueError(f"Unknown frame format: {frame_format}")
+        count = request.get("count")
+        limiter = FrameRateLimiter(request.get("max_rate"))
+        writer.write(_encode({"ok": True}))
+
+        sent = 0
+        generation = 0
+        while count is None or sent < count:
+            client = await session.next_client(generation)
+            if client is None:
+                break
+            generation = session.generation
+            frames = client.frames(1, DROP_OLDEST, track)
+            try:
+                async for frame in frames:
+                    if not limiter.accept(frame.received_time):
+                        continue
+                    writer.write(await self._frame_message(frame.image, frame.frame_count, frame.received_time,
+                                                           frame.duplicate, frame_format))
+                    # A slow job only holds the newest frame back, never the session
+                    await writer.drain()
+                    sent += 1
+                    if count is not None and sent >= count:
+                        break
+            finally:
+                await frames.aclose()
+        writer.write(_encode({"end": True, "frames": sent}))
+        await writer.drain()
+
+    async def _step(self, request: Dict[str, Any], writer: asyncio.StreamWriter):
+        """Send an action and answer with the first frame reflecting it"""
+        from .sinks import BGR24
+
+        client = self._session(request).client
+        if client is None:
+            raise RuntimeError("Session is reconnecting")
+        result = await client.step(self._action(request), request.get("settle_frames", 1),
+                                   request.get("settle_time", 0.0), timeout=request.get("timeout", 5.0))
+        writer.write(_encode({"ok": True, "latency": result.latency, "frames_waited": result.frames_waited}))
+        writer.write(await self._frame_message(result.frame, result.frame_count, result.frame_time, False,
+                                               request.get("format", BGR24)))
+        await writer.drain()
+
+
+class DaemonClient:
+    """Attaches a job to a running StreamingDaemon: async with DaemonClient() as daemon"""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET):
+        """
+        Initialize daemon client
+
+        Args:
+            socket_path: Unix domain socket of the daemon
+        """
+        self.socket_path = socket_path
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "DaemonClient":
+        await self.attach()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.detach()
+
+    async def attach(self):
+        """Open the control connection"""
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+
+    async def detach(self):
+        """Close the control connection; the daemon's sessions keep running"""
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+            self._reader = self._writer = None
+
+    @staticmethod
+    async def _read_response(reader: asyncio.StreamReader) -> Dict[str, Any]:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Daemon closed the connection")
+        response = json.loads(line)
+        if not response.get("ok", True):
+            raise RuntimeError(f"Daemon request failed: {response.get('error')}")
+        return response
+
+    @staticmethod
+    async def _read_frame(reader: asyncio.StreamReader, header: Dict[str, Any]) -> ReceivedFrame:
+        data = await reader.readexactly(header["size"])
+        image = np.frombuffer(data, np.dtype(header["dtype"])).reshape(header["shape"])
+        return ReceivedFrame(image, header["frame"], header["time"], header["duplicate"])
+
+    async def _request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        await self.attach()
+        async with self._lock:
+            self._writer.write(_encode(message))
+            await self._writer.drain()
+            return await self._read_response(self._reader)
+
+    async def hosts(self) -> Dict[str, Dict[str, Any]]:
+        """State of each host session (see DaemonSession.info)"""
+        return (await self._request({"op": "hosts"}))["hosts"]
+
+    async def stats(self, host: Optional[str] = None, track: int = 0) -> Dict[str, Any]:
+        """pipeline_stats() of a host's session"""
+        return (await self._request({"op": "stats", "host": host, "track": track}))["stats"]
+
+    async def send_input(self, action: str, *args, host: Optional[str] = None, **kwargs):
+        """
+        Call an InputRemotingSender method on a host's session
+
+        Example: await daemon.send_input("mouse_click", 640, 360)
+        """
+        await self._request({"op": "input", "host": host, "action": action, "args": args, "kwargs": kwargs})
+
+    async def step(self, action: Optional[str] = None, *args, host: Optional[str] = None,
+                   settle_frames: int = 1, settle_time: float = 0.0, timeout: float = 5.0,
+                   frame_format: str = "bgr24", **kwargs) -> ReceivedFrame:
+        """Send an input action (or none) and get the first frame received after it settled"""
+        message = {"op": "step", "host": host, "action": action, "args": args, "kwargs": kwargs,
+                   "settle_frames": settle_frames, "settle_time": settle_time, "timeout": timeout,
+                   "format": frame_format}
+        await self.attach()
+        async with self._lock:
+            self._writer.write(_encode(message))
+            await self._writer.drain()
+            await self._read_response(self._reader)
+            header = json.loads(await self._reader.readline())
+            return await self._read_frame(self._reader, header)
+
+    async def frames(self, host: Optional[str] = None, track: int = 0, frame_format: str = "bgr24",
+                     max_rate: Optional[float] = None,
+                     count: Optional[int] = None) -> AsyncIterator[ReceivedFrame]:
+        """
+        Iterate over a host's frames on a dedicated connection
+
+        Only the newest frame is kept while the job is busy. jpeg and png
+        frames arrive as 1-D encoded buffers.
+
+        Args:
+            host: Host name (default: the daemon's first host)
+            track: Video track to follow
+            frame_format: bgr24, rgb24, gray, jpeg or png
+            max_rate: Most frames per second to receive
+            count: Frames to receive before the iteration ends (None = until detached)
+        """
+        reader, writer = await asyncio.open_unix_connection(self.socket_path)
+        try:
+            writer.write(_encode({"op": "subscribe", "host": host, "track": track, "format": frame_format,
+                                  "max_rate": max_rate, "count": count}))
+            await writer.drain()
+            await self._read_response(reader)
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                header = json.loads(line)
+                if header.get("end"):
+                    break
+                yield await self._read_frame(reader, header)
+        finally:
+            writer.close()
+
+    async def grab(self, host: Optional[str] = None, track: int = 0,
+                   frame_format: str = "bgr24") -> ReceivedFrame:
+        """Next frame of a host"""
+        async for frame in self.frames(host, track, frame_format, count=1):
+            return frame
+        raise ConnectionError("Daemon ended the subscription without a frame")
@@ -0,0 +1,56 @@
+"""
+Decoder threading for Unity Render Streaming Python client
+
+aiortc opens its H.264 and VP8 decoders with FFmpeg's defaults: slice
+threading only. Unity's hardware encoders usually put each frame in a
+single slice, so that leaves one core decoding 1080p/4K streams. Frame
+threading decodes several frames at once, at the cost of one frame of
+latency per extra thread.
+"""
+
+import os
+from dataclasses import dataclass
+
+# FFmpeg thread types: slice (no added latency, needs multi-slice streams),
+# frame (works on any stream, adds latency) or auto (both where supported)
+THREAD_TYPES = ("slice", "frame", "auto")
+
+
+@dataclass
+class DecoderConfig:
+    """Threading applied to the video decoders of a session"""
+    threads: int = 0
+    thread_type: str = "slice"
+
+    def __post_init__(self):
+        if self.threads < 0:
+            raise ValueError(f"Decoder thread count must be 0 (one per core) or more: {self.threads}")
+        if self.thread_type not in THREAD_TYPES:
+            raise ValueError(f"Unknown decoder thread type: {self.thread_type}")
+
+    @property
+    def effective_threads(self) -> int:
+        """Threads the decoder will use (0 means one per CPU core)"""
+        return self.threads or os.cpu_count() or 1
+
+    @property
+    def frame_delay(self) -> int:
+        """Frames of added decode latency (frame threading holds threads - 1 frames)"""
+        return self.effective_threads - 1 if self.thread_type != "slice" else 0
+
+    def apply(self, decoder) -> bool:
+        """
+        Configure an aiortc video decoder before it decodes its first frame
+
+        Args:
+            decoder: aiortc Decoder wrapping a PyAV codec context (H264Decoder, Vp8Decoder)
+
+        Returns:
+            bool: True if the decoder was configured
+        """
+        codec = getattr(decoder, "codec", None)
+        if codec is None or codec.type != "video" or codec.is_open:
+            return False
+        codec.thread_count = self.threads
+        codec.thread_type = self.thread_type.upper()
+        return True
@@ -0,0 +1,107 @@
+"""
+Duplicate frame detection for Unity Render Streaming Python client
+
+Unity keeps streaming when the scene is static, and the encoder then sends
+frames that decode to the same picture. Comparing a subsampled view of the
+decoded luma plane with the last distinct frame costs tens of microseconds
+at 720p, so duplicates can skip BGR conversion, transforms and the sinks
+that opted out of them.
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+class DuplicateDetector:
+    """Flags decoded frames whose luma matches the last distinct frame"""
+
+    def __init__(self, step: int = 4, tolerance: float = 0.0):
+        """
+        Initialize duplicate detector
+
+        Args:
+            step: Compare every step-th row and column (1 = every pixel)
+            tolerance: Largest mean absolute luma difference still counted as
+                a duplicate (0 = identical samples only)
+        """
+        self.step = step
+        self.tolerance = tolerance
+
+        # Counters
+        self.duplicates = 0
+        self.frozen_seconds_total = 0.0
+        self.frozen_seconds_max = 0.0
+
+        # Arrival of the last distinct frame while duplicates follow it
+        self.frozen_since: Optional[float] = None
+
+        self._reference: Optional[np.ndarray] = None
+        self._reference_time = 0.0
+
+    def _sample(self, frame) -> Optional[np.ndarray]:
+        """Subsampled luma (or first plane) of a decoded frame, as a view"""
+        step = self.step
+        if isinstance(frame, np.ndarray):
+            return frame[::step, ::step]
+        planes = getattr(frame, "planes", None)
+        if not planes:
+            return None
+        plane = planes[0]
+        rows = np.frombuffer(plane, np.uint8).reshape(plane.height, plane.line_size)
+        return rows[::step, :plane.width:step]
+
+    def is_duplicate(self, frame) -> bool:
+        """
+        Compare a decoded frame with the last distinct one
+
+        Args:
+            frame: av.VideoFrame (luma plane is sampled) or ndarray
+
+        Returns:
+            bool: True if the frame shows the same picture
+        """
+        now = time.monotonic()
+        sample = self._sample(frame)
+        reference = self._reference
+        if sample is not None and reference is not None and sample.shape == reference.shape:
+            if self.tolerance:
+                same = np.abs(sample.astype(np.int16) - reference).mean() <= self.tolerance
+            else:
+                same = np.array_equal(sample, reference)
+            if same:
+                self.duplicates += 1
+                if self.frozen_since is None:
+                    self.frozen_since = self._reference_time
+                return True
+
+        # Distinct frame: it becomes the reference, so slow fades are not
+        # swallowed by comparing each frame only with its predecessor
+        if self.frozen_since is not None:
+            frozen = now - self.frozen_since
+            self.frozen_seconds_total += frozen
+            self.frozen_seconds_max = max(self.frozen_seconds_max, frozen)
+            self.frozen_since = None
+        self._reference = None if sample is None else sample.copy()
+        self._reference_time = now
+        return False
+
+    def reset(self):
+        """Forget the reference frame, e.g. after a frame failed to convert"""
+        self._reference = None
+
+    @property
+    def frozen_seconds(self) -> float:
+        """How long the current picture has been repeated (0 if it is changing)"""
+        return time.monotonic() - self.frozen_since if self.frozen_since is not None else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Duplicate count and frozen-stream durations in milliseconds"""
+        frozen = self.frozen_seconds
+        return {
+            "duplicates": self.duplicates,
+            "frozen_ms": frozen * 1000,
+            "frozen_ms_max": max(self.frozen_seconds_max, frozen) * 1000,
+            "frozen_ms_total": (self.frozen_seconds_total + frozen) * 1000,
+        }
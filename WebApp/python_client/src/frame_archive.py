@@ -0,0 +1,280 @@
+"""
+Memory-mapped frame archive for Unity Render Streaming Python client
+
+One file holds a header, a fixed-size index and the frame data, sized for
+the full capacity up front, so appending a frame is a memcpy and reading
+one is an index lookup plus a zero-copy NumPy view. The file is sparse
+unless preallocated, and closing it trims the unused capacity. Readers can
+open the archive while a capture is still writing to it; a frame becomes
+visible once the header count includes it.
+"""
+
+import logging
+import os
+import threading
+from typing import Iterator, Optional
+
+import numpy as np
+
+MAGIC = b"URSFRM1\0"
+VERSION = 1
+
+# Frame encodings
+RAW = 0
+JPEG = 1
+PNG = 2
+ENCODINGS = {"raw": RAW, "jpeg": JPEG, "png": PNG}
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("index_entry_size", "<u4"),
+    ("max_frames", "<u8"),
+    ("data_offset", "<u8"),
+    ("data_capacity", "<u8"),
+    ("count", "<u8"),
+    ("data_end", "<u8"),
+    ("reserved", "<u8"),
+])
+
+INDEX_DTYPE = np.dtype([
+    ("frame_number", "<i8"),
+    ("timestamp", "<f8"),
+    ("offset", "<u8"),
+    ("length", "<u8"),
+    ("height", "<u4"),
+    ("width", "<u4"),
+    ("channels", "<u2"),
+    ("encoding", "<u2"),
+    ("reserved", "<u4"),
+])
+
+# Frame data starts on cache-line boundaries
+DATA_ALIGNMENT = 64
+
+
+class FrameArchive:
+    """Append-only frame store with O(1) random access"""
+
+    def __init__(self, path: str, mode: str = "r", max_frames: int = 100_000,
+                 capacity: int = 8 << 30, encoding: str = "raw", jpeg_quality: int = 90,
+                 preallocate: bool = False):
+        """
+        Initialize frame archive
+
+        Args:
+            path: Archive file path
+            mode: 'w' to create (overwrites), 'a' to append to an existing
+                archive, 'r' to read
+            max_frames: Index size when creating
+            capacity: Maximum bytes of frame data when creating or appending
+            encoding: 'raw' (zero-copy reads), 'jpeg' or 'png' when writing
+            jpeg_quality: Quality for 'jpeg' encoding
+            preallocate: Reserve the whole capacity on disk when creating, so
+                appends never hit ENOSPC (default: sparse file)
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown frame encoding: {encoding}")
+        self.path = path
+        self.mode = mode
+        self.encoding = ENCODINGS[encoding]
+        self.jpeg_quality = jpeg_quality
+        self.frames_dropped = 0
+        self.closed = False
+        # Frame handlers append from executor threads; close() must not trim under them
+        self._lock = threading.Lock()
+
+        self.logger = logging.getLogger(__name__)
+
+        if mode == "w":
+            self._create(max_frames, capacity, preallocate)
+        elif mode == "a":
+            self._reopen()
+        elif mode != "r":
+            raise ValueError(f"Unknown archive mode: {mode}")
+
+        self._memmap = np.memmap(path, dtype=np.uint8, mode="r" if mode == "r" else "r+")
+        self._header = self._memmap[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0:1]
+        if bytes(self._header["magic"][0]) != MAGIC.rstrip(b"\0"):
+            raise ValueError(f"Not a frame archive: {path}")
+
+        max_frames = int(self._header["max_frames"][0])
+        index_end = HEADER_DTYPE.itemsize + max_frames * INDEX_DTYPE.itemsize
+        self._index = self._memmap[HEADER_DTYPE.itemsize:index_end].view(INDEX_DTYPE)
+        data_offset = int(self._header["data_offset"][0])
+        # A closed archive is trimmed to its frames, so the data may end before the capacity
+        self._data = self._memmap[data_offset:data_offset + int(self._header["data_capacity"][0])]
+
+    def _create(self, max_frames: int, capacity: int, preallocate: bool):
+        """Create the archive file at full size and write its header"""
+        index_end = HEADER_DTYPE.itemsize + max_frames * INDEX_DTYPE.itemsize
+        data_offset = -(-index_end // DATA_ALIGNMENT) * DATA_ALIGNMENT
+        total_size = data_offset + capacity
+
+        with open(self.path, "wb") as f:
+            header = np.zeros(1, dtype=HEADER_DTYPE)
+            header["magic"] = MAGIC
+            header["version"] = VERSION
+            header["index_entry_size"] = INDEX_DTYPE.itemsize
+            header["max_frames"] = max_frames
+            header["data_offset"] = data_offset
+            header["data_capacity"] = capacity
+            f.write(header.tobytes())
+            if preallocate:
+                try:
+                    # Reserve the blocks now so appends never hit ENOSPC or fragment
+                    os.posix_fallocate(f.fileno(), 0, total_size)
+                except (AttributeError, OSError):
+                    f.truncate(total_size)
+            else:
+                # Sparse: blocks are allocated as frames are written
+                f.truncate(total_size)
+
+        self.logger.info(f"Created frame archive {self.path} "
+                         f"({max_frames} frames, up to {capacity / (1 << 30):.1f} GiB)")
+
+    def _reopen(self):
+        """Grow a trimmed archive back to its capacity before appending"""
+        header = np.fromfile(self.path, dtype=HEADER_DTYPE, count=1)
+        if len(header) and bytes(header["magic"][0]) == MAGIC.rstrip(b"\0"):
+            total_size = int(header["data_offset"][0]) + int(header["data_capacity"][0])
+            if os.path.getsize(self.path) < total_size:
+                os.truncate(self.path, total_size)
+
+    def _trim(self):
+        """Give the unused capacity back to the filesystem"""
+        used_size = int(self._header["data_offset"][0]) + self.bytes_used
+        try:
+            os.truncate(self.path, used_size)
+        except OSError as e:
+            # Windows cannot shrink a file that is still mapped
+            self.logger.debug(f"Could not trim frame archive {self.path}: {e}")
+
+    def __len__(self) -> int:
+        return int(self._header["count"][0])
+
+    @property
+    def bytes_used(self) -> int:
+        return int(self._header["data_end"][0])
+
+    @property
+    def index(self) -> np.ndarray:
+        """Index entries of the stored frames (a view; do not modify)"""
+        return self._index[:len(self)]
+
+    def append(self, image: np.ndarray, frame_number: int, timestamp: float) -> bool:
+        """
+        Store a frame
+
+        Args:
+            image: HxW or HxWxC uint8 frame
+            frame_number: Receiver frame number
+            timestamp: Capture time in seconds
+
+        Returns:
+            bool: False if the archive is full or closed
+        """
+        with self._lock:
+            if self.closed:
+                return False
+            return self._append(image, frame_number, timestamp)
+
+    def _append(self, image: np.ndarray, frame_number: int, timestamp: float) -> bool:
+        count = len(self)
+        if count >= len(self._index):
+            self.frames_dropped += 1
+            return False
+
+        if self.encoding == RAW:
+            payload = np.ascontiguousarray(image).reshape(-1).view(np.uint8)
+        else:
+            import cv2
+            extension = ".jpg" if self.encoding == JPEG else ".png"
+            params = ([cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality] if self.encoding == JPEG
+                      else [cv2.IMWRITE_PNG_COMPRESSION, 1])
+            ok, encoded = cv2.imencode(extension, image, params)
+            if not ok:
+                self.frames_dropped += 1
+                return False
+            payload = encoded.reshape(-1)
+
+        offset = self.bytes_used
+        end = offset + payload.size
+        if end > self._data.size:
+            self.frames_dropped += 1
+            if self.frames_dropped == 1:
+                self.logger.warning(f"Frame archive {self.path} is full")
+            return False
+
+        self._data[offset:end] = payload
+        entry = self._index[count]
+        entry["frame_number"] = frame_number
+        entry["timestamp"] = timestamp
+        entry["offset"] = offset
+        entry["length"] = payload.size
+        entry["height"] = image.shape[0]
+        entry["width"] = image.shape[1]
+        entry["channels"] = image.shape[2] if image.ndim == 3 else 0
+        entry["encoding"] = self.encoding
+
+        # Publish the entry last so concurrent readers never see a partial frame
+        self._header["data_end"] = -(-end // DATA_ALIGNMENT) * DATA_ALIGNMENT
+        self._header["count"] = count + 1
+        return True
+
+    def append_frame(self, frame):
+        """Frame handler for client.add_frame_handler() (takes a ReceivedFrame)"""
+        self.append(frame.image, frame.frame_count, frame.received_time)
+
+    def __getitem__(self, position: int) -> np.ndarray:
+        """
+        Get a stored frame by position
+
+        Raw frames are returned as zero-copy (read-only in 'r' mode) views
+        into the archive; encoded frames are decoded.
+        """
+        count = len(self)
+        if position < 0:
+            position += count
+        if not 0 <= position < count:
+            raise IndexError(f"Frame {position} out of range ({count} frames)")
+
+        entry = self._index[position]
+        data = self._data[int(entry["offset"]):int(entry["offset"]) + int(entry["length"])]
+        if entry["encoding"] != RAW:
+            import cv2
+            return cv2.imdecode(data, cv2.IMREAD_UNCHANGED)
+
+        shape = (int(entry["height"]), int(entry["width"]))
+        if entry["channels"]:
+            shape += (int(entry["channels"]),)
+        return data.reshape(shape)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for position in range(len(self)):
+            yield self[position]
+
+    def find(self, frame_number: int) -> Optional[int]:
+        """Position of a frame number (frame numbers increase with position)"""
+        numbers = self._index["frame_number"][:len(self)]
+        position = int(np.searchsorted(numbers, frame_number))
+        if position < len(numbers) and numbers[position] == frame_number:
+            return position
+        return None
+
+    def flush(self):
+        """Write dirty pages to disk"""
+        if self.mode != "r":
+            self._memmap.flush()
+
+    def close(self):
+        """Flush to disk and trim unused capacity; the mapping is released with the last frame view"""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.flush()
+            if self.mode != "r":
+                self._trim()
+        self.logger.info(f"Closed frame archive {self.path} ({len(self)} frames, "
+                         f"{self.bytes_used / (1 << 20):.1f} MiB, {self.frames_dropped} dropped)")
@@ -0,0 +1,173 @@
+"""
+Pull-based frame subscriptions for Unity Render Streaming Python client
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, List, Optional, Union
+
+import numpy as np
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+DROP_POLICIES = [DROP_OLDEST, DROP_NEWEST]
+
+
+@dataclass
+class ReceivedFrame:
+    """Decoded frame delivered to subscribers"""
+    image: np.ndarray
+    frame_count: int
+    received_time: float
+    # Same picture as the previous frame (with duplicate detection enabled)
+    duplicate: bool = False
+
+
+class FrameSubscription:
+    """Bounded per-subscriber frame queue, consumed with async for"""
+
+    def __init__(self, maxsize: int = 1, policy: str = DROP_OLDEST):
+        """
+        Initialize frame subscription
+
+        Args:
+            maxsize: Frames buffered for this subscriber
+            policy: What to discard when full: DROP_OLDEST keeps the newest
+                frames, DROP_NEWEST keeps the backlog and skips new arrivals
+        """
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.frames_dropped = 0
+        self.closed = False
+
+        self._frames: Deque[ReceivedFrame] = deque()
+        self._waiter: Optional[asyncio.Future] = None
+
+    def put(self, frame: ReceivedFrame):
+        """Offer a frame; never blocks the receiver"""
+        if self.closed:
+            return
+        if len(self._frames) >= self.maxsize:
+            self.frames_dropped += 1
+            if self.policy == DROP_NEWEST:
+                return
+            self._frames.popleft()
+        self._frames.append(frame)
+        self._wake()
+
+    def close(self):
+        """End iteration once buffered frames are consumed"""
+        self.closed = True
+        self._wake()
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ReceivedFrame:
+        while not self._frames:
+            if self.closed:
+                raise StopAsyncIteration
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self._frames.popleft()
+
+
+FrameHandler = Callable[[ReceivedFrame], Union[None, Awaitable[None]]]
+
+
+class FrameHub:
+    """Fans received frames out to independent subscribers"""
+
+    def __init__(self):
+        """Initialize frame hub"""
+        self.subscriptions: List[FrameSubscription] = []
+        self._handler_tasks: List[asyncio.Task] = []
+        self.logger = logging.getLogger(__name__)
+
+    def publish(self, image: np.ndarray, frame_count: int, duplicate: bool = False):
+        """
+        Deliver a frame to every subscriber
+
+        The array is shared, so subscribers must copy it before modifying it.
+        """
+        if not self.subscriptions:
+            return
+        frame = ReceivedFrame(image, frame_count, time.monotonic(), duplicate)
+        for subscription in self.subscriptions:
+            subscription.put(frame)
+
+    def subscribe(self, maxsize: int = 1, policy: str = DROP_OLDEST) -> FrameSubscription:
+        """Create a subscription; call unsubscribe() when done"""
+        subscription = FrameSubscription(maxsize, policy)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: FrameSubscription):
+        subscription.close()
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+
+    async def frames(self, maxsize: int = 1, policy: str = DROP_OLDEST):
+        """
+        Iterate over received frames
+
+        Args:
+            maxsize: Frames buffered while the consumer is busy
+            policy: DROP_OLDEST or DROP_NEWEST
+
+        Yields:
+            ReceivedFrame: Next frame for this subscriber
+        """
+        subscription = self.subscribe(maxsize, policy)
+        try:
+            async for frame in subscription:
+                yield frame
+        finally:
+            self.unsubscribe(subscription)
+
+    def add_handler(self, handler: FrameHandler, maxsize: int = 1,
+                    policy: str = DROP_OLDEST) -> asyncio.Task:
+        """
+        Run a handler on its own subscription without blocking reception
+
+        Coroutine functions are awaited; plain functions run in the default
+        executor so slow synchronous work stays off the event loop.
+
+        Returns:
+            asyncio.Task: Consumer task; cancel it to remove the handler
+        """
+        task = asyncio.create_task(self._run_handler(handler, maxsize, policy))
+        self._handler_tasks.append(task)
+        return task
+
+    async def _run_handler(self, handler: FrameHandler, maxsize: int, policy: str):
+        loop = asyncio.get_running_loop()
+        is_async = asyncio.iscoroutinefunction(handler)
+        async for frame in self.frames(maxsize, policy):
+            try:
+                if is_async:
+                    await handler(frame)
+                else:
+                    await loop.run_in_executor(None, handler, frame)
+            except Exception as e:
+                self.logger.error(f"Error in frame handler: {e}")
+
+    def close(self):
+        """End all subscriptions and handler tasks"""
+        for subscription in list(self.subscriptions):
+            self.unsubscribe(subscription)
+        for task in self._handler_tasks:
+            task.cancel()
+        self._handler_tasks = []
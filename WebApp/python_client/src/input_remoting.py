@@ -0,0 +1,476 @@
+"""
+Input System remoting for Unity Render Streaming Python client
+
+Speaks the binary protocol of the browser client (WebApp/client/src/
+inputremoting.js, inputdevice.js) and Unity's InputRemoting: every message
+is a <participant, type, length> header followed by the payload, and a
+NewEvents payload is a sequence of InputEvents, each padded to 4 bytes.
+"""
+
+import asyncio
+import json
+import logging
+import struct
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence, Tuple, Union
+
+
+class MessageType:
+    """InputRemoting message types"""
+    CONNECT = 0
+    DISCONNECT = 1
+    NEW_LAYOUT = 2
+    NEW_DEVICE = 3
+    NEW_EVENTS = 4
+    REMOVE_DEVICE = 5
+    REMOVE_LAYOUT = 6
+    CHANGE_USAGES = 7
+    START_SENDING = 8
+    STOP_SENDING = 9
+
+
+def four_cc(code: str) -> int:
+    """Pack a four character code the way Unity's FourCC does"""
+    return (ord(code[0]) << 24) | (ord(code[1]) << 16) | (ord(code[2]) << 8) | ord(code[3])
+
+
+STATE_EVENT = four_cc("STAT")
+TEXT_EVENT = four_cc("TEXT")
+MOUSE_FORMAT = four_cc("MOUS")
+KEYBOARD_FORMAT = four_cc("KEYS")
+TOUCH_FORMAT = four_cc("TOUC")
+GAMEPAD_FORMAT = four_cc("GPAD")
+
+# participant id, type, length
+MESSAGE_HEADER = struct.Struct("<III")
+# type, sizeInBytes, deviceId, time, eventId (+2 bytes to the 20 byte InputEvent)
+EVENT_HEADER = struct.Struct("<ihhdh2x")
+STATE_FORMAT = struct.Struct("<i")
+TEXT_CHARACTER = struct.Struct("<i")
+# position, delta, scroll, buttons, displayIndex, clickCount
+MOUSE_STATE = struct.Struct("<6fHHH")
+# touchId, position, delta, pressure, radius, phase, tapCount, displayIndex,
+# flags, padding, startTime, startPosition
+TOUCH_STATE = struct.Struct("<i7f4Bidff")
+# buttons, leftStick, rightStick, leftTrigger, rightTrigger
+GAMEPAD_STATE = struct.Struct("<I6f")
+
+KEY_COUNT = 110
+KEYBOARD_STATE_SIZE = (KEY_COUNT + 7) >> 3
+
+# Keyboard bit indices by KeyboardEvent.code (WebApp/client/src/keymap.js)
+KEYMAP: Dict[str, int] = {
+    "Space": 1, "Enter": 2, "Tab": 3, "Backquote": 4, "Quote": 5, "Semicolon": 6, "Comma": 7,
+    "Period": 8, "Slash": 9, "Backslash": 10, "BracketLeft": 11, "BracketRight": 12,
+    "Minus": 13, "Equal": 14, "KeyA": 15, "KeyB": 16, "KeyC": 17, "KeyD": 18, "KeyE": 19,
+    "KeyF": 20, "KeyG": 21, "KeyH": 22, "KeyI": 23, "KeyJ": 24, "KeyK": 25, "KeyL": 26,
+    "KeyM": 27, "KeyN": 28, "KeyO": 29, "KeyP": 30, "KeyQ": 31, "KeyR": 32, "KeyS": 33,
+    "KeyT": 34, "KeyU": 35, "KeyV": 36, "KeyW": 37, "KeyX": 38, "KeyY": 39, "KeyZ": 40,
+    "Digit1": 41, "Digit2": 42, "Digit3": 43, "Digit4": 44, "Digit5": 45, "Digit6": 46,
+    "Digit7": 47, "Digit8": 48, "Digit9": 49, "Digit0": 50, "ShiftLeft": 51, "ShiftRight": 52,
+    "AltLeft": 53, "AltRight": 54, "ControlLeft": 55, "ControlRight": 56, "MetaLeft": 57,
+    "MetaRight": 58, "ContextMenu": 59, "Escape": 60, "ArrowLeft": 61, "ArrowRight": 62,
+    "ArrowUp": 63, "ArrowDown": 64, "Backspace": 65, "PageDown": 66, "PageUp": 67, "Home": 68,
+    "End": 69, "Insert": 70, "Delete": 71, "CapsLock": 72, "NumLock": 73, "PrintScreen": 74,
+    "ScrollLock": 75, "Pause": 76, "NumpadEnter": 77, "NumpadDivide": 78, "NumpadMultiply": 79,
+    "NumpadAdd": 80, "NumpadSubtract": 81, "NumpadDecimal": 82, "NumpadEquals": 83,
+    "Numpad0": 84, "Numpad1": 85, "Numpad2": 86, "Numpad3": 87, "Numpad4": 88, "Numpad5": 89,
+    "Numpad6": 90, "Numpad7": 91, "Numpad8": 92, "Numpad9": 93, "F1": 94, "F2": 95, "F3": 96,
+    "F4": 97, "F5": 98, "F6": 99, "F7": 100, "F8": 101, "F9": 102, "F10": 103, "F11": 104,
+    "F12": 105,
+}
+
+
+class MouseButton:
+    """Bit indices of MouseState.buttons"""
+    LEFT = 0
+    RIGHT = 1
+    MIDDLE = 2
+    FORWARD = 3
+    BACK = 4
+
+
+class GamepadButton:
+    """Bit indices of GamepadState.buttons"""
+    DPAD_UP = 0
+    DPAD_DOWN = 1
+    DPAD_LEFT = 2
+    DPAD_RIGHT = 3
+    NORTH = Y = TRIANGLE = 4
+    EAST = B = CIRCLE = 5
+    SOUTH = A = CROSS = 6
+    WEST = X = SQUARE = 7
+    LEFT_STICK = 8
+    RIGHT_STICK = 9
+    LEFT_SHOULDER = 10
+    RIGHT_SHOULDER = 11
+    START = 12
+    SELECT = 13
+
+
+class TouchPhase:
+    """TouchState.phase values"""
+    NONE = 0
+    BEGAN = 1
+    MOVED = 2
+    ENDED = 3
+    CANCELED = 4
+    STATIONARY = 5
+
+
+class TouchFlags:
+    """TouchState.flags bits"""
+    INDIRECT_TOUCH = 1 << 0
+    PRIMARY_TOUCH = 1 << 4
+    TAP = 1 << 5
+
+
+@dataclass
+class RemoteDevice:
+    """Device announced to Unity with a NewDevice message"""
+    name: str
+    layout: str
+    device_id: int
+    device_class: str
+
+    def to_message_data(self) -> bytes:
+        """Serialize the device like NewDeviceMsg.create in inputremoting.js"""
+        data = {
+            "name": self.name,
+            "layout": self.layout,
+            "deviceId": self.device_id,
+            "description": {
+                "m_InterfaceName": "RawInput",
+                "m_DeviceClass": self.device_class,
+                "m_Manufacturer": "",
+                "m_Product": "",
+                "m_Serial": "",
+                "m_Version": "",
+                "m_Capabilities": "",
+            },
+        }
+        encoded = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        # The browser allocates two bytes per character and leaves the rest zeroed
+        return encoded + bytes(len(encoded))
+
+
+MOUSE = RemoteDevice("Mouse", "Mouse", 1, "Mouse")
+KEYBOARD = RemoteDevice("Keyboard", "Keyboard", 2, "Keyboard")
+GAMEPAD = RemoteDevice("Gamepad", "Gamepad", 3, "Gamepad")
+TOUCHSCREEN = RemoteDevice("Touchscreen", "Touchscreen", 4, "Touch")
+DEFAULT_DEVICES = (MOUSE, KEYBOARD, GAMEPAD, TOUCHSCREEN)
+
+# Conservative SCTP message size every WebRTC stack accepts unfragmented
+DEFAULT_MAX_MESSAGE_SIZE = 16 * 1024
+
+
+class InputRemotingSender:
+    """Sends mouse, keyboard, touch and gamepad input to Unity over a data channel"""
+
+    def __init__(self, channel, max_message_size: int = DEFAULT_MAX_MESSAGE_SIZE,
+                 auto_flush: bool = True):
+        """
+        Initialize input remoting sender
+
+        Events are packed into a preallocated buffer and sent as one NewEvents
+        message per flush. With auto_flush, all events queued during one event
+        loop iteration are flushed together on the next iteration.
+
+        Args:
+            channel: Open or opening RTCDataChannel (normally labelled "input")
+            max_message_size: Largest message to send; batches are split above it
+            auto_flush: Whether to schedule a flush when the first event is queued
+        """
+        self.channel = channel
+        self.auto_flush = auto_flush
+        self.devices: Sequence[RemoteDevice] = ()
+
+        # Event callbacks
+        self.on_send: Optional[Callable[[bytes], None]] = None
+
+        # Statistics
+        self.events_sent = 0
+        self.messages_sent = 0
+        self.events_dropped = 0
+
+        self.logger = logging.getLogger(__name__)
+
+        self._buffer = bytearray(max_message_size)
+        self._view = memoryview(self._buffer)
+        self._offset = MESSAGE_HEADER.size
+        self._pending = 0
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._start_time = time.monotonic()
+
+        # Current device state; state events always carry the whole state
+        self._mouse_position = (0.0, 0.0)
+        self._mouse_buttons = 0
+        self._keys = bytearray(KEYBOARD_STATE_SIZE)
+        # touch id -> (start x, start y, start time, last x, last y)
+        self._touches: Dict[int, Tuple[float, float, float, float, float]] = {}
+
+    @property
+    def is_open(self) -> bool:
+        return self.channel is not None and self.channel.readyState == "open"
+
+    @property
+    def pending_events(self) -> int:
+        return self._pending
+
+    def time_since_startup(self) -> float:
+        """Event timestamp in seconds since the devices were added"""
+        return time.monotonic() - self._start_time
+
+    def add_devices(self, devices: Sequence[RemoteDevice] = DEFAULT_DEVICES):
+        """
+        Announce devices to Unity; call once the channel is open
+
+        Args:
+            devices: Devices to add (default: mouse, keyboard, gamepad, touchscreen)
+        """
+        self.flush()
+        self._start_time = time.monotonic()
+        self.devices = tuple(devices)
+        for device in self.devices:
+            self._send_message(MessageType.NEW_DEVICE, device.to_message_data())
+        self.logger.info(f"Added input devices: {', '.join(d.name for d in self.devices)}")
+
+    def _send_message(self, message_type: int, data: bytes) -> bool:
+        """Send a single unbatched message"""
+        if not self.is_open:
+            return False
+        try:
+            message = MESSAGE_HEADER.pack(0, message_type, len(data)) + data
+            self.channel.send(message)
+            self.messages_sent += 1
+            if self.on_send:
+                self.on_send(message)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error sending input message: {e}")
+            return False
+
+    def _begin_event(self, event_type: int, device_id: int, payload_size: int) -> int:
+        """
+        Reserve space for one event in the batch buffer and write its header
+
+        Returns:
+            int: Buffer offset of the event payload
+        """
+        size = EVENT_HEADER.size + payload_size
+        aligned = (size + 3) & ~3
+        if self._offset + aligned > len(self._buffer):
+            self.flush()
+
+        offset = self._offset
+        EVENT_HEADER.pack_into(self._buffer, offset, event_type, size, device_id,
+                               self.time_since_startup(), size)
+        self._offset = offset + aligned
+        self._pending += 1
+
+        if self.auto_flush and self._flush_handle is None:
+            try:
+                self._flush_handle = asyncio.get_running_loop().call_soon(self.flush)
+            except RuntimeError:
+                # No running loop: the caller flushes explicitly
+                pass
+        return offset + EVENT_HEADER.size
+
+    def _begin_state_event(self, device: RemoteDevice, state_format: int, state_size: int) -> int:
+        """Reserve a StateEvent and return the offset of its state data"""
+        offset = self._begin_event(STATE_EVENT, device.device_id, STATE_FORMAT.size + state_size)
+        STATE_FORMAT.pack_into(self._buffer, offset, state_format)
+        return offset + STATE_FORMAT.size
+
+    def flush(self) -> bool:
+        """
+        Send all queued events as one NewEvents message
+
+        Returns:
+            bool: True if a message was sent
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return False
+
+        count = self._pending
+        length = self._offset - MESSAGE_HEADER.size
+        self._offset = MESSAGE_HEADER.size
+        self._pending = 0
+
+        if not self.is_open:
+            self.events_dropped += count
+            return False
+
+        MESSAGE_HEADER.pack_into(self._buffer, 0, 0, MessageType.NEW_EVENTS, length)
+        try:
+            message = bytes(self._view[:MESSAGE_HEADER.size + length])
+            self.channel.send(message)
+            if self.on_send:
+                self.on_send(message)
+        except Exception as e:
+            self.logger.error(f"Error sending input events: {e}")
+            self.events_dropped += count
+            return False
+
+        self.events_sent += count
+        self.messages_sent += 1
+        return True
+
+    # Mouse
+
+    def _queue_mouse_state(self, delta: Tuple[float, float] = (0.0, 0.0),
+                           scroll: Tuple[float, float] = (0.0, 0.0), click_count: int = 0):
+        offset = self._begin_state_event(MOUSE, MOUSE_FORMAT, MOUSE_STATE.size)
+        MOUSE_STATE.pack_into(self._buffer, offset,
+                              self._mouse_position[0], self._mouse_position[1],
+                              delta[0], delta[1], scroll[0], scroll[1],
+                              self._mouse_buttons, 0, click_count)
+
+    def mouse_move(self, x: float, y: float):
+        """
+        Move the pointer
+
+        Args:
+            x, y: Position in Unity screen pixels (origin bottom-left, like the
+                browser's PointerCorrector output)
+        """
+        previous = self._mouse_position
+        self._mouse_position = (float(x), float(y))
+        self._queue_mouse_state(delta=(x - previous[0], y - previous[1]))
+
+    def mouse_button(self, button: int, pressed: bool,
+                     x: Optional[float] = None, y: Optional[float] = None):
+        """
+        Press or release a mouse button, optionally at a new position
+
+        Args:
+            button: Bit index from MouseButton
+            pressed: True to press, False to release
+            x, y: Optional position to move to first
+        """
+        if x is not None and y is not None:
+            self._mouse_position = (float(x), float(y))
+        if pressed:
+            self._mouse_buttons |= 1 << button
+        else:
+            self._mouse_buttons &= ~(1 << button)
+        self._queue_mouse_state(click_count=1 if pressed else 0)
+
+    def mouse_click(self, x: float, y: float, button: int = MouseButton.LEFT):
+        """
+        Queue a press and release at a position
+
+        Both events share one batch, so Unity sees them within the same input
+        update. Flush between mouse_button calls for UI that needs the press
+        to last a frame.
+        """
+        self.mouse_button(button, True, x, y)
+        self.mouse_button(button, False)
+
+    def mouse_scroll(self, dx: float, dy: float):
+        """Scroll by (dx, dy) wheel units"""
+        self._queue_mouse_state(scroll=(dx, dy))
+
+    # Keyboard
+
+    def _key_index(self, key: Union[str, int]) -> int:
+        if isinstance(key, int):
+            return key
+        if key in KEYMAP:
+            return KEYMAP[key]
+        if len(key) == 1 and key.isalnum():
+            return KEYMAP["Key" + key.upper()] if key.isalpha() else KEYMAP["Digit" + key]
+        raise ValueError(f"Unknown key: {key}")
+
+    def _set_key(self, key: Union[str, int], pressed: bool):
+        index = self._key_index(key)
+        if pressed:
+            self._keys[index >> 3] |= 1 << (index & 7)
+        else:
+            self._keys[index >> 3] &= ~(1 << (index & 7))
+        offset = self._begin_state_event(KEYBOARD, KEYBOARD_FORMAT, KEYBOARD_STATE_SIZE)
+        self._buffer[offset:offset + KEYBOARD_STATE_SIZE] = self._keys
+
+    def key_down(self, key: Union[str, int]):
+        """
+        Press a key
+
+        Args:
+            key: KeyboardEvent.code name from KEYMAP (e.g. 'KeyW', 'Space'),
+                a single letter/digit, or a raw key index
+        """
+        self._set_key(key, True)
+
+    def key_up(self, key: Union[str, int]):
+        """Release a key"""
+        self._set_key(key, False)
+
+    def key_press(self, key: Union[str, int]):
+        """Queue a key press and release"""
+        self._set_key(key, True)
+        self._set_key(key, False)
+
+    def type_text(self, text: str):
+        """Queue one TextEvent per character (what UI text fields consume)"""
+        for character in text:
+            offset = self._begin_event(TEXT_EVENT, KEYBOARD.device_id, TEXT_CHARACTER.size)
+            TEXT_CHARACTER.pack_into(self._buffer, offset, ord(character))
+
+    # Touch
+
+    def touch(self, touch_id: int, phase: int, x: float, y: float,
+              pressure: float = 1.0, radius: Tuple[float, float] = (1.0, 1.0),
+              flags: int = 0):
+        """
+        Queue the state of one touch
+
+        Args:
+            touch_id: Non-zero id shared by all events of one touch
+            phase: Value from TouchPhase
+            x, y: Position in Unity screen pixels
+            pressure: Touch pressure
+            radius: Touch radius
+            flags: Bits from TouchFlags
+        """
+        if phase == TouchPhase.BEGAN or touch_id not in self._touches:
+            self._touches[touch_id] = (x, y, self.time_since_startup(), x, y)
+        start_x, start_y, start_time, last_x, last_y = self._touches[touch_id]
+        delta = (x - last_x, y - last_y) if phase == TouchPhase.MOVED else (0.0, 0.0)
+
+        offset = self._begin_state_event(TOUCHSCREEN, TOUCH_FORMAT, TOUCH_STATE.size)
+        TOUCH_STATE.pack_into(self._buffer, offset, touch_id, x, y, delta[0], delta[1],
+                              pressure, radius[0], radius[1], phase, 0, 0, flags, 0,
+                              start_time, start_x, start_y)
+
+        if phase in (TouchPhase.ENDED, TouchPhase.CANCELED):
+            del self._touches[touch_id]
+        else:
+            self._touches[touch_id] = (start_x, start_y, start_time, x, y)
+
+    def tap(self, x: float, y: float, touch_id: int = 1):
+        """Queue a touch that begins and ends at one position"""
+        self.touch(touch_id, TouchPhase.BEGAN, x, y, flags=TouchFlags.PRIMARY_TOUCH)
+        self.touch(touch_id, TouchPhase.ENDED, x, y, flags=TouchFlags.PRIMARY_TOUCH | TouchFlags.TAP)
+
+    # Gamepad
+
+    def gamepad(self, buttons: int = 0,
+                left_stick: Tuple[float, float] = (0.0, 0.0),
+                right_stick: Tuple[float, float] = (0.0, 0.0),
+                left_trigger: float = 0.0, right_trigger: float = 0.0):
+        """
+        Queue the full gamepad state
+
+        Args:
+            buttons: Bitmask of 1 << GamepadButton values
+            left_stick, right_stick: Stick axes in [-1, 1]
+            left_trigger, right_trigger: Trigger values in [0, 1]
+        """
+        offset = self._begin_state_event(GAMEPAD, GAMEPAD_FORMAT, GAMEPAD_STATE.size)
+        GAMEPAD_STATE.pack_into(self._buffer, offset, buttons,
+                                left_stick[0], left_stick[1], right_stick[0], right_stick[1],
+                                left_trigger, right_trigger)
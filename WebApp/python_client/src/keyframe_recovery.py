@@ -0,0 +1,175 @@
+"""
+Keyframe recovery for Unity Render Streaming Python client
+
+After packet loss the decoder can only produce a clean picture again from
+a keyframe. Waiting for the sender's periodic keyframe can leave the video
+broken or frozen for seconds, so the controller asks for one (PLI or FIR)
+as soon as the pipeline reports a decode error, a timeout or a freeze.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+KEYFRAME_METHODS = ("pli", "fir")
+
+
+class KeyframeRecovery:
+    """Requests keyframes when the video breaks and measures how long it stays broken"""
+
+    def __init__(self, method: str = "pli", freeze_threshold: float = 0.5,
+                 min_interval: float = 0.25, max_interval: float = 2.0):
+        """
+        Initialize keyframe recovery
+
+        Args:
+            method: Keyframe request to send: 'pli' or 'fir'
+            freeze_threshold: Seconds without a decoded frame that count as a freeze
+            min_interval: Minimum seconds between keyframe requests
+            max_interval: Longest back-off between requests while the video stays broken
+        """
+        if method not in KEYFRAME_METHODS:
+            raise ValueError(f"Unknown keyframe request method: {method}")
+        self.method = method
+        self.freeze_threshold = freeze_threshold
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+        # Counters
+        self.keyframe_requests = 0
+        self.decode_errors = 0
+        self.freezes = 0
+        self.timeouts = 0
+        self.recoveries = 0
+        self.recovery_seconds_total = 0.0
+        self.recovery_seconds_max = 0.0
+        self.recovery_seconds_last = 0.0
+
+        # Start of the current impairment (None while the video is healthy)
+        self.impaired_since: Optional[float] = None
+        self.impairment: Optional[str] = None
+
+        self._taps = []
+        self._frames_decoded = 0
+        self._last_frame_time: Optional[float] = None
+        self._last_request_time = 0.0
+        self._request_interval = min_interval
+        self._task: Optional[asyncio.Task] = None
+
+        self.logger = logging.getLogger(__name__)
+
+    def attach(self, tap):
+        """Send keyframe requests through a ReceiverTap and start watching for freezes"""
+        self._taps.append(tap)
+        # A track that never delivers its first frame is frozen too
+        self._last_frame_time = time.monotonic()
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    def frame_decoded(self):
+        """Report a successfully decoded frame"""
+        now = time.monotonic()
+        self._frames_decoded += 1
+        self._last_frame_time = now
+        if self.impaired_since is not None:
+            recovery_time = now - self.impaired_since
+            self.recoveries += 1
+            self.recovery_seconds_total += recovery_time
+            self.recovery_seconds_max = max(self.recovery_seconds_max, recovery_time)
+            self.recovery_seconds_last = recovery_time
+            self.logger.info(f"Video recovered from {self.impairment} in {recovery_time * 1000:.0f} ms "
+                             f"({self.keyframe_requests} keyframe requests so far)")
+            self.impaired_since = None
+            self.impairment = None
+            self._request_interval = self.min_interval
+
+    def decode_error(self):
+        """Report a frame that could not be decoded"""
+        self.decode_errors += 1
+        self._impaired("decode error", time.monotonic())
+
+    def timeout(self):
+        """Report a frame receive timeout"""
+        self.timeouts += 1
+        self._impaired("timeout", self._last_frame_time or time.monotonic())
+
+    def _impaired(self, reason: str, since: float):
+        """Start (or continue) an impairment and request a keyframe if allowed"""
+        if self.impaired_since is None:
+            self.impaired_since = since
+            self.impairment = reason
+        self.request_keyframe(reason)
+
+    def request_keyframe(self, reason: str = "manual") -> bool:
+        """
+        Ask the sender for a keyframe unless a request was sent too recently
+
+        Args:
+            reason: Why the keyframe is needed (for logging)
+
+        Returns:
+            bool: True if a request was scheduled
+        """
+        now = time.monotonic()
+        if not self._taps or now - self._last_request_time < self._request_interval:
+            return False
+
+        self._last_request_time = now
+        # Back off while the sender doesn't respond, e.g. during an outage
+        self._request_interval = min(self._request_interval * 2, self.max_interval)
+        self.keyframe_requests += 1
+        self.logger.info(f"Requesting keyframe ({self.method.upper()}) after {reason}")
+        for tap in self._taps:
+            asyncio.ensure_future(self._send(tap))
+        return True
+
+    async def _send(self, tap):
+        try:
+            await tap.send_keyframe_request(self.method)
+        except Exception as e:
+            self.logger.error(f"Error sending keyframe request: {e}")
+
+    async def _watch(self):
+        """Detect freezes: no decoded frame for freeze_threshold seconds"""
+        try:
+            while True:
+                await asyncio.sleep(self.freeze_threshold / 4)
+                if all(tap.receiver.track is None or tap.receiver.track.readyState == "ended"
+                       for tap in self._taps):
+                    break
+                now = time.monotonic()
+                if self._last_frame_time is None or now - self._last_frame_time < self.freeze_threshold:
+                    continue
+                if self.impaired_since is None:
+                    self.impaired_since = self._last_frame_time
+                    if self._frames_decoded:
+                        self.freezes += 1
+                        self.impairment = "freeze"
+                    else:
+                        self.impairment = "missing first frame"
+                self.request_keyframe(self.impairment)
+        except asyncio.CancelledError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Keyframe request counters and recovery times in milliseconds"""
+        return {
+            "keyframe_requests": self.keyframe_requests,
+            "decode_errors": self.decode_errors,
+            "freezes": self.freezes,
+            "timeouts": self.timeouts,
+            "recoveries": self.recoveries,
+            "recovery_ms_last": self.recovery_seconds_last * 1000,
+            "recovery_ms_mean": (self.recovery_seconds_total * 1000 / self.recoveries
+                                 if self.recoveries else 0.0),
+            "recovery_ms_max": self.recovery_seconds_max * 1000,
+            "impaired_ms": ((time.monotonic() - self.impaired_since) * 1000
+                            if self.impaired_since is not None else 0.0),
+        }
+
+    def stop(self):
+        """Stop watching for freezes"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,221 @@
+"""
+Event loop watchdog for Unity Render Streaming Python client
+
+Display, frame saving, conversions and user callbacks can run inline on the
+asyncio loop, and while one of them runs, nothing else is received,
+answered or sent. The watchdog measures loop lag with a heartbeat task. A
+watcher thread samples the loop thread's stack whenever the heartbeat is
+late by more than a threshold, so each stall is attributed to the task
+and code that caused it.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional
+
+# Frames from the standard library and installed packages are skipped
+# when naming the code responsible for a stall
+_LIBRARY_DIR = os.path.dirname(os.__file__)
+_PACKAGE_DIRS = ("site-packages", "dist-packages")
+
+
+class LoopStall:
+    """One period during which the loop did not run the heartbeat"""
+
+    def __init__(self, started: float, task: Optional[str], site: str, stack: List[str]):
+        self.started = started
+        self.task = task
+        self.site = site
+        self.stack = stack
+        self.samples = 1
+        self.duration = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "lag_ms": self.duration * 1000,
+            "task": self.task,
+            "site": self.site,
+            "samples": self.samples,
+            "stack": self.stack,
+        }
+
+
+class LoopWatchdog:
+    """Measures event loop lag and samples the stack of whatever blocks the loop"""
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.02,
+                 max_stalls: int = 20, stack_depth: int = 12):
+        """
+        Initialize loop watchdog
+
+        Args:
+            threshold: Lag in seconds that counts as a stall and gets sampled
+            interval: Heartbeat period in seconds (the lag resolution)
+            max_stalls: Recent stalls kept with their stacks
+            stack_depth: Innermost frames kept per stack sample
+        """
+        self.threshold = threshold
+        self.interval = interval
+        self.stack_depth = stack_depth
+
+        # Counters
+        self.heartbeats = 0
+        self.lag_seconds_last = 0.0
+        self.lag_seconds_max = 0.0
+        self.lag_seconds_total = 0.0
+        self.stalls = 0
+        self.stalled_seconds_total = 0.0
+
+        # Stack samples by code location, over all stalls
+        self.sites: Counter = Counter()
+        self.recent_stalls: Deque[LoopStall] = deque(maxlen=max_stalls)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = 0.0
+        self._stall: Optional[LoopStall] = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        """Start watching the running loop (call from a coroutine)"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Loop watchdog on {type(self._loop).__module__}.{type(self._loop).__name__}, "
+                         f"sampling stalls over {self.threshold * 1000:.0f} ms")
+
+    async def _heartbeat(self):
+        """Wake every interval and record how late the loop let us run"""
+        try:
+            while True:
+                expected = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                lag = max(now - expected, 0.0)
+                with self._lock:
+                    self._last_beat = now
+                    self.heartbeats += 1
+                    self.lag_seconds_last = lag
+                    self.lag_seconds_total += lag
+                    self.lag_seconds_max = max(self.lag_seconds_max, lag)
+                    stall, self._stall = self._stall, None
+                    if stall is not None:
+                        stall.duration = lag
+                        self.stalled_seconds_total += lag
+                if stall is not None:
+                    self._report(stall)
+        except asyncio.CancelledError:
+            pass
+
+    def _report(self, stall: LoopStall):
+        lag = stall.duration
+        self.logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms in {stall.site}"
+                            + (f" (task {stall.task})" if stall.task else ""))
+
+    def _watch(self):
+        """Watcher thread: sample the loop thread while the heartbeat is overdue"""
+        period = min(self.interval, self.threshold) / 2
+        while not self._stopped.wait(period):
+            overdue = time.monotonic() - self._last_beat - self.interval
+            if overdue < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)[-self.stack_depth:]
+            site = self._site(stack)
+            task = self._current_task()
+            with self._lock:
+                self.sites[site] += 1
+                if self._stall is None:
+                    self._stall = LoopStall(self._last_beat, task, site, traceback.format_list(stack))
+                    self.stalls += 1
+                    self.recent_stalls.append(self._stall)
+                else:
+                    self._stall.samples += 1
+
+    @staticmethod
+    def _site(stack: traceback.StackSummary) -> str:
+        """Innermost application frame of a stack, as file:line function"""
+        for entry in reversed(stack):
+            if not (entry.filename.startswith(_LIBRARY_DIR)
+                    or any(directory in entry.filename for directory in _PACKAGE_DIRS)):
+                break
+        else:
+            entry = stack[-1]
+        return f"{os.path.basename(entry.filename)}:{entry.lineno} {entry.name}"
+
+    def _current_task(self) -> Optional[str]:
+        """Name and coroutine of the task the loop is running, if any"""
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            return None
+        if task is None:
+            return None
+        coroutine = task.get_coro()
+        return f"{task.get_name()} ({getattr(coroutine, '__qualname__', coroutine)})"
+
+    def stats(self) -> Dict[str, Any]:
+        """Loop lag in milliseconds, stall counts and the code seen blocking the loop"""
+        with self._lock:
+            return {
+                "lag_ms_last": self.lag_seconds_last * 1000,
+                "lag_ms_mean": self.lag_seconds_total * 1000 / self.heartbeats if self.heartbeats else 0.0,
+                "lag_ms_max": self.lag_seconds_max * 1000,
+                "stalls": self.stalls,
+                "stalled_ms_total": self.stalled_seconds_total * 1000,
+                "sites": dict(self.sites.most_common(10)),
+                "recent_stalls": [stall.as_dict() for stall in self.recent_stalls],
+            }
+
+    def stop(self):
+        """Stop the heartbeat and the watcher thread, logging a summary"""
+        if self._task and self.heartbeats:
+            top = ", ".join(f"{site} ({samples})" for site, samples in self.sites.most_common(3))
+            self.logger.info(f"Event loop lag: max {self.lag_seconds_max * 1000:.0f} ms, "
+                             f"{self.stalls} stalls over {self.threshold * 1000:.0f} ms"
+                             + (f"; blocked in {top}" if top else ""))
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+
+def install_uvloop() -> bool:
+    """
+    Use uvloop for event loops created afterwards, e.g. by asyncio.run()
+
+    uvloop is an optional dependency, useful to compare loop lag against
+    asyncio's own loop.
+
+    Returns:
+        bool: True if uvloop will be used
+    """
+    try:
+        import uvloop
+    except ImportError:
+        logging.getLogger(__name__).warning("uvloop not available (pip install uvloop), using asyncio's loop")
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
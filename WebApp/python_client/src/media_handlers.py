@@ -4,19 +4,48 @@ Video display and handling for Unity Render Streaming Python client
 
 import asyncio
 import logging
-import cv2
+import os
+import queue
+import threading
+import time
 import numpy as np
-from typing import Optional, Callable
-import aiortc
-from aiortc.contrib.media import MediaStreamTrack
-import av
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple, Union
+
+from .frame_stream import FrameHub
+from .duplicate_detector import DuplicateDetector
+from .pipeline import FramePipeline
+from .playout import DEFAULT, LOW_LATENCY
+from .sinks import JPEG, FileSink
+
+if TYPE_CHECKING:
+    # cv2 and aiortc are imported where they are used, so headless and
+    # data-only consumers never load OpenCV
+    import av
+    from aiortc.mediastreams import MediaStreamTrack
+
+
+def track_output_path(path: str, track: int) -> str:
+    """
+    Output path for one of several tracks: the first keeps path, others get a suffix
+
+    Example: track_output_path("frames.frm", 1) == "frames_track2.frm"
+    """
+    if track == 0:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_track{track + 1}{ext}"
 
 
 class VideoReceiver:
     """Handles video stream reception and display"""
     
     def __init__(self, display_window: bool = True, save_frames: bool = False, 
-                 output_dir: str = "output"):
+                 output_dir: str = "output", frame_limiter=None, frame_waiters=None,
+                 receive_timeout: float = 10.0, max_consecutive_timeouts: Optional[int] = 10,
+                 start_delay: Optional[float] = None, playout: str = DEFAULT,
+                 detect_duplicates: bool = False, window_name: str = "Unity Render Streaming",
+                 window_position: Tuple[int, int] = (100, 100), convert_in_thread: bool = False):
         """
         Initialize video receiver
         
@@ -24,24 +53,75 @@ class VideoReceiver:
             display_window: Whether to display video in OpenCV window
             save_frames: Whether to save frames to disk
             output_dir: Directory to save frames
+            frame_limiter: Optional FrameRateLimiter applied before decoding
+            frame_waiters: Optional FrameWaiters resolved by received frames
+            receive_timeout: Seconds to wait for a frame
+            max_consecutive_timeouts: Stop after this many timeouts in a row (None = never)
+            start_delay: Seconds to let the connection settle before receiving
+                (default: 1.0, or 0 in low-latency playout)
+            playout: DEFAULT, or LOW_LATENCY to skip stale decoded frames
+            detect_duplicates: Skip conversion, transforms and frame saving for
+                frames repeating the previous picture
+            window_name: Title of the video window (one per track)
+            window_position: Screen position of the video window
+            convert_in_thread: Convert frames on a thread of their own (multi-track)
         """
         self.display_window = display_window
         self.save_frames = save_frames
         self.output_dir = output_dir
-        self.frame_count = 0
-        self.window_name = "Unity Render Streaming"
+        self.window_name = window_name
+        self.window_position = window_position
         
         # Event callbacks
         self.on_frame: Optional[Callable[[np.ndarray], None]] = None
         
-        self.logger = logging.getLogger(__name__)
-        
-        # Create output directory if saving frames
+        # Shared receive loop: track -> BGR frame -> transforms -> sinks
+        low_latency = playout == LOW_LATENCY
+        if start_delay is None:
+            start_delay = 0.0 if low_latency else 1.0
+        self.pipeline = FramePipeline(FrameHub(), frame_limiter, frame_waiters, receive_timeout,
+                                      max_consecutive_timeouts, start_delay,
+                                      drain_to_latest=low_latency,
+                                      duplicate_detector=DuplicateDetector() if detect_duplicates else None,
+                                      convert_in_thread=convert_in_thread)
+        self.pipeline.on_timeout = self._on_timeout
+        self.pipeline.on_error = self._on_error
+        self.pipeline.add_sink(self._call_on_frame, name="on_frame")
+        if self.display_window:
+            self.pipeline.add_sink(self._display_frame, name="display")
         if self.save_frames:
-            import os
-            os.makedirs(self.output_dir, exist_ok=True)
+            # Encoding and disk writes run on the sink's own thread
+            self.pipeline.add_sink(FileSink(self.output_dir, JPEG, name="save_frames"))
+        
+        self.logger = logging.getLogger(__name__)
+    
+    @property
+    def frame_hub(self) -> FrameHub:
+        """Pull-based consumers (frames(), add_handler())"""
+        return self.pipeline.frame_hub
+    
+    @frame_hub.setter
+    def frame_hub(self, frame_hub: FrameHub):
+        self.pipeline.frame_hub = frame_hub
+    
+    @property
+    def frame_count(self) -> int:
+        return self.pipeline.frame_count
+    
+    @property
+    def current_frame(self) -> Optional[np.ndarray]:
+        """Most recent decoded frame, before transforms"""
+        return self.pipeline.current_frame
+    
+    @property
+    def on_decoded_frame(self) -> Optional[Callable[["av.VideoFrame"], None]]:
+        return self.pipeline.on_decoded_frame
+    
+    @on_decoded_frame.setter
+    def on_decoded_frame(self, handler: Optional[Callable[["av.VideoFrame"], None]]):
+        self.pipeline.on_decoded_frame = handler
     
-    async def handle_track(self, track: MediaStreamTrack):
+    async def handle_track(self, track: "MediaStreamTrack"):
         """
         Handle incoming video track
         
@@ -49,172 +129,230 @@ class VideoReceiver:
             track: Video track from WebRTC
         """
         self.logger.info(f"Starting to receive {track.kind} track")
-        self.logger.info(f"Track details: {track}")
         
         # If displaying video, create window immediately
         if self.display_window:
-            cv2.namedWindow(self.window_name, cv2.WINDOW_AUTOSIZE | cv2.WINDOW_KEEPRATIO)
-            cv2.moveWindow(self.window_name, 100, 100)  # Position window
-            cv2.setWindowProperty(self.window_name, cv2.WND_PROP_TOPMOST, 1)  # Keep on top
-            
-            # Show placeholder immediately
-            placeholder = np.zeros((480, 640, 3), dtype=np.uint8)
-            cv2.putText(placeholder, "Starting video stream...", (150, 240), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            cv2.imshow(self.window_name, placeholder)
-            cv2.waitKey(1)
-            
-            self.logger.info(f"Created video window: {self.window_name}")
-        
-        # Wait a moment for connection to stabilize
-        await asyncio.sleep(1)
+            self._create_window()
         
         try:
-            frame_count = 0
-            consecutive_failures = 0
-            max_consecutive_failures = 10
-            
-            while True:
-                try:
-                    # Receive frame from track with timeout
-                    frame = await asyncio.wait_for(track.recv(), timeout=10.0)  # Increased timeout
-                    
-                    if frame is None:
-                        self.logger.warning("Received None frame")
-                        break
-                    
-                    frame_count += 1
-                    consecutive_failures = 0  # Reset failure counter
-                    
-                    # Log detailed frame information
-                    self.logger.info(f"Received frame {frame_count}: type={type(frame)}, format={getattr(frame, 'format', 'unknown')}")
-                    
-                    # Handle different frame types
-                    try:
-                        if hasattr(frame, 'to_ndarray'):
-                            # For video frames - try different formats
-                            try:
-                                img = frame.to_ndarray(format="bgr24")
-                                self.logger.info(f"Frame {frame_count} successfully converted to BGR24: shape={img.shape}")
-                                await self._process_frame(img)
-                            except Exception as bgr_error:
-                                self.logger.warning(f"Failed to convert frame to BGR24: {bgr_error}")
-                                try:
-                                    # Try RGB format
-                                    img = frame.to_ndarray(format="rgb24")
-                                    # Convert RGB to BGR for OpenCV
-                                    img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-                                    self.logger.info(f"Frame {frame_count} converted from RGB24 to BGR: shape={img.shape}")
-                                    await self._process_frame(img)
-                                except Exception as rgb_error:
-                                    self.logger.error(f"Failed to convert frame from RGB24: {rgb_error}")
-                                    # Show error frame
-                                    if self.display_window:
-                                        error_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-                                        cv2.putText(error_frame, f"Decode Error: Frame {frame_count}", (100, 240), 
-                                                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                                        cv2.imshow(self.window_name, error_frame)
-                                        cv2.waitKey(1)
-                        else:
-                            self.logger.warning(f"Frame {frame_count} doesn't have to_ndarray method: {type(frame)}")
-                            # Try to extract frame data manually
-                            if hasattr(frame, 'planes'):
-                                self.logger.info(f"Frame has planes: {len(frame.planes)}")
-                                for i, plane in enumerate(frame.planes):
-                                    self.logger.info(f"Plane {i}: {plane}")
-                    
-                    except Exception as frame_error:
-                        self.logger.error(f"Error processing frame {frame_count}: {frame_error}")
-                        consecutive_failures += 1
-                        
-                        # Show frame error
-                        if self.display_window:
-                            error_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-                            cv2.putText(error_frame, f"Frame Error: {consecutive_failures}/10", (150, 240), 
-                                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 100, 255), 2)
-                            cv2.imshow(self.window_name, error_frame)
-                            cv2.waitKey(1)
-                    
-                    # Log first frame received
-                    if frame_count == 1:
-                        self.logger.info(f"✅ First video frame received! Type: {type(frame)}")
-                    
-                    # Log every 30 frames
-                    if frame_count % 30 == 0:
-                        self.logger.info(f"Processed {frame_count} frames")
-                        
-                except asyncio.TimeoutError:
-                    consecutive_failures += 1
-                    self.logger.warning(f"Timeout waiting for frame (attempt {consecutive_failures}/{max_consecutive_failures})")
-                    
-                    if consecutive_failures >= max_consecutive_failures:
-                        self.logger.error("Too many consecutive frame timeout failures, stopping")
-                        break
-                        
-                    # Show "waiting for frames" message
-                    if self.display_window:
-                        placeholder = np.zeros((480, 640, 3), dtype=np.uint8)
-                        cv2.putText(placeholder, "Waiting for video frames...", (130, 240), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
-                        cv2.imshow(self.window_name, placeholder)
-                        cv2.waitKey(1)
-                    
-                    continue
-                    
+            await self.pipeline.run(track)
         except Exception as e:
-            self.logger.error(f"Error in video track handler: {e}")
+            self.logger.error(f"Error handling video track: {e}")
         finally:
             self.logger.info("Video track ended")
             if self.display_window:
+                import cv2
                 cv2.destroyWindow(self.window_name)
     
-    async def _process_frame(self, frame: np.ndarray):
+    def _create_window(self):
+        """Create the video window with a placeholder"""
+        import cv2
+        cv2.namedWindow(self.window_name, cv2.WINDOW_AUTOSIZE | cv2.WINDOW_KEEPRATIO)
+        cv2.moveWindow(self.window_name, *self.window_position)  # Position window
+        cv2.setWindowProperty(self.window_name, cv2.WND_PROP_TOPMOST, 1)  # Keep on top
+        self._show_message("Starting video stream...", (0, 255, 0))
+        self.logger.info(f"Created video window: {self.window_name}")
+    
+    def _show_message(self, text: str, color):
+        """Show a text placeholder in the video window"""
+        import cv2
+        placeholder = np.zeros((480, 640, 3), dtype=np.uint8)
+        cv2.putText(placeholder, text, (100, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+        cv2.imshow(self.window_name, placeholder)
+        cv2.waitKey(1)
+    
+    def _on_timeout(self, consecutive_timeouts: int):
+        if self.display_window:
+            self._show_message("Waiting for video frames...", (0, 255, 255))
+    
+    def _on_error(self, frame_number: int, error: Exception):
+        if self.display_window:
+            self._show_message(f"Decode Error: Frame {frame_number}", (0, 0, 255))
+    
+    def _call_on_frame(self, frame: np.ndarray, frame_count: int):
+        if self.on_frame:
+            self.on_frame(frame)
+    
+    def _display_frame(self, frame: np.ndarray, frame_count: int):
+        """Display sink"""
+        import cv2
+        cv2.imshow(self.window_name, frame)
+        cv2.waitKey(1)  # Process window events
+        
+        # On first frame, bring window to front again 
+        if frame_count == 1:
+            self.logger.info(f"✅ Displaying first frame in window!")
+            cv2.setWindowProperty(self.window_name, cv2.WND_PROP_TOPMOST, 1)
+            cv2.setWindowProperty(self.window_name, cv2.WND_PROP_TOPMOST, 0)  # Reset topmost
+    
+    def stats(self) -> Dict[str, Any]:
+        """Pipeline counters and per-stage timings"""
+        return self.pipeline.stats()
+    
+    def cleanup(self):
+        """Cleanup resources"""
+        self.pipeline.close()
+        self.frame_hub.close()
+        if self.display_window:
+            import cv2
+            cv2.destroyAllWindows()
+
+
+class StreamingAudioWriter:
+    """Writes received audio frames to disk incrementally from a writer thread"""
+    
+    # libsndfile subtypes for the sample formats aiortc decoders produce
+    SUBTYPES = {
+        "s16": "PCM_16",
+        "s16p": "PCM_16",
+        "s32": "PCM_32",
+        "s32p": "PCM_32",
+        "flt": "FLOAT",
+        "fltp": "FLOAT",
+        "dbl": "DOUBLE",
+        "dblp": "DOUBLE",
+    }
+    
+    def __init__(self, output_file: str, max_queued_frames: int = 256,
+                 flush_interval: float = 1.0):
         """
-        Process received video frame
+        Initialize streaming audio writer
         
         Args:
-            frame: Video frame as numpy array
+            output_file: Output audio file path (.wav or .flac)
+            max_queued_frames: Frames buffered for the writer thread before dropping
+            flush_interval: Seconds between header/data flushes to disk
         """
-        try:
-            self.frame_count += 1
-            
-            self.logger.debug(f"Processing frame {self.frame_count}: shape={frame.shape}, dtype={frame.dtype}")
-            
-            # Call custom frame handler if provided
-            if self.on_frame:
-                self.on_frame(frame)
+        self.output_file = output_file
+        self.flush_interval = flush_interval
+        self.sample_rate: Optional[int] = None
+        self.channels: Optional[int] = None
+        self.sample_format: Optional[str] = None
+        self.frames_written = 0
+        self.frames_dropped = 0
+        # Set once the file cannot be opened or written; later frames are dropped
+        self.failed = False
+        
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queued_frames)
+        self._thread: Optional[threading.Thread] = None
+        self._sound_file = None
+        
+        self.logger = logging.getLogger(__name__)
+    
+    def write_frame(self, frame) -> bool:
+        """
+        Queue an audio frame for writing (never blocks the caller)
+        
+        Args:
+            frame: Decoded av.AudioFrame
             
-            # Display frame in window
-            if self.display_window:
-                self.logger.debug(f"Displaying frame {self.frame_count} in window '{self.window_name}'")
-                cv2.imshow(self.window_name, frame)
-                
-                # Force window update and bring to front
-                cv2.waitKey(1)  # Process window events
+        Returns:
+            bool: True if the frame was queued
+        """
+        if self.failed:
+            self.frames_dropped += 1
+            return False
+        
+        sample_format = frame.format.name
+        channels = len(frame.layout.channels)
+        
+        if self._thread is None:
+            try:
+                self._open(frame.sample_rate, channels, sample_format)
+            except ImportError:
+                raise
+            except Exception as e:
+                self.failed = True
+                self.frames_dropped += 1
+                self.logger.error(f"Cannot record audio to {self.output_file}, recording disabled: {e}")
+                return False
+        elif (frame.sample_rate, channels, sample_format) != (
+                self.sample_rate, self.channels, self.sample_format):
+            self.logger.warning(
+                f"Audio format changed to {frame.sample_rate} Hz/{channels} ch/{sample_format}, "
+                f"dropping frame (recording is {self.sample_rate} Hz/{self.channels} ch/{self.sample_format})")
+            self.frames_dropped += 1
+            return False
+        
+        # Interleave into (samples, channels) as expected by soundfile
+        samples = frame.to_ndarray()
+        if frame.format.is_planar:
+            samples = samples.T
+        else:
+            samples = samples.reshape(-1, channels)
+        
+        try:
+            self._queue.put_nowait(samples)
+            return True
+        except queue.Full:
+            self.frames_dropped += 1
+            if self.frames_dropped % 100 == 1:
+                self.logger.warning(f"Audio writer falling behind, dropped {self.frames_dropped} frames")
+            return False
+    
+    def _open(self, sample_rate: int, channels: int, sample_format: str):
+        """Open the output file using the format of the first frame"""
+        import soundfile as sf
+        
+        subtype = self.SUBTYPES.get(sample_format, "PCM_16")
+        if self.output_file.lower().endswith(".flac") and subtype not in ("PCM_16", "PCM_24"):
+            # FLAC only stores integer PCM
+            subtype = "PCM_24" if subtype == "PCM_32" else "PCM_16"
+        
+        self._sound_file = sf.SoundFile(self.output_file, mode="w", samplerate=sample_rate,
+                                        channels=channels, subtype=subtype)
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_format = sample_format
+        
+        self._thread = threading.Thread(target=self._run, name="audio-writer", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Recording audio to {self.output_file} "
+                         f"({sample_rate} Hz, {channels} ch, {subtype})")
+    
+    def _run(self):
+        """Writer thread: drain queued sample blocks to the sound file"""
+        last_flush = time.monotonic()
+        try:
+            while True:
+                try:
+                    samples = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    samples = ()
+                if samples is None:
+                    break
+                if len(samples):
+                    self._sound_file.write(samples)
+                    self.frames_written += 1
                 
-                # On first frame, bring window to front again 
-                if self.frame_count == 1:
-                    self.logger.info(f"✅ Displaying first frame in window!")
-                    cv2.setWindowProperty(self.window_name, cv2.WND_PROP_TOPMOST, 1)
-                    cv2.setWindowProperty(self.window_name, cv2.WND_PROP_TOPMOST, 0)  # Reset topmost
-            
-            # Save frame to disk
-            if self.save_frames:
-                filename = f"{self.output_dir}/frame_{self.frame_count:06d}.jpg"
-                cv2.imwrite(filename, frame)
-            
-            # Add small delay to prevent overwhelming the display
-            await asyncio.sleep(0.001)
-            
+                now = time.monotonic()
+                if now - last_flush >= self.flush_interval:
+                    # Keeps the header valid so a crash only loses the last interval
+                    self._sound_file.flush()
+                    last_flush = now
         except Exception as e:
-            self.logger.error(f"Error processing frame: {e}")
-        
-        return True
+            self.failed = True
+            self.logger.error(f"Error writing audio file, recording stopped: {e}")
+        finally:
+            self._sound_file.close()
     
-    def cleanup(self):
-        """Cleanup resources"""
-        if self.display_window:
-            cv2.destroyAllWindows()
+    def close(self, timeout: float = 10.0):
+        """Flush pending frames and close the output file (blocks until done or timeout)"""
+        if self._thread is None:
+            return
+        # A writer thread that died leaves the queue full; nothing would take the sentinel
+        if self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+                self._thread.join(timeout=timeout)
+            except queue.Full:
+                pass
+            if self._thread.is_alive():
+                self.logger.warning(f"Audio writer did not finish within {timeout:.0f}s, "
+                                    f"{self.output_file} may be incomplete")
+        self._thread = None
+        self.logger.info(f"Saved audio to {self.output_file} "
+                         f"({self.frames_written} frames, {self.frames_dropped} dropped)")
 
 
 class AudioReceiver:
@@ -226,21 +364,28 @@ class AudioReceiver:
         
         Args:
             save_audio: Whether to save audio to file
-            output_file: Output audio file path
+            output_file: Output audio file path (.wav or .flac)
         """
         self.save_audio = save_audio
         self.output_file = output_file
-        self.audio_samples = []
+        self.audio_writer: Optional[StreamingAudioWriter] = None
+        
+        # Event callbacks
+        self.on_decoded_frame: Optional[Callable[["av.AudioFrame"], None]] = None
         
         self.logger = logging.getLogger(__name__)
+        
+        if self.save_audio:
+            self.audio_writer = StreamingAudioWriter(output_file)
     
-    async def handle_track(self, track: MediaStreamTrack):
+    async def handle_track(self, track: "MediaStreamTrack"):
         """
         Handle incoming audio track
         
         Args:
             track: Audio track from WebRTC
         """
+        from aiortc.mediastreams import MediaStreamError
         self.logger.info(f"Starting to receive {track.kind} track")
         
         try:
@@ -253,54 +398,70 @@ class AudioReceiver:
                 # Process audio frame
                 await self._process_audio_frame(frame)
                 
+        except MediaStreamError:
+            # The track ended
+            pass
         except Exception as e:
             self.logger.error(f"Error in audio track handler: {e}")
         finally:
             self.logger.info("Audio track ended")
             
-            # Save audio file if requested
-            if self.save_audio and self.audio_samples:
-                self._save_audio_file()
+            # Finish writing the audio file without blocking the event loop
+            if self.audio_writer:
+                await asyncio.get_running_loop().run_in_executor(None, self.audio_writer.close)
     
     async def _process_audio_frame(self, frame):
         """Process received audio frame"""
         try:
-            if self.save_audio:
-                # Convert frame to numpy array and store
-                if hasattr(frame, 'to_ndarray'):
-                    audio_data = frame.to_ndarray()
-                    self.audio_samples.append(audio_data)
-                    
-        except Exception as e:
-            self.logger.error(f"Error processing audio frame: {e}")
-    
-    def _save_audio_file(self):
-        """Save collected audio samples to file"""
-        try:
-            import soundfile as sf
+            if self.on_decoded_frame:
+                self.on_decoded_frame(frame)
             
-            # Concatenate all audio samples
-            if self.audio_samples:
-                audio_data = np.concatenate(self.audio_samples)
-                
-                # Save to file (assuming 48kHz sample rate)
-                sf.write(self.output_file, audio_data, 48000)
-                self.logger.info(f"Saved audio to {self.output_file}")
-                
+            if self.audio_writer and hasattr(frame, 'to_ndarray'):
+                self.audio_writer.write_frame(frame)
+                    
         except ImportError:
             self.logger.warning("soundfile not available, cannot save audio")
+            self.audio_writer = None
         except Exception as e:
-            self.logger.error(f"Error saving audio file: {e}")
+            self.logger.error(f"Error processing audio frame: {e}")
 
 
 class DataChannelHandler:
     """Handles WebRTC data channel communication"""
     
-    def __init__(self):
-        """Initialize data channel handler"""
+    def __init__(self, max_queued_messages: int = 4096,
+                 buffered_amount_high: int = 1024 * 1024,
+                 buffered_amount_low: int = 256 * 1024):
+        """
+        Initialize data channel handler
+        
+        Args:
+            max_queued_messages: Received messages kept for receive()/messages(),
+                and queued sends per channel; the oldest are dropped beyond it
+            buffered_amount_high: Stop handing data to a channel above this many
+                buffered bytes
+            buffered_amount_low: Resume sending once the channel drains below this
+        """
         self.channels = {}
-        self.on_message: Optional[Callable[[str, str], None]] = None
+        self.on_message: Optional[Callable[[str, Union[str, bytes]], None]] = None
+        # All traffic as (direction, label, message); direction is "in" or "out"
+        self.on_traffic: Optional[Callable[[str, str, Union[str, bytes]], None]] = None
+        self.buffered_amount_high = buffered_amount_high
+        self.buffered_amount_low = buffered_amount_low
+        self.max_queued_messages = max_queued_messages
+        
+        # Statistics
+        self.messages_received = 0
+        self.messages_sent = 0
+        self.receive_dropped = 0
+        self.send_dropped = 0
+        
         self.logger = logging.getLogger(__name__)
+        
+        self._receive_queue: Optional[asyncio.Queue] = None
+        self._pending_sends: Dict[str, deque] = {}
+        self._drained: Dict[str, asyncio.Event] = {}
+        self._flush_handle: Optional[asyncio.Handle] = None
     
     def handle_datachannel(self, channel):
         """
@@ -309,26 +470,118 @@ class DataChannelHandler:
         Args:
             channel: WebRTC data channel
         """
-        self.logger.info(f"Data channel '{channel.label}' opened")
-        self.channels[channel.label] = channel
+        label = channel.label
+        self.logger.info(f"Data channel '{label}' opened")
+        self.channels[label] = channel
+        self._pending_sends[label] = deque()
+        self._drained[label] = asyncio.Event()
+        self._drained[label].set()
+        channel.bufferedAmountLowThreshold = self.buffered_amount_low
+        debug = self.logger.isEnabledFor(logging.DEBUG)
         
         @channel.on("message")
         def on_message(message):
             """Handle data channel message"""
-            self.logger.debug(f"Received message on '{channel.label}': {message}")
+            self.messages_received += 1
+            if debug:
+                self.logger.debug("Received %d bytes on '%s'", len(message), label)
+            if self._receive_queue is not None:
+                # Binary payloads are exposed as views so consumers can slice without copying
+                data = memoryview(message) if isinstance(message, bytes) else message
+                if self._receive_queue.full():
+                    self._receive_queue.get_nowait()
+                    self.receive_dropped += 1
+                self._receive_queue.put_nowait((label, data))
+            if self.on_traffic:
+                self.on_traffic("in", label, message)
             if self.on_message:
-                self.on_message(channel.label, message)
+                self.on_message(label, message)
+        
+        @channel.on("bufferedamountlow")
+        def on_bufferedamountlow():
+            """Resume queued sends once the channel has drained"""
+            self._drained[label].set()
+            self._flush_channel(label)
         
         @channel.on("close")
         def on_close():
             """Handle data channel close"""
-            self.logger.info(f"Data channel '{channel.label}' closed")
-            if channel.label in self.channels:
-                del self.channels[channel.label]
+            self.logger.info(f"Data channel '{label}' closed")
+            self.channels.pop(label, None)
+            self._pending_sends.pop(label, None)
+            drained = self._drained.pop(label, None)
+            if drained:
+                drained.set()
+    
+    async def receive(self):
+        """
+        Wait for the next received message
+        
+        Messages are only queued once receive() or messages() has been used.
+        
+        Returns:
+            tuple: (channel label, str or memoryview)
+        """
+        if self._receive_queue is None:
+            self._receive_queue = asyncio.Queue(self.max_queued_messages)
+        return await self._receive_queue.get()
+    
+    async def messages(self):
+        """Iterate over received messages as (channel label, str or memoryview)"""
+        while True:
+            yield await self.receive()
+    
+    def send_nowait(self, channel_label: str, message: Union[str, bytes, bytearray, memoryview]) -> bool:
+        """
+        Queue a message without waiting; the queue is drained on the next loop iteration
+        
+        Each message is still handed to the channel as its own data channel
+        message: messages are not merged, since channels other than input
+        carry application-defined payloads whose boundaries the receiver
+        relies on (InputRemotingSender packs input events itself). Sending
+        pauses while the channel holds more than buffered_amount_high bytes
+        and resumes on its bufferedamountlow event.
+        
+        Returns:
+            bool: False if the channel is unknown
+        """
+        pending = self._pending_sends.get(channel_label)
+        if pending is None:
+            return False
+        if not isinstance(message, (str, bytes)):
+            message = bytes(message)
+        if len(pending) >= self.max_queued_messages:
+            pending.popleft()
+            self.send_dropped += 1
+        pending.append(message)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_soon(self._flush)
+        return True
+    
+    def _flush(self):
+        """Hand queued messages of every channel to aiortc, one send() each"""
+        self._flush_handle = None
+        for label in list(self._pending_sends):
+            self._flush_channel(label)
+    
+    def _flush_channel(self, label: str):
+        channel = self.channels.get(label)
+        pending = self._pending_sends.get(label)
+        if channel is None or not pending or channel.readyState != "open":
+            return
+        while pending:
+            if channel.bufferedAmount > self.buffered_amount_high:
+                self._drained[label].clear()
+                return
+            message = pending.popleft()
+            channel.send(message)
+            self.messages_sent += 1
+            if self.on_traffic:
+                self.on_traffic("out", label, message)
     
-    async def send_message(self, channel_label: str, message: str):
+    async def send_message(self, channel_label: str, message: Union[str, bytes]):
         """
-        Send message on data channel
+        Send message on data channel, waiting while its send buffer is full
         
         Args:
             channel_label: Label of the data channel
@@ -337,9 +590,10 @@ class DataChannelHandler:
         if channel_label in self.channels:
             channel = self.channels[channel_label]
             if channel.readyState == "open":
-                channel.send(message)
-                self.logger.debug(f"Sent message on '{channel_label}': {message}")
+                await self._drained[channel_label].wait()
+                self.send_nowait(channel_label, message)
+                self._flush_channel(channel_label)
             else:
                 self.logger.warning(f"Channel '{channel_label}' not open")
         else:
-            self.logger.warning(f"Channel '{channel_label}' not found")
\ No newline at end of file
+            self.logger.warning(f"Channel '{channel_label}' not found")
@@ -0,0 +1,319 @@
+"""
+Frame pipeline engine for Unity Render Streaming Python client
+
+Both clients receive video through the same loop:
+
+    source (track.recv) -> decode (to BGR ndarray) -> transforms -> sinks
+
+The decoded frame is published to FrameHub subscribers and pending steps
+before any transform runs, so those consumers always see the unmodified
+frame. Transforms are plain callables; sinks live in a SinkGraph with their
+own rate, format and worker. Each stage is timed, so tuning and
+instrumentation apply to every entry point at once.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from .sinks import CallbackSink, FrameSink, SinkGraph
+
+# A transform returns the frame to pass on (or None to keep its input)
+Transform = Callable[[np.ndarray, int], Optional[np.ndarray]]
+Sink = Callable[[np.ndarray, int], None]
+
+STAGES = ["receive", "decode", "publish", "transform", "sinks"]
+
+
+class FramePipeline:
+    """Receive loop shared by VideoReceiver and EnhancedVideoReceiver"""
+
+    def __init__(self, frame_hub=None, frame_limiter=None, frame_waiters=None,
+                 receive_timeout: float = 10.0, max_consecutive_timeouts: Optional[int] = None,
+                 start_delay: float = 0.0, drain_to_latest: bool = False,
+                 duplicate_detector=None, convert_in_thread: bool = False):
+        """
+        Initialize frame pipeline
+
+        Args:
+            frame_hub: Optional FrameHub the decoded frames are published to
+            frame_limiter: Optional FrameRateLimiter applied before decoding
+            frame_waiters: Optional FrameWaiters; pending steps see every frame
+            receive_timeout: Seconds to wait for a frame before on_timeout
+            max_consecutive_timeouts: Stop after this many timeouts in a row (None = never)
+            start_delay: Seconds to wait before the first recv()
+            drain_to_latest: Skip decoded frames already queued behind a newer one
+            duplicate_detector: Optional DuplicateDetector; repeated pictures skip
+                conversion, transforms and sinks declared with skip_duplicates
+            convert_in_thread: Convert to BGR on the pipeline's own thread, so the
+                conversions of several tracks run in parallel (PyAV releases the GIL)
+        """
+        self.frame_hub = frame_hub
+        self.frame_limiter = frame_limiter
+        self.frame_waiters = frame_waiters
+        self.receive_timeout = receive_timeout
+        self.max_consecutive_timeouts = max_consecutive_timeouts
+        self.start_delay = start_delay
+        self.drain_to_latest = drain_to_latest
+        self.duplicate_detector = duplicate_detector
+        self.convert_in_thread = convert_in_thread
+        self._executor = None
+
+        self.transforms: List[Transform] = []
+        self.sinks = SinkGraph()
+
+        # Event callbacks
+        self.on_decoded_frame: Optional[Callable] = None
+        self.on_frame_processed: Optional[Callable[[float], None]] = None
+        self.on_timeout: Optional[Callable[[int], None]] = None
+        self.on_error: Optional[Callable[[int, Exception], None]] = None
+
+        # Optional KeyframeRecovery told about decoded frames, errors and timeouts
+        self.recovery = None
+
+        # Counters
+        self.frames_received = 0
+        self.frame_count = 0
+        self.frames_skipped = 0
+        self.frames_failed = 0
+        self.frames_stale = 0
+        self.frames_duplicate = 0
+        self.stage_seconds: Dict[str, float] = {stage: 0.0 for stage in STAGES}
+        self.current_frame: Optional[np.ndarray] = None
+        # Transformed current frame, reused for duplicates
+        self._last_output: Optional[np.ndarray] = None
+
+        self.running = False
+        self.logger = logging.getLogger(__name__)
+
+    def add_transform(self, transform: Transform) -> Transform:
+        """Append a transform; transforms run in order on a private copy of the frame"""
+        self.transforms.append(transform)
+        return transform
+
+    def add_sink(self, sink: Union[FrameSink, Sink], **options) -> FrameSink:
+        """
+        Add a sink to the fan-out graph
+
+        Args:
+            sink: FrameSink, or a callable taking (frame, frame_count) that
+                runs inline unless options say otherwise
+            **options: FrameSink options for callables (max_rate,
+                frame_format, worker, writes)
+
+        Returns:
+            FrameSink: The added sink (pass it to remove_sink())
+        """
+        if not isinstance(sink, FrameSink):
+            sink = CallbackSink(sink, **options)
+        return self.sinks.add(sink)
+
+    def remove_sink(self, sink: FrameSink):
+        """Remove a sink and stop its worker"""
+        self.sinks.remove(sink)
+
+    def stop(self):
+        """End the loop after the current frame"""
+        self.running = False
+
+    def close(self):
+        """Stop the loop, the sink workers and the conversion thread"""
+        self.stop()
+        self.sinks.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def run(self, track):
+        """
+        Consume a media track until it ends, times out or stop() is called
+
+        Args:
+            track: aiortc video track, or any object with an async recv()
+        """
+        from aiortc.mediastreams import MediaStreamError
+
+        self.running = True
+        loop = asyncio.get_running_loop()
+        if self.start_delay:
+            await asyncio.sleep(self.start_delay)
+
+        consecutive_timeouts = 0
+        stage_seconds = self.stage_seconds
+        clock = time.perf_counter
+
+        try:
+            while self.running:
+                started = clock()
+                try:
+                    frame = await asyncio.wait_for(track.recv(), timeout=self.receive_timeout)
+                except asyncio.TimeoutError:
+                    consecutive_timeouts += 1
+                    self.logger.warning(f"Frame receive timeout ({consecutive_timeouts} in a row)")
+                    if (self.max_consecutive_timeouts is not None
+                            and consecutive_timeouts >= self.max_consecutive_timeouts):
+                        self.logger.error("Too many consecutive frame timeouts, stopping")
+                        break
+                    if self.recovery:
+                        self.recovery.timeout()
+                    if self.on_timeout:
+                        self.on_timeout(consecutive_timeouts)
+                    continue
+                except MediaStreamError:
+                    # The track ended
+                    break
+
+                received = clock()
+                stage_seconds["receive"] += received - started
+                consecutive_timeouts = 0
+                if frame is None:
+                    self.logger.warning("Received None frame")
+                    break
+                if self.drain_to_latest:
+                    frame = self._latest(track, frame)
+                self.frames_received += 1
+
+                if self.on_decoded_frame:
+                    try:
+                        self.on_decoded_frame(frame)
+                    except Exception as e:
+                        self.logger.error(f"Error in decoded frame handler: {e}")
+
+                # Pending steps see every frame regardless of the rate limit
+                stepping = self.frame_waiters is not None and self.frame_waiters.pending
+                if not stepping and self.frame_limiter and not self.frame_limiter.accept():
+                    self.frames_skipped += 1
+                    if self.recovery:
+                        self.recovery.frame_decoded()
+                    continue
+
+                # A repeated picture reuses the previous conversion
+                duplicate = (self.duplicate_detector is not None
+                             and self.duplicate_detector.is_duplicate(frame)
+                             and self.current_frame is not None)
+                try:
+                    if duplicate:
+                        image = self.current_frame
+                    elif self.convert_in_thread:
+                        image = await loop.run_in_executor(self._converter(), self._to_bgr, frame)
+                    else:
+                        image = self._to_bgr(frame)
+                except Exception as e:
+                    self.frames_failed += 1
+                    self.logger.error(f"Error converting frame {self.frames_received}: {e}")
+                    if self.duplicate_detector:
+                        self.duplicate_detector.reset()
+                    if self.recovery:
+                        self.recovery.decode_error()
+                    if self.on_error:
+                        self.on_error(self.frames_received, e)
+                    continue
+                decoded = clock()
+                stage_seconds["decode"] += decoded - received
+                if self.recovery:
+                    self.recovery.frame_decoded()
+
+                self.frame_count += 1
+                self.frames_duplicate += duplicate
+                self._process(image, stepping, decoded, duplicate)
+                if self.on_frame_processed:
+                    self.on_frame_processed(clock() - received)
+
+                if self.frame_count == 1:
+                    self.logger.info(f"✅ First video frame received: {image.shape[1]}x{image.shape[0]}")
+                elif self.frame_count % 30 == 0:
+                    self.logger.info(f"Processed {self.frame_count} frames")
+
+                # Let other tasks run even when frames are already queued
+                await asyncio.sleep(0)
+        finally:
+            self.running = False
+
+    def _converter(self):
+        """Single conversion thread, keeping this track's frames in order"""
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline-convert")
+        return self._executor
+
+    def _latest(self, track, frame):
+        """Take the newest frame the track has already decoded, skipping older ones"""
+        # aiortc's RemoteStreamTrack and ReplayTrack queue decoded frames in _queue
+        queue = getattr(track, "_queue", None)
+        while queue is not None and not queue.empty():
+            newer = queue.get_nowait()
+            if newer is None:
+                # Leave the end-of-track marker for the next recv()
+                queue.put_nowait(None)
+                break
+            self.frames_received += 1
+            self.frames_stale += 1
+            frame = newer
+        return frame
+
+    def _to_bgr(self, frame) -> np.ndarray:
+        """Convert a decoded frame to a BGR ndarray (a new array each call)"""
+        try:
+            return frame.to_ndarray(format="bgr24")
+        except Exception as e:
+            self.logger.debug("BGR24 conversion failed (%s), converting from RGB24", e)
+            return np.ascontiguousarray(frame.to_ndarray(format="rgb24")[:, :, ::-1])
+
+    def _process(self, image: np.ndarray, stepping: bool, started: float, duplicate: bool = False):
+        """Publish, transform and deliver one decoded frame"""
+        stage_seconds = self.stage_seconds
+        clock = time.perf_counter
+        frame_count = self.frame_count
+
+        # Subscribers share the unmodified frame
+        self.current_frame = image
+        if stepping:
+            self.frame_waiters.push(image, frame_count)
+        if self.frame_hub is not None:
+            self.frame_hub.publish(image, frame_count, duplicate)
+        published = clock()
+        stage_seconds["publish"] += published - started
+
+        if duplicate and self._last_output is not None:
+            # Transforms already ran on this picture
+            image = self._last_output
+        else:
+            if self.transforms:
+                image = image.copy()
+            for transform in self.transforms:
+                try:
+                    result = transform(image, frame_count)
+                    if result is not None:
+                        image = result
+                except Exception as e:
+                    self.logger.error(f"Error in frame transform: {e}")
+            self._last_output = image
+        transformed = clock()
+        stage_seconds["transform"] += transformed - published
+
+        # Inline sinks run here; worker sinks only get the frame handed over
+        self.sinks.push(image, frame_count, duplicate)
+        stage_seconds["sinks"] += clock() - transformed
+
+    def stats(self) -> Dict[str, Any]:
+        """Frame counters, mean milliseconds per frame for each stage, per-sink, recovery and duplicate stats"""
+        stats = {
+            "frames_received": self.frames_received,
+            "frames_processed": self.frame_count,
+            "frames_skipped": self.frames_skipped,
+            "frames_failed": self.frames_failed,
+            "frames_stale": self.frames_stale,
+            "frames_duplicate": self.frames_duplicate,
+        }
+        for stage, seconds in self.stage_seconds.items():
+            count = self.frames_received if stage == "receive" else self.frame_count
+            stats[f"{stage}_ms"] = seconds * 1000 / count if count else 0.0
+        stats["sinks"] = self.sinks.stats()
+        if self.recovery:
+            stats["recovery"] = self.recovery.stats()
+        if self.duplicate_detector:
+            stats["duplicates"] = self.duplicate_detector.stats()
+        return stats
@@ -0,0 +1,47 @@
+"""
+Playout modes for Unity Render Streaming Python client
+
+aiortc releases a video frame only when the first packet of the *next*
+frame arrives, which adds one frame interval of latency, and queues every
+decoded frame until the consumer takes it. The low-latency mode releases a
+frame as soon as its RTP marker packet completes it, and the pipeline
+skips decoded frames that are already stale.
+"""
+
+from typing import Optional
+
+DEFAULT = "default"
+LOW_LATENCY = "low-latency"
+PLAYOUT_MODES = (DEFAULT, LOW_LATENCY)
+
+# aiortc's own buffer sizes (packets); capacities must be powers of two
+VIDEO_CAPACITY = 128
+AUDIO_CAPACITY = 16
+
+
+def create_jitter_buffer(kind: str = "video", mode: str = DEFAULT,
+                         capacity: Optional[int] = None):
+    """
+    Create the jitter buffer for a media kind and playout mode
+
+    Args:
+        kind: 'video' or 'audio'
+        mode: DEFAULT (aiortc behaviour) or LOW_LATENCY
+        capacity: Packets held while waiting for missing ones (power of two);
+            a video frame must fit, so keep it at 128 or more for HD streams
+
+    Returns:
+        JitterBuffer: Buffer to install with ReceiverTap.replace_jitter_buffer()
+    """
+    from aiortc.jitterbuffer import JitterBuffer
+    from .receiver_tap import MarkerJitterBuffer
+
+    if mode not in PLAYOUT_MODES:
+        raise ValueError(f"Unknown playout mode: {mode}")
+    if capacity is not None and (capacity <= 0 or capacity & (capacity - 1)):
+        raise ValueError(f"Jitter buffer capacity must be a power of two: {capacity}")
+    if kind == "audio":
+        # Each audio packet is a frame; the default prefetch of 4 trades 80 ms for smoothness
+        return JitterBuffer(capacity=capacity or AUDIO_CAPACITY, prefetch=0 if mode == LOW_LATENCY else 4)
+    buffer_class = MarkerJitterBuffer if mode == LOW_LATENCY else JitterBuffer
+    return buffer_class(capacity=capacity or VIDEO_CAPACITY, is_video=True)
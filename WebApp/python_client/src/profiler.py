@@ -0,0 +1,301 @@
+"""
+Stage profiler for Unity Render Streaming Python client
+
+A sampling profiler that runs from connection setup over a fixed window of
+frames, so a production host can be profiled from the command line instead
+of attaching external profilers by hand. A thread samples the stacks of all
+threads (the loop, aiortc's decoder threads, sink workers, executors), skips
+those waiting for work and attributes the rest to a pipeline stage. When the
+window is complete it writes folded stacks for flamegraph.pl, inferno or
+speedscope, and a JSON report with the per-stage breakdown next to the
+pipeline's own stage timers.
+
+The sampling interval backs off whenever sampling would take more than
+max_overhead of the wall time, so the profiler's cost stays bounded on
+small hosts where it competes with the client for the GIL and the core.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+STAGES = ("signaling", "recv", "decode", "convert", "handler", "display", "write", "other")
+
+# Matched from the innermost frame outwards: the first frame naming one of
+# these functions or classes decides the stage
+_FRAME_RULES = (
+    ("display", ("_display_frame", "_display_frame_with_controls", "_show_message", "_create_window")),
+    ("write", ("FileSink", "SharedMemoryRingSink", "FrameArchive", "SessionRecorder",
+               "StreamingAudioWriter", "_save_screenshot")),
+    ("convert", ("FramePipeline._to_bgr", "SharedFrame.get", "convert_frame")),
+    ("decode", ("H264Decoder", "Vp8Decoder", "OpusDecoder", "PcmDecoder", "decoder_worker")),
+    ("handler", ("FramePipeline._process", "FrameHub._run_handler", "CallbackSink", "_apply_frame_handler",
+                 "_call_on_frame")),
+    ("recv", ("FramePipeline.run", "_SelectorDatagramTransport")),
+)
+# Otherwise any frame from these modules or packages decides, signaling
+# first; what is left of executor work is taken to be frame handlers
+_MODULE_RULES = (
+    ("signaling", ("signaling.py", "webrtc_peer.py", "sdp_utils.py", "/websockets/")),
+    ("recv", ("/aiortc/", "/aioice/", "/pylibsrtp/", "session_capture.py")),
+    ("handler", ("/concurrent/futures/thread.py",)),
+)
+
+# Innermost standard library functions of a thread waiting for work
+_LIBRARY_DIR = os.path.dirname(os.__file__)
+_IDLE_FUNCTIONS = frozenset(("wait", "select", "poll", "get", "_worker", "acquire", "join",
+                             "_wait_for_tstate_lock", "sleep", "accept", "readinto", "recv_into"))
+
+# Longest interval the overhead budget may push sampling to
+_MAX_INTERVAL = 0.1
+
+
+def _matches(name: str, names) -> bool:
+    return any(name == pattern or name.startswith(pattern + ".") or name.endswith("." + pattern)
+               for pattern in names)
+
+
+class StageProfiler:
+    """Samples all threads over a window of frames and reports time per pipeline stage"""
+
+    def __init__(self, output_file: str, frames: int = 300, interval: float = 0.005,
+                 max_overhead: float = 0.02, stack_depth: int = 64):
+        """
+        Initialize stage profiler
+
+        Args:
+            output_file: Folded stacks file; the report goes next to it as .json
+            frames: Frames to profile after connection setup
+            interval: Sampling period in seconds, lengthened to stay within max_overhead
+            max_overhead: Largest fraction of wall time spent sampling
+            stack_depth: Innermost frames kept per stack
+        """
+        self.output_file = output_file
+        self.report_file = os.path.splitext(output_file)[0] + ".json"
+        self.frames = frames
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.stack_depth = stack_depth
+
+        # Frames processed so far and pipeline stats for the report, set by the client
+        self.frame_counter: Optional[Callable[[], int]] = None
+        self.stats_source: Optional[Callable[[], Dict[str, Any]]] = None
+
+        # Counters
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.stage_seconds: Dict[str, float] = dict.fromkeys(STAGES, 0.0)
+        self.thread_seconds: Counter = Counter()
+        self.milestones: Dict[str, float] = {}
+
+        # Wall time by (thread name, stack from the root)
+        self._stacks: Counter = Counter()
+        self._labels: Dict[Any, str] = {}
+        self._stages: Dict[Any, str] = {}
+        self._started = 0.0
+        self._ended = 0.0
+        self._frames_profiled = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._finished = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        """Start sampling; call from the loop so the report is written there"""
+        if self._thread is not None:
+            return
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample_loop, name="stage-profiler", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Profiling the next {self.frames} frames to {self.output_file}")
+
+    def mark(self, name: str):
+        """Record when a setup milestone (e.g. connected, first frame) was reached"""
+        if self._thread is not None and name not in self.milestones:
+            self.milestones[name] = time.perf_counter() - self._started
+
+    def _frame_count(self) -> int:
+        try:
+            return self.frame_counter() if self.frame_counter else 0
+        except Exception:
+            return 0
+
+    def _sample_loop(self):
+        """Profiler thread: sample until the window is complete or stop() is called"""
+        own_thread = threading.get_ident()
+        interval = self.interval
+        cost = 0.0
+        previous = time.perf_counter()
+        while not self._stopped.wait(interval):
+            # Each sample stands for the wall time since the previous one
+            began = time.perf_counter()
+            self._sample(own_thread, began - previous)
+            previous = began
+            elapsed = time.perf_counter() - began
+            self.sampling_seconds += elapsed
+
+            # Keep the sampling cost within budget (smoothed over recent samples)
+            cost = elapsed if not cost else 0.9 * cost + 0.1 * elapsed
+            interval = min(max(self.interval, cost / self.max_overhead), _MAX_INTERVAL)
+
+            frames = self._frame_count()
+            if frames:
+                self.mark("first_frame")
+            if frames >= self.frames:
+                self._frames_profiled = frames
+                break
+        self._ended = time.perf_counter()
+        if self._stopped.is_set():
+            return
+        if self._loop is not None and not self._loop.is_closed():
+            try:
+                self._loop.call_soon_threadsafe(self._finish)
+                return
+            except RuntimeError:
+                pass
+        self._finish()
+
+    def _sample(self, own_thread: int, weight: float):
+        """Attribute weight seconds of wall time to each busy thread's stack"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_thread or self._is_idle(frame):
+                continue
+            codes = []
+            while frame is not None and len(codes) < self.stack_depth:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            stack = tuple(reversed(codes))
+            thread = names.get(ident, f"thread-{ident}")
+            with self._lock:
+                self._stacks[(thread, stack)] += weight
+                self.stage_seconds[self._stage(stack)] += weight
+                self.thread_seconds[thread] += weight
+        self.samples += 1
+
+    @staticmethod
+    def _is_idle(frame) -> bool:
+        code = frame.f_code
+        return code.co_name in _IDLE_FUNCTIONS and code.co_filename.startswith(_LIBRARY_DIR)
+
+    def _stage(self, stack: Tuple) -> str:
+        """Pipeline stage of a stack (root first), cached per stack"""
+        stage = self._stages.get(stack)
+        if stage is not None:
+            return stage
+        stage = "other"
+        for code in reversed(stack):
+            name = getattr(code, "co_qualname", code.co_name)
+            matched = next((rule_stage for rule_stage, names in _FRAME_RULES if _matches(name, names)), None)
+            if matched:
+                stage = matched
+                break
+        else:
+            filenames = [code.co_filename.replace(os.sep, "/") for code in stack]
+            for rule_stage, patterns in _MODULE_RULES:
+                if any(pattern in filename if "/" in pattern else filename.endswith("/" + pattern)
+                       for filename in filenames for pattern in patterns):
+                    stage = rule_stage
+                    break
+        self._stages[stack] = stage
+        return stage
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+            self._labels[code] = label
+        return label
+
+    def report(self) -> Dict[str, Any]:
+        """Per-stage and per-thread milliseconds, sampling overhead, setup milestones and pipeline stats"""
+        ended = self._ended or time.perf_counter()
+        window = max(ended - self._started, 1e-9)
+        frames = self._frames_profiled or self._frame_count()
+        with self._lock:
+            busy = sum(self.stage_seconds.values())
+            stages = {
+                stage: {
+                    "ms": seconds * 1000,
+                    "share_pct": seconds * 100 / busy if busy else 0.0,
+                    "ms_per_frame": seconds * 1000 / frames if frames else 0.0,
+                }
+                for stage, seconds in self.stage_seconds.items()
+            }
+            threads = {thread: seconds * 1000 for thread, seconds in self.thread_seconds.most_common()}
+        report = {
+            "frames": frames,
+            "window_ms": window * 1000,
+            "samples": self.samples,
+            "sample_interval_ms": window * 1000 / self.samples if self.samples else 0.0,
+            "overhead_pct": self.sampling_seconds * 100 / window,
+            "milestones_ms": {name: seconds * 1000 for name, seconds in self.milestones.items()},
+            "stages": stages,
+            "threads": threads,
+        }
+        if self.stats_source:
+            try:
+                report["pipeline"] = self.stats_source()
+            except Exception as e:
+                self.logger.error(f"Error collecting pipeline stats for the profile: {e}")
+        return report
+
+    def write(self):
+        """Write the folded stacks (weights in microseconds) and the JSON report"""
+        with self._lock:
+            stacks = list(self._stacks.items())
+        with open(self.output_file, "w") as output:
+            for (thread, stack), seconds in sorted(stacks, key=lambda item: -item[1]):
+                micros = round(seconds * 1e6)
+                if micros:
+                    frames = ";".join([thread.replace(";", ","), *(self._label(code) for code in stack)])
+                    output.write(f"{frames} {micros}\n")
+        report = self.report()
+        with open(self.report_file, "w") as output:
+            json.dump(report, output, indent=2, default=str)
+        return report
+
+    def _finish(self):
+        """Write the outputs once and log the per-stage breakdown"""
+        if self._finished:
+            return
+        self._finished = True
+        try:
+            report = self.write()
+        except Exception as e:
+            self.logger.error(f"Error writing profile: {e}")
+            return
+        frames = report["frames"]
+        complete = "" if frames >= self.frames else f" (window incomplete: {frames}/{self.frames})"
+        self.logger.info(f"Profile of {frames} frames over {report['window_ms'] / 1000:.1f}s{complete}: "
+                         f"{report['samples']} samples, {report['overhead_pct']:.1f}% overhead")
+        for stage, values in report["stages"].items():
+            if values["ms"]:
+                self.logger.info(f"  {stage:9} {values['share_pct']:5.1f}%  {values['ms_per_frame']:7.2f} ms/frame")
+        milestones = ", ".join(f"{name} {ms:.0f} ms" for name, ms in report["milestones_ms"].items())
+        if milestones:
+            self.logger.info(f"  setup: {milestones}")
+        self.logger.info(f"Flamegraph stacks written to {self.output_file}, report to {self.report_file}")
+
+    def stop(self):
+        """Stop sampling and write the outputs if the window did not complete"""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join(timeout=1.0)
+        self._thread = None
+        self._finish()
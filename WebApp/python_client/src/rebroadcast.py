@@ -0,0 +1,271 @@
+"""
+Frame rebroadcast for Unity Render Streaming Python client
+
+Every person or tool watching the stream through its own WebRTC session
+makes Unity encode and send it once more. RebroadcastSink joins the client's
+sink graph instead and serves the received video to any number of local
+viewers: as MJPEG over HTTP (any browser, ffplay, OpenCV's VideoCapture) or
+as JPEG messages on a WebSocket. Each frame is encoded once, by the graph's
+shared JPEG conversion, and the same bytes go to every viewer.
+
+The servers run on their own event loop thread, so viewer sockets never
+compete with reception on the client's loop. Each viewer holds at most one
+pending frame, so a slow viewer skips to the newest frame instead of
+buffering or holding back the others.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Set
+
+import numpy as np
+
+from .sinks import JPEG, THREAD, FrameSink
+
+BOUNDARY = "frame"
+
+_INDEX_PAGE = """<!DOCTYPE html>
+<html><head><title>Unity Render Streaming</title></head>
+<body style="margin:0;background:#000"><img src="/stream.mjpg" style="width:100%"></body></html>
+"""
+
+
+def parse_address(address: str, default_host: str = "127.0.0.1"):
+    """Split "[HOST:]PORT" into (host, port)"""
+    host, _, port = address.rpartition(":")
+    return host or default_host, int(port)
+
+
+class _Viewer:
+    """Newest encoded frame waiting for one viewer"""
+
+    def __init__(self, abort: Callable[[], None]):
+        self.ready = asyncio.Event()
+        self.frame: Optional[bytes] = None
+        self.closed = False
+        self.abort = abort
+        self.frames_sent = 0
+        self.frames_dropped = 0
+
+    def offer(self, frame: bytes):
+        if self.frame is not None:
+            self.frames_dropped += 1
+        self.frame = frame
+        self.ready.set()
+
+    async def next(self) -> Optional[bytes]:
+        """Wait for the newest frame; None once the sink closes"""
+        await self.ready.wait()
+        self.ready.clear()
+        frame, self.frame = self.frame, None
+        return None if self.closed else frame
+
+    def close(self):
+        self.closed = True
+        self.ready.set()
+        # Ends a send stuck on a viewer that stopped reading
+        self.abort()
+
+
+class RebroadcastSink(FrameSink):
+    """Serves frames, JPEG-encoded once, to local MJPEG and WebSocket viewers"""
+
+    def __init__(self, host: str = "127.0.0.1", port: Optional[int] = 8080,
+                 ws_port: Optional[int] = None, max_viewers: int = 64, **kwargs):
+        """
+        Initialize rebroadcast sink
+
+        Args:
+            host: Address to listen on (0.0.0.0 serves other machines too)
+            port: HTTP port for /stream.mjpg, /frame.jpg and a viewer page (None = no HTTP)
+            ws_port: WebSocket port sending one binary JPEG message per frame (None = no WebSocket)
+            max_viewers: Viewers served at once; more are turned away
+            **kwargs: FrameSink options (max_rate caps the rebroadcast rate;
+                worker defaults to THREAD, skip_duplicates to True)
+        """
+        if port is None and ws_port is None:
+            raise ValueError("RebroadcastSink needs an HTTP or a WebSocket port")
+        kwargs.setdefault("name", f"rebroadcast:{port or ws_port}")
+        kwargs.setdefault("worker", THREAD)
+        kwargs.setdefault("skip_duplicates", True)
+        super().__init__(frame_format=JPEG, **kwargs)
+        self.host = host
+        self.port = port
+        self.ws_port = ws_port
+        self.max_viewers = max_viewers
+
+        # Counters
+        self.viewers_total = 0
+        self.viewers_refused = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+
+        self._viewers: Set[_Viewer] = set()
+        self._latest: Optional[bytes] = None
+        self._closing = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._servers: list = []
+        self.logger = logging.getLogger(__name__)
+
+    def open(self):
+        """Start the servers on their own loop thread; raises if a port is taken"""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name=f"sink-{self.name}-server",
+                                        daemon=True)
+        self._thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(self._start_servers(), self._loop).result(timeout=10.0)
+        except Exception:
+            self._stop_loop()
+            raise
+
+    async def _start_servers(self):
+        if self.port is not None:
+            self._servers.append(await asyncio.start_server(self._handle_http, self.host, self.port))
+            self.logger.info(f"📡 Rebroadcasting MJPEG on http://{self.host}:{self.port}/stream.mjpg")
+        if self.ws_port is not None:
+            import websockets
+            self._servers.append(await websockets.serve(self._handle_websocket, self.host, self.ws_port))
+            self.logger.info(f"📡 Rebroadcasting JPEG frames on ws://{self.host}:{self.ws_port}/")
+
+    def process(self, frame: np.ndarray, frame_count: int):
+        # One immutable copy per frame, shared by every viewer
+        data = frame.tobytes()
+        self._loop.call_soon_threadsafe(self._publish, data)
+
+    def _publish(self, data: bytes):
+        self._latest = data
+        for viewer in self._viewers:
+            viewer.offer(data)
+
+    def _attach(self, abort: Callable[[], None]) -> Optional[_Viewer]:
+        if self._closing or len(self._viewers) >= self.max_viewers:
+            self.viewers_refused += 1
+            return None
+        viewer = _Viewer(abort)
+        if self._latest is not None:
+            # New viewers see a picture straight away, even from a static scene
+            viewer.offer(self._latest)
+        self._viewers.add(viewer)
+        self.viewers_total += 1
+        return viewer
+
+    def _detach(self, viewer: _Viewer):
+        self._viewers.discard(viewer)
+        self.frames_sent += viewer.frames_sent
+        self.frames_dropped += viewer.frames_dropped
+
+    async def _handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = (await reader.readline()).decode("latin-1").split()
+            # Headers are not needed
+            while (await reader.readline()).strip():
+                pass
+            path = request[1].split("?")[0] if len(request) > 1 else "/"
+            if path == "/stream.mjpg":
+                await self._stream_mjpeg(writer)
+            elif path == "/frame.jpg" and self._latest is not None:
+                self._respond(writer, "200 OK", "image/jpeg", self._latest)
+            elif path in ("/", "/index.html"):
+                self._respond(writer, "200 OK", "text/html", _INDEX_PAGE.encode())
+            else:
+                self._respond(writer, "404 Not Found", "text/plain", b"Not found\n")
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            self.logger.error(f"Error serving rebroadcast viewer: {e}")
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _respond(writer: asyncio.StreamWriter, status: str, content_type: str, body: bytes):
+        writer.write(f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\nCache-Control: no-cache\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+
+    async def _stream_mjpeg(self, writer: asyncio.StreamWriter):
+        viewer = self._attach(writer.transport.abort)
+        if viewer is None:
+            self._respond(writer, "503 Service Unavailable", "text/plain", b"Too many viewers\n")
+            return
+        # drain() then waits until the socket took the whole frame, so frames
+        # arriving meanwhile replace each other instead of piling up in the transport
+        writer.transport.set_write_buffer_limits(high=0)
+        try:
+            writer.write(f"HTTP/1.0 200 OK\r\nContent-Type: multipart/x-mixed-replace; boundary={BOUNDARY}\r\n"
+                         f"Cache-Control: no-cache\r\nConnection: close\r\n\r\n".encode())
+            while True:
+                frame = await viewer.next()
+                if frame is None:
+                    break
+                writer.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                             f"Content-Length: {len(frame)}\r\n\r\n".encode())
+                writer.write(frame)
+                writer.write(b"\r\n")
+                await writer.drain()
+                viewer.frames_sent += 1
+        finally:
+            self._detach(viewer)
+
+    async def _handle_websocket(self, websocket):
+        viewer = self._attach(lambda: websocket.transport.abort())
+        if viewer is None:
+            await websocket.close(1013, "Too many viewers")
+            return
+        try:
+            while True:
+                frame = await viewer.next()
+                if frame is None:
+                    break
+                # send() waits for the socket, so frames meanwhile replace each other
+                await websocket.send(frame)
+                viewer.frames_sent += 1
+        except Exception:
+            # The viewer went away
+            pass
+        finally:
+            self._detach(viewer)
+
+    def stats(self) -> Dict[str, Any]:
+        """Viewer counts and frames sent or dropped (slow viewers) over all viewers"""
+        viewers = list(self._viewers)
+        return {
+            "viewers": len(viewers),
+            "viewers_total": self.viewers_total,
+            "viewers_refused": self.viewers_refused,
+            "frames_sent": self.frames_sent + sum(viewer.frames_sent for viewer in viewers),
+            "frames_dropped": self.frames_dropped + sum(viewer.frames_dropped for viewer in viewers),
+        }
+
+    async def _close_servers(self):
+        self._closing = True
+        for server in self._servers:
+            server.close()
+        self._servers = []
+        for viewer in list(self._viewers):
+            viewer.close()
+        # Let the viewer handlers finish their responses
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        if tasks:
+            await asyncio.wait(tasks, timeout=1.0)
+
+    def _stop_loop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5.0)
+        self._loop.close()
+        self._loop = self._thread = None
+
+    def close(self):
+        if self._loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_servers(), self._loop).result(timeout=5.0)
+        except Exception as e:
+            self.logger.error(f"Error stopping rebroadcast servers: {e}")
+        stats = self.stats()
+        self.logger.info(f"Rebroadcast served {stats['viewers_total']} viewers: {stats['frames_sent']} frames sent, "
+                         f"{stats['frames_dropped']} dropped for slow viewers")
+        self._stop_loop()
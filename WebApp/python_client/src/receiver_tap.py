@@ -0,0 +1,316 @@
+"""
+Instrumentation hooks on aiortc RTP receivers for Unity Render Streaming Python client
+"""
+
+import logging
+import struct
+from typing import Callable, Dict, List, Optional, Tuple
+
+from aiortc.codecs import get_decoder
+from aiortc.jitterbuffer import JitterBuffer, JitterFrame
+from aiortc.rtcrtpparameters import RTCRtpCodecParameters
+from aiortc.rtp import (RTCP_PSFB_APP, RTCP_PSFB_FIR, RTCP_PSFB_PLI, RtcpPsfbPacket, RtcpSrPacket,
+                       RtpPacket, pack_remb_fci, unpack_remb_fci)
+
+
+def ntp_to_seconds(ntp_timestamp: int) -> float:
+    """Convert a 64-bit NTP timestamp to seconds"""
+    return (ntp_timestamp >> 32) + (ntp_timestamp & 0xFFFFFFFF) / (1 << 32)
+
+
+class ReceiverTap:
+    """
+    Observes RTCP/RTP traffic of an aiortc RTCRtpReceiver
+
+    aiortc does not expose sender reports or its RTP timestamp mapping, so the
+    tap wraps the receiver's packet handlers. All access to receiver internals
+    is kept in this class. Use tap_receiver() to share one tap per receiver.
+    """
+
+    def __init__(self, receiver):
+        """
+        Initialize receiver tap
+
+        Args:
+            receiver: aiortc RTCRtpReceiver to observe
+        """
+        self.receiver = receiver
+        self.kind = receiver.track.kind if receiver.track else None
+
+        # Latest RTCP sender report as (ntp seconds, rtp timestamp)
+        self.last_sender_report: Optional[Tuple[float, int]] = None
+
+        # Upper bound applied to every REMB sent to the remote sender (bps)
+        self.max_bitrate: Optional[int] = None
+
+        # Event callbacks
+        self.on_sender_report: List[Callable[[float, int], None]] = []
+        # Depayloaded packets entering the jitter buffer (after RTX unwrapping)
+        self.on_rtp_packet: List[Callable[[RtpPacket], None]] = []
+        # Complete encoded frames leaving the jitter buffer, before decoding;
+        # the frame's timestamp is still the sender's RTP timestamp
+        self.on_encoded_frame: List[Callable[[RTCRtpCodecParameters, JitterFrame], None]] = []
+        
+        # False keeps encoded frames from the decoder (forwarding only)
+        self.decode = True
+
+        self.logger = logging.getLogger(__name__)
+
+        # Full Intra Request command sequence number (RFC 5104)
+        self._fir_sequence = 0
+
+        # DecoderConfig for the decoders this receiver creates
+        self.decoder_config = None
+        self._receive = None
+
+        self._handle_rtcp_packet = receiver._handle_rtcp_packet
+        receiver._handle_rtcp_packet = self._tap_rtcp_packet
+        self._send_rtcp = receiver._send_rtcp
+        receiver._send_rtcp = self._tap_send_rtcp
+        
+        self._tap_jitter_buffer(getattr(receiver, "_RTCRtpReceiver__jitter_buffer", None))
+
+    def _tap_jitter_buffer(self, jitter_buffer):
+        """Route packets entering a jitter buffer through on_rtp_packet"""
+        if jitter_buffer is not None:
+            self._jitter_buffer_add = jitter_buffer.add
+            jitter_buffer.add = self._tap_jitter_buffer_add
+
+    def replace_jitter_buffer(self, jitter_buffer):
+        """
+        Install a different jitter buffer (see playout.create_jitter_buffer())
+
+        Call before RTP flows, e.g. from the track event; packets already
+        buffered are discarded.
+
+        Args:
+            jitter_buffer: aiortc JitterBuffer (or subclass) for the receiver's kind
+        """
+        self.receiver._RTCRtpReceiver__jitter_buffer = jitter_buffer
+        self._tap_jitter_buffer(jitter_buffer)
+
+    def configure_decoder(self, config):
+        """
+        Apply a DecoderConfig to the decoder of the receiver
+
+        aiortc creates the decoder on its decoder thread when the first frame
+        arrives, from the codec parameters passed to receive(). The config
+        travels on those parameters. Call before media flows, e.g. from the
+        track event.
+
+        Args:
+            config: decoder_config.DecoderConfig
+        """
+        _install_decoder_hook()
+        self.decoder_config = config
+        # receive() runs after the track event, once the transport is connected
+        for codec in self.codecs.values():
+            codec._decoder_config = config
+        if self._receive is None:
+            self._receive = self.receiver.receive
+            self.receiver.receive = self._tap_receive
+
+    async def _tap_receive(self, parameters):
+        """Attach the decoder config to the codecs before the receiver starts"""
+        for codec in parameters.codecs:
+            codec._decoder_config = self.decoder_config
+        await self._receive(parameters)
+
+    async def _tap_rtcp_packet(self, packet):
+        """Record sender reports before passing RTCP on to the receiver"""
+        if isinstance(packet, RtcpSrPacket):
+            ntp_seconds = ntp_to_seconds(packet.sender_info.ntp_timestamp)
+            rtp_timestamp = packet.sender_info.rtp_timestamp
+            self.last_sender_report = (ntp_seconds, rtp_timestamp)
+
+            for callback in self.on_sender_report:
+                try:
+                    callback(ntp_seconds, rtp_timestamp)
+                except Exception as e:
+                    self.logger.error(f"Error in sender report callback: {e}")
+
+        await self._handle_rtcp_packet(packet)
+
+    def _tap_jitter_buffer_add(self, packet):
+        """Pass packets to on_rtp_packet and completed frames to on_encoded_frame callbacks"""
+        for callback in self.on_rtp_packet:
+            try:
+                callback(packet)
+            except Exception as e:
+                self.logger.error(f"Error in RTP packet callback: {e}")
+        pli_flag, encoded_frame = self._jitter_buffer_add(packet)
+        if encoded_frame is not None and self.on_encoded_frame:
+            codec = self.codecs.get(packet.payload_type)
+            for callback in self.on_encoded_frame:
+                try:
+                    callback(codec, encoded_frame)
+                except Exception as e:
+                    self.logger.error(f"Error in encoded frame callback: {e}")
+        if not self.decode:
+            encoded_frame = None
+        return pli_flag, encoded_frame
+
+    async def _tap_send_rtcp(self, packet):
+        """Clamp the receiver's own REMB estimates to max_bitrate"""
+        if (self.max_bitrate is not None and isinstance(packet, RtcpPsfbPacket)
+                and packet.fmt == RTCP_PSFB_APP):
+            try:
+                bitrate, ssrcs = unpack_remb_fci(packet.fci)
+                if bitrate > self.max_bitrate:
+                    packet.fci = pack_remb_fci(self.max_bitrate, ssrcs)
+            except ValueError:
+                pass
+        await self._send_rtcp(packet)
+
+    async def send_remb(self, bitrate: int) -> bool:
+        """
+        Send a Receiver Estimated Maximum Bitrate report for the received streams
+
+        Args:
+            bitrate: Maximum bitrate the sender should use (bps)
+
+        Returns:
+            bool: True if the report was sent
+        """
+        rtcp_ssrc = getattr(self.receiver, "_RTCRtpReceiver__rtcp_ssrc", None)
+        media_ssrcs = [source.source for source in self.receiver.getSynchronizationSources()]
+        if rtcp_ssrc is None or not media_ssrcs:
+            return False
+
+        packet = RtcpPsfbPacket(fmt=RTCP_PSFB_APP, ssrc=rtcp_ssrc, media_ssrc=0,
+                                fci=pack_remb_fci(int(bitrate), media_ssrcs))
+        await self._send_rtcp(packet)
+        return True
+
+    async def send_keyframe_request(self, method: str = "pli") -> bool:
+        """
+        Ask the remote sender for a keyframe
+
+        Args:
+            method: 'pli' (Picture Loss Indication) or 'fir' (Full Intra Request)
+
+        Returns:
+            bool: True if a request was sent
+        """
+        rtcp_ssrc = getattr(self.receiver, "_RTCRtpReceiver__rtcp_ssrc", None)
+        media_ssrcs = [source.source for source in self.receiver.getSynchronizationSources()]
+        if rtcp_ssrc is None or not media_ssrcs:
+            return False
+
+        for media_ssrc in media_ssrcs:
+            if method == "fir":
+                self._fir_sequence = (self._fir_sequence + 1) % 256
+                # RFC 5104 puts the target in the FCI only; libwebrtc reads it from
+                # there while aiortc peers route on media_ssrc, so set both
+                packet = RtcpPsfbPacket(fmt=RTCP_PSFB_FIR, ssrc=rtcp_ssrc, media_ssrc=media_ssrc,
+                                        fci=struct.pack("!LB3x", media_ssrc, self._fir_sequence))
+            else:
+                packet = RtcpPsfbPacket(fmt=RTCP_PSFB_PLI, ssrc=rtcp_ssrc, media_ssrc=media_ssrc)
+            await self._send_rtcp(packet)
+        return True
+
+    @property
+    def codecs(self) -> Dict[int, RTCRtpCodecParameters]:
+        """Negotiated codecs of the receiver by payload type"""
+        return getattr(self.receiver, "_RTCRtpReceiver__codecs", {})
+
+    @property
+    def rtp_origin(self) -> Optional[int]:
+        """RTP timestamp that decoded frame pts values are relative to"""
+        mapper = getattr(self.receiver, "_RTCRtpReceiver__timestamp_mapper", None)
+        return getattr(mapper, "_origin", None)
+
+
+class MarkerJitterBuffer(JitterBuffer):
+    """Video jitter buffer that releases a frame once its marker packet has arrived"""
+
+    def _remove_frame(self, sequence_number: int) -> Optional[JitterFrame]:
+        packets = []
+        timestamp = None
+        for count in range(self.capacity):
+            packet = self._packets[(self._origin + count) % self._capacity]
+            if packet is None:
+                # Still waiting for a packet (e.g. a NACK retransmission)
+                return None
+            if timestamp is not None and packet.timestamp != timestamp:
+                # The frame ended without a marker: release it like aiortc does
+                break
+            timestamp = packet.timestamp
+            packets.append(packet)
+            if packet.marker:
+                break
+        else:
+            return None
+
+        self.remove(len(packets))
+        return JitterFrame(data=b"".join(packet._data for packet in packets), timestamp=timestamp)
+
+
+def _configured_get_decoder(codec: RTCRtpCodecParameters):
+    """aiortc's get_decoder, applying the DecoderConfig attached to the codec"""
+    decoder = get_decoder(codec)
+    config = getattr(codec, "_decoder_config", None)
+    if config is not None:
+        config.apply(decoder)
+    return decoder
+
+
+def _install_decoder_hook():
+    """Route aiortc's decoder creation through _configured_get_decoder (once)"""
+    import aiortc.rtcrtpreceiver
+    aiortc.rtcrtpreceiver.get_decoder = _configured_get_decoder
+
+
+def tap_receiver(receiver) -> ReceiverTap:
+    """
+    Get the tap attached to a receiver, creating it on first use
+
+    Args:
+        receiver: aiortc RTCRtpReceiver
+
+    Returns:
+        ReceiverTap: Shared tap for the receiver
+    """
+    tap = getattr(receiver, "_receiver_tap", None)
+    if tap is None:
+        tap = ReceiverTap(receiver)
+        receiver._receiver_tap = tap
+    return tap
+
+
+def find_receiver(pc, track):
+    """
+    Find the RTCRtpReceiver that delivers a track
+
+    Args:
+        pc: aiortc RTCPeerConnection
+        track: Remote media track
+
+    Returns:
+        RTCRtpReceiver or None
+    """
+    for receiver in pc.getReceivers():
+        if receiver.track is track:
+            return receiver
+    return None
+
+
+def track_index(pc, track) -> int:
+    """
+    Position of a track among the transceivers of its kind, in SDP order
+
+    With several cameras (or microphones) on one connection this tells the
+    tracks apart consistently on both ends of the negotiation.
+
+    Args:
+        pc: aiortc RTCPeerConnection
+        track: Remote media track
+
+    Returns:
+        int: 0 for the first track of its kind
+    """
+    transceivers = [transceiver for transceiver in pc.getTransceivers() if transceiver.kind == track.kind]
+    for index, transceiver in enumerate(transceivers):
+        if transceiver.receiver.track is track:
+            return index
+    return 0
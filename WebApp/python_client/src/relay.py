@@ -0,0 +1,368 @@
+"""
+WebRTC relay for Unity Render Streaming Python client
+
+Lets one Unity render host serve many remote consumers through a Python
+fan-out node. The client keeps its own session to Unity and runs a
+signaling endpoint that speaks the Render Streaming WebSocket protocol, so
+downstream peers (unity_client.py, or anything that talks to Unity's
+signaling server) connect to the relay as if it were Unity.
+
+Video is forwarded as encoded frames: each complete frame leaving the
+receiver's jitter buffer is packetized again by every downstream sender,
+without decoding or re-encoding. New viewers wait for a keyframe, and the
+relay asks Unity for one (rate-limited) whenever a viewer joins, reports
+picture loss or falls too far behind.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from fractions import Fraction
+from typing import Any, Deque, Dict, List, Optional, Set
+
+import av
+import websockets
+from aiortc import MediaStreamTrack, RTCRtpSender
+from aiortc.mediastreams import MediaStreamError
+
+from .webrtc_peer import WebRTCPeer
+
+VIDEO_TIME_BASE = Fraction(1, 90000)
+
+# Shortest interval between keyframe requests sent to Unity
+_KEYFRAME_REQUEST_INTERVAL = 0.5
+
+
+def is_keyframe(codec_name: str, data: bytes) -> bool:
+    """
+    Tell whether a depayloaded frame can be decoded on its own
+
+    Args:
+        codec_name: Codec of the frame ('H264' or 'VP8')
+        data: H.264 Annex B access unit or VP8 frame, as from the jitter buffer
+
+    Returns:
+        bool: True for H.264 IDR and VP8 key frames
+    """
+    if codec_name == "VP8":
+        # Frame tag bit 0 is 0 for key frames
+        return bool(data) and not data[0] & 0x01
+    if codec_name == "H264":
+        position = data.find(b"\x00\x00\x01")
+        while 0 <= position < len(data) - 3:
+            nal_type = data[position + 3] & 0x1F
+            if nal_type == 5:
+                return True
+            if nal_type == 1:
+                return False
+            position = data.find(b"\x00\x00\x01", position + 3)
+    return False
+
+
+class RelayTrack(MediaStreamTrack):
+    """Video track of one downstream peer, yielding encoded packets to its sender"""
+
+    kind = "video"
+
+    def __init__(self, relay: "TrackRelay", max_pending: int = 30):
+        """
+        Initialize relay track
+
+        Args:
+            relay: TrackRelay feeding this track
+            max_pending: Frames queued for a sender that falls behind before the
+                track skips ahead to the next keyframe
+        """
+        super().__init__()
+        self.relay = relay
+        self.max_pending = max_pending
+
+        # Counters
+        self.frames_sent = 0
+        self.frames_dropped = 0
+
+        self._pending: Deque = deque()
+        self._ready = asyncio.Event()
+        self._waiting_for_keyframe = True
+
+    def push(self, data: bytes, timestamp: int, keyframe: bool):
+        """Queue an encoded frame (called for every frame received from Unity)"""
+        if self._waiting_for_keyframe:
+            if not keyframe:
+                self.frames_dropped += 1
+                return
+            self._waiting_for_keyframe = False
+        if len(self._pending) >= self.max_pending:
+            # Inter frames can't be skipped one by one; restart from a keyframe
+            self.frames_dropped += len(self._pending) + 1
+            self._pending.clear()
+            self._waiting_for_keyframe = True
+            self.relay.request_keyframe()
+            return
+        self._pending.append((data, timestamp))
+        self._ready.set()
+
+    async def recv(self) -> av.Packet:
+        while not self._pending:
+            if self.readyState != "live":
+                raise MediaStreamError
+            self._ready.clear()
+            await self._ready.wait()
+        data, timestamp = self._pending.popleft()
+        packet = av.Packet(data)
+        packet.pts = timestamp
+        packet.time_base = VIDEO_TIME_BASE
+        self.frames_sent += 1
+        return packet
+
+    def stop(self):
+        super().stop()
+        self._ready.set()
+        self.relay.tracks.discard(self)
+
+
+class TrackRelay:
+    """Fans the encoded frames of one received Unity track out to downstream tracks"""
+
+    def __init__(self, codec_name: str = "H264"):
+        """
+        Initialize track relay
+
+        Args:
+            codec_name: Codec assumed until the first frame arrives (downstream
+                peers are offered only the codec Unity sends)
+        """
+        self.codec_name = codec_name.upper()
+        self.tracks: Set[RelayTrack] = set()
+        self.tap = None
+
+        # Counters
+        self.frames_forwarded = 0
+        self.bytes_forwarded = 0
+        self.keyframes = 0
+        self.keyframe_requests = 0
+
+        self._last_keyframe_request = 0.0
+        self.logger = logging.getLogger(__name__)
+
+    def attach(self, tap, decode: bool = True):
+        """
+        Start forwarding the frames of a received track
+
+        Args:
+            tap: receiver_tap.ReceiverTap of the Unity track
+            decode: False stops decoding the track locally (forwarding only)
+        """
+        self.tap = tap
+        tap.decode = decode
+        tap.on_encoded_frame.append(self._on_encoded_frame)
+
+    def _on_encoded_frame(self, codec, frame):
+        if codec is not None:
+            self.codec_name = codec.name.upper()
+        keyframe = is_keyframe(self.codec_name, frame.data)
+        self.frames_forwarded += 1
+        self.bytes_forwarded += len(frame.data)
+        self.keyframes += keyframe
+        for track in list(self.tracks):
+            track.push(frame.data, frame.timestamp, keyframe)
+
+    def create_track(self) -> RelayTrack:
+        """New downstream track; it starts at the next keyframe, which is requested now"""
+        track = RelayTrack(self)
+        self.tracks.add(track)
+        self.request_keyframe()
+        return track
+
+    def request_keyframe(self):
+        """Ask Unity for a keyframe, at most once per _KEYFRAME_REQUEST_INTERVAL"""
+        now = time.monotonic()
+        if self.tap is None or now - self._last_keyframe_request < _KEYFRAME_REQUEST_INTERVAL:
+            return
+        self._last_keyframe_request = now
+        self.keyframe_requests += 1
+        asyncio.ensure_future(self.tap.send_keyframe_request("pli"))
+
+    def codec_preferences(self) -> list:
+        """Sender capabilities limited to the relayed codec (and its RTX)"""
+        return [capability for capability in RTCRtpSender.getCapabilities("video").codecs
+                if capability.mimeType.split("/")[-1].upper() in (self.codec_name, "RTX")]
+
+    def stats(self) -> Dict[str, Any]:
+        """Forwarded frames, keyframes and per-viewer drops"""
+        tracks = list(self.tracks)
+        return {
+            "codec": self.codec_name,
+            "viewers": len(tracks),
+            "frames_forwarded": self.frames_forwarded,
+            "kbytes_forwarded": self.bytes_forwarded / 1024,
+            "keyframes": self.keyframes,
+            "keyframe_requests": self.keyframe_requests,
+            "frames_sent": sum(track.frames_sent for track in tracks),
+            "frames_dropped": sum(track.frames_dropped for track in tracks),
+        }
+
+
+class _ViewerSignaling:
+    """Render Streaming signaling messages to one downstream WebSocket, as WebRTCPeer expects"""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+
+    async def send_message(self, message: dict):
+        await self.websocket.send(json.dumps(message))
+
+    async def send_answer(self, connection_id: str, sdp: str):
+        await self.send_message({"type": "answer", "from": connection_id, "to": "",
+                                 "data": {"sdp": sdp, "connectionId": connection_id}})
+
+    async def send_offer(self, connection_id: str, sdp: str):
+        await self.send_message({"type": "offer", "from": connection_id, "to": "",
+                                 "data": {"sdp": sdp, "connectionId": connection_id}})
+
+    async def send_candidate(self, connection_id: str, candidate: str, sdp_mid: str, sdp_mline_index: int):
+        await self.send_message({"type": "candidate", "from": connection_id, "to": "",
+                                 "data": {"candidate": candidate, "sdpMid": sdp_mid,
+                                          "sdpMLineIndex": sdp_mline_index, "connectionId": connection_id}})
+
+
+class RelayServer:
+    """Signaling endpoint answering downstream peers with the relayed Unity tracks"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8090, video_tracks: int = 1,
+                 codec_name: str = "H264", max_viewers: int = 32):
+        """
+        Initialize relay server
+
+        Args:
+            host: Address to listen on (0.0.0.0 serves other machines)
+            port: WebSocket signaling port downstream peers connect to
+            video_tracks: Received video tracks to relay, in transceiver order
+            codec_name: Codec assumed until Unity's first frame arrives
+            max_viewers: Downstream peers served at once; more are refused
+        """
+        self.host = host
+        self.port = port
+        self.max_viewers = max_viewers
+        self.relays = [TrackRelay(codec_name) for _ in range(video_tracks)]
+
+        # Counters
+        self.peers_total = 0
+        self.peers_refused = 0
+
+        self._peers: Dict[str, WebRTCPeer] = {}
+        self._server = None
+        self.logger = logging.getLogger(__name__)
+
+    async def start(self):
+        """Start accepting downstream peers"""
+        self._server = await websockets.serve(self._handle_connection, self.host, self.port)
+        self.logger.info(f"🔁 Relaying {len(self.relays)} video track(s) to peers signaling on "
+                         f"ws://{self.host}:{self.port}")
+
+    async def _handle_connection(self, websocket):
+        """Serve the Render Streaming signaling messages of one downstream WebSocket"""
+        signaling = _ViewerSignaling(websocket)
+        connections: List[str] = []
+        try:
+            async for message in websocket:
+                data = json.loads(message)
+                message_type = data.get("type")
+                connection_id = data.get("connectionId") or data.get("from")
+                if message_type == "connect":
+                    connection_id = connection_id or str(uuid.uuid4())
+                    connections.append(connection_id)
+                    await signaling.send_message({"type": "connect", "connectionId": connection_id,
+                                                  "polite": True})
+                elif message_type == "disconnect":
+                    await self._close_peer(connection_id)
+                    await signaling.send_message({"type": "disconnect", "connectionId": connection_id})
+                elif message_type == "offer":
+                    await self._answer(signaling, connection_id, data.get("data", {}).get("sdp"))
+                elif message_type == "candidate" and connection_id in self._peers:
+                    await self._peers[connection_id].handle_ice_candidate(data.get("data", {}))
+        except websockets.ConnectionClosed:
+            pass
+        except Exception as e:
+            self.logger.error(f"Error in relay signaling: {e}")
+        finally:
+            for connection_id in connections:
+                await self._close_peer(connection_id)
+
+    async def _answer(self, signaling: _ViewerSignaling, connection_id: str, sdp: Optional[str]):
+        """Answer a downstream offer with one relay track per received video track"""
+        if not sdp:
+            return
+        if connection_id in self._peers or len(self._peers) >= self.max_viewers:
+            self.peers_refused += 1
+            await signaling.send_message({"type": "error", "message": f"{connection_id}: relay refused the offer"})
+            return
+        peer = WebRTCPeer(signaling, connection_id=connection_id, is_polite=True,
+                          video_codec=self.relays[0].codec_name.lower())
+        self._peers[connection_id] = peer
+        tracks = []
+        for relay in self.relays:
+            # Transceivers added before the offer take its video m-lines in order
+            track = relay.create_track()
+            tracks.append(track)
+            transceiver = peer.pc.addTransceiver(track, direction="sendonly")
+            transceiver.setCodecPreferences(relay.codec_preferences())
+            self._watch_keyframe_requests(transceiver.sender, relay)
+
+        @peer.pc.on("connectionstatechange")
+        async def on_connection_state_change():
+            if peer.pc.connectionState in ("failed", "closed"):
+                await self._close_peer(connection_id)
+
+        peer.pc.on("datachannel", lambda channel: self.logger.debug(
+            f"Ignoring data channel {channel.label} from relay peer {connection_id}"))
+        peer.tracks = tracks
+        try:
+            await peer.handle_offer(sdp)
+            await peer.send_local_candidates()
+        except Exception:
+            # The peer can't receive the codec Unity sends
+            await self._close_peer(connection_id)
+            return
+        self.peers_total += 1
+        self.logger.info(f"🔁 Relay peer {connection_id} joined ({len(self._peers)} connected)")
+
+    @staticmethod
+    def _watch_keyframe_requests(sender, relay: TrackRelay):
+        # aiortc answers PLI/FIR by flagging its encoder; there is none when
+        # forwarding, so pass the request on to Unity
+        send_keyframe = sender._send_keyframe
+
+        def forward_keyframe_request():
+            send_keyframe()
+            relay.request_keyframe()
+
+        sender._send_keyframe = forward_keyframe_request
+
+    async def _close_peer(self, connection_id: Optional[str]):
+        peer = self._peers.pop(connection_id, None)
+        if peer is None:
+            return
+        for track in getattr(peer, "tracks", []):
+            track.stop()
+        await peer.close()
+        self.logger.info(f"Relay peer {connection_id} left ({len(self._peers)} connected)")
+
+    def stats(self, track: int = 0) -> Dict[str, Any]:
+        """Downstream peers and forwarding counters of a relayed track"""
+        stats = self.relays[track].stats()
+        stats["peers"] = len(self._peers)
+        stats["peers_total"] = self.peers_total
+        stats["peers_refused"] = self.peers_refused
+        return stats
+
+    async def stop(self):
+        """Disconnect downstream peers and stop accepting new ones"""
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for connection_id in list(self._peers):
+            await self._close_peer(connection_id)
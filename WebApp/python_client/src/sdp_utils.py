@@ -0,0 +1,254 @@
+"""
+SDP codec parsing and preference helpers for Unity Render Streaming Python client
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+# H.264 profile_idc values (first byte of profile-level-id)
+H264_PROFILE_IDC = {
+    "constrained-baseline": 0x42,
+    "baseline": 0x42,
+    "main": 0x4D,
+    "high": 0x64,
+}
+
+# constraint_set1_flag: set for Constrained Baseline
+H264_CONSTRAINT_SET1 = 0x40
+
+SUPPORTED_CODECS = ["h264", "vp8"]
+H264_PROFILES = list(H264_PROFILE_IDC)
+
+
+@dataclass
+class SdpCodec:
+    """Codec described by a=rtpmap/a=fmtp lines of one media section"""
+    payload_type: int
+    name: str
+    clock_rate: int
+    channels: Optional[int] = None
+    parameters: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def is_rtx(self) -> bool:
+        return self.name.lower() == "rtx"
+
+    @property
+    def apt(self) -> Optional[int]:
+        """Payload type an RTX codec retransmits"""
+        apt = self.parameters.get("apt")
+        return int(apt) if apt is not None else None
+
+
+def parse_fmtp(value: str) -> Dict[str, str]:
+    """Parse 'key=value;key=value' fmtp parameters"""
+    parameters = {}
+    for item in value.split(";"):
+        item = item.strip()
+        if not item:
+            continue
+        key, _, val = item.partition("=")
+        parameters[key.strip()] = val.strip()
+    return parameters
+
+
+def h264_profile(profile_level_id: Optional[str]) -> Optional[str]:
+    """
+    Get the H.264 profile name from a profile-level-id
+
+    Args:
+        profile_level_id: Six hex digits (profile_idc, constraints, level_idc)
+
+    Returns:
+        str: Profile name from H264_PROFILES, or None if unknown
+    """
+    if not profile_level_id or len(profile_level_id) != 6:
+        return None
+    try:
+        profile_idc = int(profile_level_id[0:2], 16)
+        profile_iop = int(profile_level_id[2:4], 16)
+    except ValueError:
+        return None
+
+    if profile_idc == H264_PROFILE_IDC["baseline"]:
+        if profile_iop & H264_CONSTRAINT_SET1:
+            return "constrained-baseline"
+        return "baseline"
+    for name, idc in H264_PROFILE_IDC.items():
+        if idc == profile_idc:
+            return name
+    return None
+
+
+def codec_rank(name: str, parameters: Dict[str, str], codec: str,
+               profile: Optional[str] = None) -> int:
+    """
+    Rank how well a codec matches the preference (lower is better)
+
+    0: requested codec and profile, 1: requested codec with another profile
+    or packetization mode, 2: anything else
+    """
+    if name.lower() != codec.lower():
+        return 2
+    if name.lower() == "h264":
+        if parameters.get("packetization-mode", "0") != "1":
+            return 1
+        if profile and h264_profile(parameters.get("profile-level-id")) != profile:
+            return 1
+    return 0
+
+
+def parse_media_codecs(sdp: str) -> List[Dict[int, SdpCodec]]:
+    """
+    Parse codecs of every media section in an SDP
+
+    Returns:
+        list: One {payload_type: SdpCodec} dict per m= section, in order
+    """
+    sections: List[Dict[int, SdpCodec]] = []
+    fmtps: List[Dict[int, str]] = []
+
+    for line in sdp.splitlines():
+        if line.startswith("m="):
+            sections.append({})
+            fmtps.append({})
+        elif not sections:
+            continue
+        elif line.startswith("a=rtpmap:"):
+            pt, _, encoding = line[len("a=rtpmap:"):].partition(" ")
+            parts = encoding.split("/")
+            sections[-1][int(pt)] = SdpCodec(
+                payload_type=int(pt),
+                name=parts[0],
+                clock_rate=int(parts[1]) if len(parts) > 1 else 0,
+                channels=int(parts[2]) if len(parts) > 2 else None,
+            )
+        elif line.startswith("a=fmtp:"):
+            pt, _, value = line[len("a=fmtp:"):].partition(" ")
+            fmtps[-1][int(pt)] = value
+
+    for codecs, section_fmtps in zip(sections, fmtps):
+        for pt, value in section_fmtps.items():
+            if pt in codecs:
+                codecs[pt].parameters = parse_fmtp(value)
+
+    return sections
+
+
+def order_payload_types(codecs: Dict[int, SdpCodec], payload_types: Sequence[int],
+                        codec: str, profile: Optional[str] = None) -> List[int]:
+    """
+    Order payload types so the preferred codec comes first
+
+    Each RTX payload type follows the codec it retransmits, so RTX can never
+    end up ahead of the codec it belongs to.
+    """
+    media = [pt for pt in payload_types if pt not in codecs or not codecs[pt].is_rtx]
+    rtx_by_apt = {codecs[pt].apt: pt for pt in payload_types
+                  if pt in codecs and codecs[pt].is_rtx}
+
+    def rank(pt: int) -> int:
+        if pt not in codecs:
+            return 3
+        return codec_rank(codecs[pt].name, codecs[pt].parameters, codec, profile)
+
+    ordered = []
+    for pt in sorted(media, key=rank):
+        ordered.append(pt)
+        if pt in rtx_by_apt:
+            ordered.append(rtx_by_apt.pop(pt))
+    # RTX entries whose codec was not found keep their relative order at the end
+    ordered += [pt for pt in payload_types if pt in rtx_by_apt.values()]
+    return ordered
+
+
+def prefer_codec(sdp: str, codec: str = "h264", profile: Optional[str] = None,
+                 kind: str = "video") -> str:
+    """
+    Reorder the payload types of every m=<kind> section to prefer a codec
+
+    The a=rtpmap/a=rtcp-fb/a=fmtp lines are reordered to match the m= line,
+    since some stacks (aiortc among them) rank codecs by attribute order.
+
+    Args:
+        sdp: Session description
+        codec: Preferred codec name (e.g. 'h264', 'vp8')
+        profile: Preferred H.264 profile from H264_PROFILES
+        kind: Media kind to modify
+
+    Returns:
+        str: Modified session description
+    """
+    line_ending = "\r\n" if "\r\n" in sdp else "\n"
+    lines = sdp.split(line_ending)
+    sections = parse_media_codecs(sdp)
+    section_index = -1
+
+    starts = [i for i, line in enumerate(lines) if line.startswith("m=")]
+    for section_index, (start, end) in enumerate(zip(starts, starts[1:] + [len(lines)])):
+        parts = lines[start].split(" ")
+        if not parts[0] == f"m={kind}" or len(parts) <= 3:
+            continue
+        try:
+            payload_types = [int(pt) for pt in parts[3:]]
+        except ValueError:
+            continue
+        ordered = order_payload_types(sections[section_index], payload_types, codec, profile)
+        lines[start] = " ".join(parts[:3] + [str(pt) for pt in ordered])
+
+        # Per-codec attribute lines keep their slots, filled in preference order
+        position = {pt: index for index, pt in enumerate(ordered)}
+        slots = [(i, position[pt]) for i, pt in
+                 ((i, _attribute_payload_type(lines[i])) for i in range(start + 1, end)) if pt in position]
+        reordered = [lines[i] for i, _ in sorted(slots, key=lambda slot: slot[1])]
+        for (i, _), line in zip(slots, reordered):
+            lines[i] = line
+
+    return line_ending.join(lines)
+
+
+_CODEC_ATTRIBUTES = ("a=rtpmap:", "a=rtcp-fb:", "a=fmtp:")
+
+
+def _attribute_payload_type(line: str) -> Optional[int]:
+    """Payload type of an a=rtpmap, a=rtcp-fb or a=fmtp line"""
+    if not line.startswith(_CODEC_ATTRIBUTES):
+        return None
+    pt = line.partition(":")[2].partition(" ")[0]
+    return int(pt) if pt.isdigit() else None
+
+
+def negotiated_codec(sdp: str, kind: str = "video") -> Optional[SdpCodec]:
+    """Get the first codec of the first m=<kind> section (the one that will be used)"""
+    sections = parse_media_codecs(sdp)
+    section_index = -1
+    for line in sdp.splitlines():
+        if not line.startswith("m="):
+            continue
+        section_index += 1
+        parts = line.split(" ")
+        if parts[0] == f"m={kind}" and len(parts) > 3:
+            return sections[section_index].get(int(parts[3]))
+    return None
+
+
+def order_codec_capabilities(capabilities: Sequence, codec: str,
+                             profile: Optional[str] = None) -> list:
+    """
+    Order RTCRtpCodecCapability entries for RTCRtpTransceiver.setCodecPreferences
+
+    Args:
+        capabilities: Codecs from RTCRtpSender/RTCRtpReceiver.getCapabilities(kind)
+        codec: Preferred codec name
+        profile: Preferred H.264 profile from H264_PROFILES
+
+    Returns:
+        list: Capabilities with the preferred codec first and RTX last
+    """
+    def rank(capability) -> int:
+        name = capability.mimeType.split("/")[-1]
+        if name.lower() == "rtx":
+            return 3
+        return codec_rank(name, capability.parameters or {}, codec, profile)
+
+    return sorted(capabilities, key=rank)
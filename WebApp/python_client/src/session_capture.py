@@ -0,0 +1,319 @@
+"""
+Session capture and offline replay for Unity Render Streaming Python client
+
+A capture file is an 8 byte magic followed by length-prefixed records:
+<type u8, flags u8, time f64, length u32> and the payload. Times are
+seconds since the capture started. RTP records hold depayload-ready packets
+as they enter the receiver's jitter buffer (after RTX unwrapping), so replay
+runs the same jitter buffer and decoder as a live session.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import logging
+import queue
+import struct
+import threading
+import time
+from typing import Dict, Iterator, NamedTuple, Optional, Union
+
+from aiortc.codecs import depayload, get_decoder
+from aiortc.mediastreams import MediaStreamError, MediaStreamTrack
+from aiortc.rtcrtpparameters import RTCRtpCodecParameters
+from aiortc.rtcrtpreceiver import TimestampMapper
+from aiortc.rtp import RtpPacket
+
+from .playout import DEFAULT, create_jitter_buffer
+
+MAGIC = b"URSCAP1\n"
+RECORD_HEADER = struct.Struct("<BBdI")
+DATA_HEADER = struct.Struct("<BH")
+
+# Record types
+CODEC = 1
+RTP = 2
+SIGNALING = 3
+DATA_CHANNEL = 4
+
+# Record flags: media records hold the kind in bit 0 and the track index
+# (several cameras) above it, so older single-track captures read as track 0
+KINDS = ["video", "audio"]
+INCOMING = 0
+OUTGOING = 1
+
+
+class CaptureRecord(NamedTuple):
+    """One record of a capture file"""
+    type: int
+    flags: int
+    time: float
+    payload: bytes
+
+
+class SessionRecorder:
+    """Captures RTP, signaling and data channel traffic to a file from a writer thread"""
+
+    def __init__(self, output_file: str, max_queued_records: int = 8192):
+        """
+        Initialize session recorder
+
+        Args:
+            output_file: Capture file path
+            max_queued_records: Records buffered for the writer thread before dropping
+        """
+        self.output_file = output_file
+        self.records_written = 0
+        self.records_dropped = 0
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queued_records)
+        self._file = open(output_file, "wb")
+        self._file.write(MAGIC)
+        self._start_time = time.monotonic()
+        self._known_codecs = set()
+        self._thread = threading.Thread(target=self._run, name="session-capture", daemon=True)
+        self._thread.start()
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.info(f"Capturing session to {output_file}")
+
+    def record(self, record_type: int, flags: int, payload: bytes) -> bool:
+        """
+        Queue a record (never blocks the caller)
+
+        Returns:
+            bool: True if the record was queued
+        """
+        header = RECORD_HEADER.pack(record_type, flags, time.monotonic() - self._start_time,
+                                    len(payload))
+        try:
+            self._queue.put_nowait(header + payload)
+            return True
+        except queue.Full:
+            self.records_dropped += 1
+            if self.records_dropped % 1000 == 1:
+                self.logger.warning(f"Capture writer falling behind, dropped {self.records_dropped} records")
+            return False
+
+    def attach_receiver(self, tap, track: int = 0):
+        """
+        Capture the RTP packets of a receiver
+
+        Args:
+            tap: ReceiverTap of the receiver
+            track: Index of the track among those of its kind
+        """
+        kind = KINDS.index(tap.kind) | track << 1
+
+        def on_rtp_packet(packet: RtpPacket):
+            key = (kind, packet.payload_type)
+            if key not in self._known_codecs:
+                codec = tap.codecs.get(packet.payload_type)
+                if codec is None:
+                    return
+                self._known_codecs.add(key)
+                self.record(CODEC, kind, json.dumps({
+                    "payloadType": codec.payloadType,
+                    "mimeType": codec.mimeType,
+                    "clockRate": codec.clockRate,
+                    "channels": codec.channels,
+                    "parameters": codec.parameters,
+                }).encode("utf-8"))
+            self.record(RTP, kind, packet.serialize())
+
+        tap.on_rtp_packet.append(on_rtp_packet)
+
+    def attach_signaling(self, signaling):
+        """Capture the raw messages of a WebSocketSignaling"""
+        signaling.on_raw_message = lambda direction, message: self.record_signaling(
+            OUTGOING if direction == "out" else INCOMING, message)
+
+    def attach_datachannels(self, handler):
+        """Capture the traffic of a DataChannelHandler"""
+        handler.on_traffic = lambda direction, label, message: self.record_data(
+            OUTGOING if direction == "out" else INCOMING, label, message)
+
+    def record_signaling(self, direction: int, message: str):
+        """Capture a raw signaling message (INCOMING or OUTGOING)"""
+        self.record(SIGNALING, direction, message.encode("utf-8"))
+
+    def record_data(self, direction: int, label: str, message: Union[str, bytes]):
+        """Capture a data channel message (INCOMING or OUTGOING)"""
+        is_binary = not isinstance(message, str)
+        data = bytes(message) if is_binary else message.encode("utf-8")
+        encoded_label = label.encode("utf-8")
+        self.record(DATA_CHANNEL, direction,
+                    DATA_HEADER.pack(is_binary, len(encoded_label)) + encoded_label + data)
+
+    def _run(self):
+        """Writer thread: append queued records to the capture file"""
+        try:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                self._file.write(record)
+                self.records_written += 1
+        except Exception as e:
+            self.logger.error(f"Error writing capture file: {e}")
+        finally:
+            self._file.close()
+
+    def close(self):
+        """Write pending records and close the file (blocks until done)"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self.logger.info(f"Saved capture to {self.output_file} "
+                         f"({self.records_written} records, {self.records_dropped} dropped)")
+
+
+def read_capture(path: str) -> Iterator[CaptureRecord]:
+    """Iterate over the records of a capture file"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a session capture file: {path}")
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            record_type, flags, timestamp, length = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                # Truncated by an interrupted capture
+                return
+            yield CaptureRecord(record_type, flags, timestamp, payload)
+
+
+def decode_data_record(payload: bytes):
+    """Split a DATA_CHANNEL payload into (label, str or bytes)"""
+    is_binary, label_length = DATA_HEADER.unpack_from(payload)
+    start = DATA_HEADER.size + label_length
+    label = payload[DATA_HEADER.size:start].decode("utf-8")
+    data = payload[start:]
+    return label, data if is_binary else data.decode("utf-8")
+
+
+class ReplayTrack(MediaStreamTrack):
+    """Media track that decodes a capture file instead of the network"""
+
+    def __init__(self, path: str, kind: str = "video", speed: Optional[float] = 1.0,
+                 max_queued_frames: int = 8, playout: str = DEFAULT, track: int = 0,
+                 decoder_config=None):
+        """
+        Initialize replay track
+
+        Args:
+            path: Capture file written by SessionRecorder
+            kind: Media kind to replay ('video' or 'audio')
+            speed: Playback rate relative to the capture (2.0 = twice as fast);
+                None or 0 replays as fast as the consumer takes frames
+            max_queued_frames: Decoded frames buffered ahead of the consumer
+            playout: Jitter buffer behaviour (see playout.PLAYOUT_MODES)
+            track: Which track of this kind to replay when the capture holds
+                several (e.g. several cameras)
+            decoder_config: Optional decoder_config.DecoderConfig (threading)
+        """
+        super().__init__()
+        self.kind = kind
+        self.path = path
+        self.speed = speed or None
+        self.playout = playout
+        self.track = track
+        self.decoder_config = decoder_config
+        self.frames_decoded = 0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._max_queued_frames = max_queued_frames
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self.logger = logging.getLogger(__name__)
+
+    async def recv(self):
+        if self._thread is None:
+            loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue(self._max_queued_frames)
+            self._thread = threading.Thread(target=self._run, args=(loop,),
+                                            name=f"replay-{self.kind}", daemon=True)
+            self._thread.start()
+
+        frame = await self._queue.get()
+        if frame is None:
+            self.stop()
+            raise MediaStreamError
+        return frame
+
+    def _run(self, loop: asyncio.AbstractEventLoop):
+        """Replay thread: pace packets, reassemble frames and decode them"""
+        kind = KINDS.index(self.kind) | self.track << 1
+        codecs: Dict[int, RTCRtpCodecParameters] = {}
+        jitter_buffer = create_jitter_buffer(self.kind, self.playout)
+        timestamp_mapper = TimestampMapper()
+        decoder = None
+        decoder_codec = None
+        start = time.monotonic()
+
+        def deliver(frame) -> bool:
+            # Waiting on the consumer gives backpressure at max speed
+            future = asyncio.run_coroutine_threadsafe(self._queue.put(frame), loop)
+            while not self._stopped.is_set():
+                try:
+                    future.result(timeout=0.5)
+                    return True
+                except concurrent.futures.TimeoutError:
+                    continue
+            future.cancel()
+            return False
+
+        try:
+            for record in read_capture(self.path):
+                if self._stopped.is_set():
+                    return
+                if record.flags != kind:
+                    continue
+                if record.type == CODEC:
+                    info = json.loads(record.payload)
+                    codecs[info["payloadType"]] = RTCRtpCodecParameters(
+                        mimeType=info["mimeType"], clockRate=info["clockRate"],
+                        channels=info["channels"], payloadType=info["payloadType"],
+                        parameters=info["parameters"])
+                    continue
+                if record.type != RTP:
+                    continue
+
+                if self.speed:
+                    delay = start + record.time / self.speed - time.monotonic()
+                    # Waiting on the stop event ends the wait as soon as stop() is called
+                    if delay > 0 and self._stopped.wait(delay):
+                        return
+
+                packet = RtpPacket.parse(record.payload)
+                codec = codecs.get(packet.payload_type)
+                if codec is None:
+                    continue
+                packet._data = depayload(codec, packet.payload) if packet.payload else b""
+                _, encoded_frame = jitter_buffer.add(packet)
+                if encoded_frame is None:
+                    continue
+
+                if codec is not decoder_codec:
+                    decoder = get_decoder(codec)
+                    decoder_codec = codec
+                    if self.decoder_config:
+                        self.decoder_config.apply(decoder)
+                encoded_frame.timestamp = timestamp_mapper.map(encoded_frame.timestamp)
+                for frame in decoder.decode(encoded_frame):
+                    self.frames_decoded += 1
+                    if not deliver(frame):
+                        return
+        except Exception as e:
+            self.logger.error(f"Error replaying {self.path}: {e}")
+        finally:
+            if not self._stopped.is_set():
+                asyncio.run_coroutine_threadsafe(self._queue.put(None), loop)
+
+    def stop(self):
+        self._stopped.set()
+        super().stop()
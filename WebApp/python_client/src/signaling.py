@@ -34,6 +34,8 @@ class WebSocketSignaling:
         self.on_answer: Optional[Callable[[dict], None]] = None
         self.on_candidate: Optional[Callable[[dict], None]] = None
         self.on_error: Optional[Callable[[dict], None]] = None
+        # Raw traffic as (direction, message text); direction is "in" or "out"
+        self.on_raw_message: Optional[Callable[[str, str], None]] = None
         
         self.logger = logging.getLogger(__name__)
     
@@ -69,6 +71,8 @@ class WebSocketSignaling:
         """Handle incoming WebSocket messages"""
         try:
             async for message in self.websocket:
+                if self.on_raw_message:
+                    self.on_raw_message("in", message)
                 try:
                     data = json.loads(message)
                     await self._process_message(data)
@@ -151,7 +155,10 @@ class WebSocketSignaling:
             raise RuntimeError("WebSocket not connected")
         
         try:
-            await self.websocket.send(json.dumps(message))
+            text = json.dumps(message)
+            if self.on_raw_message:
+                self.on_raw_message("out", text)
+            await self.websocket.send(text)
             self.logger.debug(f"Sent message: {message}")
         except Exception as e:
             self.logger.error(f"Failed to send message: {e}")
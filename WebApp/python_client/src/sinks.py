@@ -0,0 +1,622 @@
+"""
+Frame sink graph for Unity Render Streaming Python client
+
+Every sink declares how often it wants frames (max_rate), in which format
+(bgr24, rgb24, gray, jpeg, png) and where it runs (inline on the event loop,
+on its own thread, or in its own process). SinkGraph fans each decoded frame
+out to all sinks: conversions are computed once per frame and shared by
+every sink asking for the same format, and each worker keeps only the latest
+pending frame, so a slow sink drops its own frames instead of delaying the
+others.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Where a sink runs
+INLINE = "inline"
+THREAD = "thread"
+PROCESS = "process"
+WORKERS = [INLINE, THREAD, PROCESS]
+
+# Frame formats a sink can ask for
+BGR24 = "bgr24"
+RGB24 = "rgb24"
+GRAY = "gray"
+JPEG = "jpeg"
+PNG = "png"
+FORMATS = [BGR24, RGB24, GRAY, JPEG, PNG]
+
+
+def convert_frame(image: np.ndarray, frame_format: str, jpeg_quality: int = 90) -> np.ndarray:
+    """
+    Convert a BGR frame
+
+    Returns:
+        np.ndarray: Image array, or a 1-D uint8 buffer for jpeg/png
+    """
+    if frame_format == BGR24:
+        return image
+    if frame_format == RGB24:
+        return np.ascontiguousarray(image[:, :, ::-1])
+
+    import cv2
+    if frame_format == GRAY:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if frame_format == JPEG:
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    elif frame_format == PNG:
+        ok, encoded = cv2.imencode(".png", image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    else:
+        raise ValueError(f"Unknown frame format: {frame_format}")
+    if not ok:
+        raise RuntimeError(f"Failed to encode frame as {frame_format}")
+    return encoded.reshape(-1)
+
+
+class SharedFrame:
+    """One decoded frame with conversions computed once and shared by all sinks"""
+
+    __slots__ = ("frame_count", "timestamp", "jpeg_quality", "_formats", "_lock")
+
+    def __init__(self, image: np.ndarray, frame_count: int, jpeg_quality: int = 90):
+        self.frame_count = frame_count
+        self.timestamp = time.monotonic()
+        self.jpeg_quality = jpeg_quality
+        self._formats: Dict[str, np.ndarray] = {BGR24: image}
+        self._lock = threading.Lock()
+
+    def repeat(self, frame_count: int) -> "SharedFrame":
+        """The same picture under a new frame number, sharing its conversions"""
+        frame = SharedFrame(self._formats[BGR24], frame_count, self.jpeg_quality)
+        frame._formats = self._formats
+        frame._lock = self._lock
+        return frame
+
+    def get(self, frame_format: str) -> np.ndarray:
+        """Get the frame in a format, converting on first request (thread-safe)"""
+        converted = self._formats.get(frame_format)
+        if converted is not None:
+            return converted
+        with self._lock:
+            converted = self._formats.get(frame_format)
+            if converted is None:
+                converted = convert_frame(self._formats[BGR24], frame_format, self.jpeg_quality)
+                self._formats[frame_format] = converted
+        return converted
+
+
+class FrameSink:
+    """Base class for frame consumers in a SinkGraph"""
+
+    def __init__(self, name: Optional[str] = None, max_rate: Optional[float] = None,
+                 frame_format: str = BGR24, worker: str = INLINE, writes: bool = False,
+                 skip_duplicates: bool = False):
+        """
+        Initialize frame sink
+
+        Args:
+            name: Name shown in stats (default: class name)
+            max_rate: Frames per second delivered at most (None = every frame)
+            frame_format: One of FORMATS
+            worker: INLINE (event loop; cheap sinks and HighGUI), THREAD or PROCESS
+            writes: True if process() modifies the frame; it then gets a private copy
+            skip_duplicates: Don't deliver frames repeating the previous picture
+                (needs duplicate detection on the pipeline)
+        """
+        if frame_format not in FORMATS:
+            raise ValueError(f"Unknown frame format: {frame_format}")
+        if worker not in WORKERS:
+            raise ValueError(f"Unknown sink worker: {worker}")
+        self.name = name or type(self).__name__
+        self.max_rate = max_rate
+        self.frame_format = frame_format
+        self.worker = worker
+        self.writes = writes
+        self.skip_duplicates = skip_duplicates
+
+    def open(self):
+        """Called once on the worker before the first frame"""
+
+    def process(self, frame: np.ndarray, frame_count: int):
+        """Consume one frame in the declared format"""
+        raise NotImplementedError
+
+    def close(self):
+        """Called once on the worker after the last frame"""
+
+
+class CallbackSink(FrameSink):
+    """Sink calling a function with (frame, frame_count)"""
+
+    def __init__(self, callback: Callable[[np.ndarray, int], Any], **kwargs):
+        """
+        Initialize callback sink
+
+        Args:
+            callback: Function taking (frame, frame_count); must be picklable
+                (a module-level function) for PROCESS workers
+            **kwargs: FrameSink options
+        """
+        kwargs.setdefault("name", getattr(callback, "__name__", None))
+        super().__init__(**kwargs)
+        self.callback = callback
+
+    def process(self, frame: np.ndarray, frame_count: int):
+        self.callback(frame, frame_count)
+
+
+class FileSink(FrameSink):
+    """Writes frames to numbered image files"""
+
+    def __init__(self, output_dir: str = "output", frame_format: str = JPEG,
+                 worker: str = THREAD, **kwargs):
+        """
+        Initialize file sink
+
+        Args:
+            output_dir: Directory for frame_NNNNNN.jpg/png files
+            frame_format: JPEG, PNG or BGR24 (written as JPEG with OpenCV defaults)
+            worker: THREAD by default so encoding and disk I/O stay off the loop
+            **kwargs: FrameSink options (skip_duplicates defaults to True)
+        """
+        kwargs.setdefault("skip_duplicates", True)
+        super().__init__(frame_format=frame_format, worker=worker, **kwargs)
+        self.output_dir = output_dir
+        self.extension = "png" if frame_format == PNG else "jpg"
+
+    def open(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def process(self, frame: np.ndarray, frame_count: int):
+        filename = os.path.join(self.output_dir, f"frame_{frame_count:06d}.{self.extension}")
+        if self.frame_format in (JPEG, PNG):
+            with open(filename, "wb") as f:
+                f.write(frame.data)
+        else:
+            import cv2
+            cv2.imwrite(filename, frame)
+
+
+RING_MAGIC = b"URSRING1"
+
+RING_HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("slots", "<u4"),
+    ("slot_header_size", "<u4"),
+    ("slot_size", "<u8"),
+    ("write_count", "<u8"),
+    ("reserved", "<u8", 4),
+])
+
+RING_SLOT_DTYPE = np.dtype([
+    ("sequence", "<u8"),
+    ("frame_count", "<i8"),
+    ("timestamp", "<f8"),
+    ("height", "<u4"),
+    ("width", "<u4"),
+    ("channels", "<u4"),
+    ("length", "<u4"),
+    ("reserved", "<u8", 2),
+])
+
+
+class SharedMemoryRingSink(FrameSink):
+    """Publishes frames to a shared-memory ring other processes read without copies through pipes"""
+
+    def __init__(self, name: str, slots: int = 4, max_frame_bytes: Optional[int] = None, **kwargs):
+        """
+        Initialize shared-memory ring sink
+
+        Args:
+            name: Shared memory block name (readers attach with SharedMemoryRingReader(name))
+            slots: Frames kept in the ring
+            max_frame_bytes: Slot size (default: size of the first frame)
+            **kwargs: FrameSink options (max_rate, frame_format other than jpeg/png;
+                skip_duplicates defaults to True, readers already hold the picture)
+        """
+        kwargs.setdefault("name", f"shm:{name}")
+        kwargs.setdefault("skip_duplicates", True)
+        super().__init__(**kwargs)
+        if self.frame_format in (JPEG, PNG):
+            raise ValueError("SharedMemoryRingSink stores raw frames")
+        self.memory_name = name
+        self.slots = slots
+        self.max_frame_bytes = max_frame_bytes
+        self.frames_too_large = 0
+        self._memory = None
+
+    def _create(self, frame_bytes: int):
+        from multiprocessing import shared_memory
+        slot_size = -(-(RING_SLOT_DTYPE.itemsize + frame_bytes) // 64) * 64
+        size = RING_HEADER_DTYPE.itemsize + self.slots * slot_size
+        self._memory = shared_memory.SharedMemory(self.memory_name, create=True, size=size)
+        buffer = np.ndarray(size, dtype=np.uint8, buffer=self._memory.buf)
+        self._header = buffer[:RING_HEADER_DTYPE.itemsize].view(RING_HEADER_DTYPE)
+        self._header["magic"] = RING_MAGIC
+        self._header["slots"] = self.slots
+        self._header["slot_header_size"] = RING_SLOT_DTYPE.itemsize
+        self._header["slot_size"] = slot_size
+        self._slot_headers = []
+        self._slot_data = []
+        for index in range(self.slots):
+            start = RING_HEADER_DTYPE.itemsize + index * slot_size
+            self._slot_headers.append(buffer[start:start + RING_SLOT_DTYPE.itemsize].view(RING_SLOT_DTYPE))
+            self._slot_data.append(buffer[start + RING_SLOT_DTYPE.itemsize:start + slot_size])
+
+    def process(self, frame: np.ndarray, frame_count: int):
+        if self._memory is None:
+            self._create(self.max_frame_bytes or frame.nbytes)
+        data = self._slot_data[0]
+        if frame.nbytes > data.size:
+            self.frames_too_large += 1
+            return
+
+        write_count = int(self._header["write_count"][0])
+        index = write_count % self.slots
+        slot = self._slot_headers[index]
+        # Sequence is odd while the slot is written, so readers can detect torn frames
+        sequence = 2 * write_count + 1
+        slot["sequence"] = sequence
+        self._slot_data[index][:frame.nbytes] = frame.reshape(-1).view(np.uint8)
+        slot["frame_count"] = frame_count
+        slot["timestamp"] = time.monotonic()
+        slot["height"] = frame.shape[0]
+        slot["width"] = frame.shape[1]
+        slot["channels"] = frame.shape[2] if frame.ndim == 3 else 0
+        slot["length"] = frame.nbytes
+        slot["sequence"] = sequence + 1
+        self._header["write_count"] = write_count + 1
+
+    def close(self):
+        if self._memory is not None:
+            self._slot_headers = self._slot_data = self._header = None
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+
+
+class SharedMemoryRingReader:
+    """Reads the newest frame of a SharedMemoryRingSink from any process"""
+
+    def __init__(self, name: str):
+        """
+        Initialize shared-memory ring reader
+
+        Args:
+            name: Name given to the SharedMemoryRingSink
+        """
+        from multiprocessing import shared_memory
+        self._memory = shared_memory.SharedMemory(name, create=False)
+        try:
+            # Only the writer owns the block; don't let this process's tracker unlink it
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self._memory._name, "shared_memory")
+        except Exception:
+            pass
+        buffer = np.ndarray(self._memory.size, dtype=np.uint8, buffer=self._memory.buf)
+        self._header = buffer[:RING_HEADER_DTYPE.itemsize].view(RING_HEADER_DTYPE)
+        if bytes(self._header["magic"][0]) != RING_MAGIC:
+            raise ValueError(f"Not a frame ring: {name}")
+        self._buffer = buffer
+
+    def latest(self, retries: int = 8) -> Optional[tuple]:
+        """
+        Copy the newest complete frame
+
+        Returns:
+            tuple: (frame_count, timestamp, frame) or None if nothing was written yet
+        """
+        slots = int(self._header["slots"][0])
+        slot_size = int(self._header["slot_size"][0])
+        for _ in range(retries):
+            write_count = int(self._header["write_count"][0])
+            if write_count == 0:
+                return None
+            start = RING_HEADER_DTYPE.itemsize + ((write_count - 1) % slots) * slot_size
+            slot = self._buffer[start:start + RING_SLOT_DTYPE.itemsize].view(RING_SLOT_DTYPE)[0]
+            sequence = int(slot["sequence"])
+            if sequence % 2:
+                continue
+            shape = (int(slot["height"]), int(slot["width"]))
+            if slot["channels"]:
+                shape += (int(slot["channels"]),)
+            data_start = start + RING_SLOT_DTYPE.itemsize
+            frame = self._buffer[data_start:data_start + int(slot["length"])].copy().reshape(shape)
+            frame_count, timestamp = int(slot["frame_count"]), float(slot["timestamp"])
+            if int(slot["sequence"]) == sequence:
+                return frame_count, timestamp, frame
+        return None
+
+    def close(self):
+        self._header = self._buffer = None
+        self._memory.close()
+
+
+class _Route:
+    """Runtime state of one sink in the graph"""
+
+    def __init__(self, sink: FrameSink):
+        self.sink = sink
+        self.interval = 1.0 / sink.max_rate if sink.max_rate else 0.0
+        self.next_due = 0.0
+        self.frames_delivered = 0
+        self.frames_dropped = 0
+        self.frames_skipped = 0
+        self.frames_duplicate = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.worker = None
+        self.logger = logging.getLogger(__name__)
+
+    def due(self, now: float) -> bool:
+        """Apply the sink's rate limit"""
+        if now < self.next_due:
+            self.frames_skipped += 1
+            return False
+        if self.interval:
+            # Stay on the cadence without bursting after a pause
+            self.next_due = max(self.next_due + self.interval, now)
+        return True
+
+    def deliver(self, frame: SharedFrame):
+        """Convert (shared) and run the sink on the calling thread"""
+        started = time.perf_counter()
+        try:
+            data = frame.get(self.sink.frame_format)
+            if self.sink.writes:
+                data = data.copy()
+            self.sink.process(data, frame.frame_count)
+            self.frames_delivered += 1
+        except Exception as e:
+            self.errors += 1
+            if self.errors % 100 == 1:
+                self.logger.error(f"Error in sink {self.sink.name}: {e}")
+        self.busy_seconds += time.perf_counter() - started
+
+
+class _Mailbox:
+    """Single-slot handoff that keeps only the newest frame"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._item = None
+        self._closed = False
+
+    def put(self, item) -> bool:
+        """Store an item; returns True if it replaced one not yet taken"""
+        with self._condition:
+            replaced = self._item is not None
+            self._item = item
+            self._condition.notify()
+            return replaced
+
+    def get(self):
+        """Wait for the next item; None once closed and empty"""
+        with self._condition:
+            while self._item is None and not self._closed:
+                self._condition.wait()
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+
+class _ThreadWorker:
+    """Runs one sink on a dedicated thread, dropping to the latest frame"""
+
+    def __init__(self, route: _Route):
+        self.route = route
+        self.mailbox = _Mailbox()
+        self.thread = threading.Thread(target=self._run, name=f"sink-{route.sink.name}", daemon=True)
+        self.thread.start()
+
+    def submit(self, frame: SharedFrame):
+        if self.mailbox.put(frame):
+            self.route.frames_dropped += 1
+
+    def _run(self):
+        sink = self.route.sink
+        try:
+            sink.open()
+            while True:
+                frame = self.mailbox.get()
+                if frame is None:
+                    break
+                self.route.deliver(frame)
+        except Exception as e:
+            self.route.logger.error(f"Error in sink {sink.name}: {e}")
+        finally:
+            try:
+                sink.close()
+            except Exception as e:
+                self.route.logger.error(f"Error closing sink {sink.name}: {e}")
+
+    def close(self, timeout: float):
+        self.mailbox.close()
+        self.thread.join(timeout)
+
+
+def _run_process_sink(sink: FrameSink, frames):
+    """Entry point of a PROCESS sink's worker process"""
+    sink.open()
+    try:
+        while True:
+            item = frames.get()
+            if item is None:
+                break
+            sink.process(*item)
+    finally:
+        sink.close()
+
+
+class _ProcessWorker:
+    """Runs one sink in a child process; a feeder thread keeps only the latest frame"""
+
+    def __init__(self, route: _Route):
+        self.route = route
+        import multiprocessing
+        self.mailbox = _Mailbox()
+        context = multiprocessing.get_context("spawn")
+        # One frame in flight plus the one being processed bounds memory and latency
+        self.frames = context.Queue(maxsize=1)
+        self.process = context.Process(target=_run_process_sink, args=(route.sink, self.frames),
+                                       name=f"sink-{route.sink.name}", daemon=True)
+        self.process.start()
+        self.thread = threading.Thread(target=self._feed, name=f"sink-feed-{route.sink.name}",
+                                       daemon=True)
+        self.thread.start()
+
+    def submit(self, frame: SharedFrame):
+        if self.mailbox.put(frame):
+            self.route.frames_dropped += 1
+
+    def _feed(self):
+        route = self.route
+        while True:
+            frame = self.mailbox.get()
+            if frame is None or not self.process.is_alive():
+                break
+            started = time.perf_counter()
+            try:
+                self.frames.put((frame.get(route.sink.frame_format), frame.frame_count))
+                route.frames_delivered += 1
+            except Exception as e:
+                route.errors += 1
+                route.logger.error(f"Error feeding sink {route.sink.name}: {e}")
+            route.busy_seconds += time.perf_counter() - started
+        try:
+            self.frames.put(None, timeout=1.0)
+        except Exception:
+            pass
+
+    def close(self, timeout: float):
+        self.mailbox.close()
+        self.thread.join(timeout)
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class SinkGraph:
+    """Fans decoded frames out to sinks with per-sink rate, format and worker"""
+
+    def __init__(self, jpeg_quality: int = 90):
+        """
+        Initialize sink graph
+
+        Args:
+            jpeg_quality: Quality of the shared JPEG conversion
+        """
+        self.jpeg_quality = jpeg_quality
+        self._routes: List[_Route] = []
+        # Last delivered frame, whose conversions duplicates reuse
+        self._last_frame: Optional[SharedFrame] = None
+        self.logger = logging.getLogger(__name__)
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    @property
+    def sinks(self) -> List[FrameSink]:
+        return [route.sink for route in self._routes]
+
+    def add(self, sink: FrameSink) -> FrameSink:
+        """Add a sink; THREAD and PROCESS workers start immediately"""
+        route = _Route(sink)
+        if sink.worker == THREAD:
+            route.worker = _ThreadWorker(route)
+        elif sink.worker == PROCESS:
+            route.worker = _ProcessWorker(route)
+        else:
+            sink.open()
+        self._routes.append(route)
+        self.logger.debug("Added %s sink %s (%s, max %s fps)", sink.worker, sink.name,
+                          sink.frame_format, sink.max_rate or "every")
+        return sink
+
+    def remove(self, sink: FrameSink, timeout: float = 5.0):
+        """Remove a sink and stop its worker"""
+        for route in self._routes:
+            if route.sink is sink:
+                self._routes.remove(route)
+                self._close_route(route, timeout)
+                return
+
+    def push(self, image: np.ndarray, frame_count: int, duplicate: bool = False):
+        """
+        Deliver a BGR frame to every sink that is due
+
+        Worker sinks are handed the frame first, then inline sinks run in
+        order. The frame is shared, so only sinks declared with writes=True
+        may modify what they receive.
+
+        Args:
+            image: BGR frame
+            frame_count: Frame number
+            duplicate: The frame repeats the previous picture; sinks with
+                skip_duplicates don't get it and conversions are reused
+        """
+        if not self._routes:
+            return
+        now = time.monotonic()
+        frame = None
+        inline = []
+        for route in self._routes:
+            if duplicate and route.sink.skip_duplicates:
+                route.frames_duplicate += 1
+                continue
+            if not route.due(now):
+                continue
+            if frame is None:
+                if duplicate and self._last_frame is not None:
+                    frame = self._last_frame.repeat(frame_count)
+                else:
+                    frame = SharedFrame(image, frame_count, self.jpeg_quality)
+            if route.worker is None:
+                inline.append(route)
+            else:
+                route.worker.submit(frame)
+        for route in inline:
+            route.deliver(frame)
+        if frame is not None or not duplicate:
+            self._last_frame = frame
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-sink delivered, dropped (slow sink), skipped (rate limit), duplicate and busy time"""
+        stats = {}
+        for route in self._routes:
+            stats[route.sink.name] = {
+                "worker": route.sink.worker,
+                "format": route.sink.frame_format,
+                "frames_delivered": route.frames_delivered,
+                "frames_dropped": route.frames_dropped,
+                "frames_skipped": route.frames_skipped,
+                "frames_duplicate": route.frames_duplicate,
+                "errors": route.errors,
+                "busy_ms": route.busy_seconds * 1000 / route.frames_delivered if route.frames_delivered else 0.0,
+            }
+        return stats
+
+    def _close_route(self, route: _Route, timeout: float):
+        try:
+            if route.worker is not None:
+                route.worker.close(timeout)
+            else:
+                route.sink.close()
+        except Exception as e:
+            self.logger.error(f"Error closing sink {route.sink.name}: {e}")
+
+    def close(self, timeout: float = 5.0):
+        """Stop all workers after their current frame (blocks up to timeout per sink)"""
+        routes, self._routes = self._routes, []
+        for route in routes:
+            self._close_route(route, timeout)
@@ -0,0 +1,212 @@
+"""
+Receiver-driven stream constraints for Unity Render Streaming Python client
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+# Ceiling used for adaptive bitrate when no explicit maximum is given
+DEFAULT_MAX_BITRATE_KBPS = 8000
+DEFAULT_MIN_BITRATE_KBPS = 150
+
+
+@dataclass
+class StreamConstraints:
+    """Limits the receiver asks the sender to respect"""
+    max_bitrate_kbps: Optional[int] = None
+    max_framerate: Optional[float] = None
+    max_width: Optional[int] = None
+    max_height: Optional[int] = None
+
+    @staticmethod
+    def parse_resolution(value: str):
+        """Parse 'WIDTHxHEIGHT' into (width, height)"""
+        width, _, height = value.lower().partition("x")
+        return int(width), int(height)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.max_bitrate_kbps or self.max_framerate or self.max_width or self.max_height)
+
+
+def apply_sdp_constraints(sdp: str, constraints: StreamConstraints, kind: str = "video") -> str:
+    """
+    Add bandwidth, framerate and resolution limits to every m=<kind> section
+
+    b=AS/b=TIAS are honoured by libwebrtc senders as a hard bitrate cap.
+    a=framerate and a=imageattr are advisory and may be ignored by the sender.
+
+    Args:
+        sdp: Local session description (offer or answer)
+        constraints: Limits to apply
+        kind: Media kind to modify
+
+    Returns:
+        str: Modified session description
+    """
+    line_ending = "\r\n" if "\r\n" in sdp else "\n"
+    lines = sdp.split(line_ending)
+    trailer = [lines.pop()] if lines and lines[-1] == "" else []
+    output: List[str] = []
+    payload_types: Optional[List[str]] = None
+
+    def close_section():
+        # Attributes go at the end of the media section
+        if payload_types is None:
+            return
+        if constraints.max_framerate:
+            output.append(f"a=framerate:{constraints.max_framerate:g}")
+        if constraints.max_width and constraints.max_height:
+            for pt in payload_types:
+                output.append(f"a=imageattr:{pt} recv [x=[1:{constraints.max_width}],"
+                              f"y=[1:{constraints.max_height}]]")
+
+    for line in lines:
+        if line.startswith("m="):
+            close_section()
+            payload_types = line.split(" ")[3:] if line.startswith(f"m={kind} ") else None
+        elif payload_types is not None:
+            # Replace any existing limits with ours
+            if constraints.max_bitrate_kbps and line.startswith(("b=AS:", "b=TIAS:")):
+                continue
+            if constraints.max_framerate and line.startswith("a=framerate:"):
+                continue
+            if constraints.max_width and line.startswith("a=imageattr:"):
+                continue
+            if constraints.max_bitrate_kbps and line.startswith("c="):
+                # Bandwidth lines follow the connection line
+                output.append(line)
+                output.append(f"b=AS:{constraints.max_bitrate_kbps}")
+                output.append(f"b=TIAS:{constraints.max_bitrate_kbps * 1000}")
+                continue
+        output.append(line)
+    close_section()
+
+    return line_ending.join(output + trailer)
+
+
+class BitrateController:
+    """Caps and adapts the sender's bitrate with REMB feedback"""
+
+    def __init__(self, max_bitrate_kbps: Optional[int] = None,
+                 min_bitrate_kbps: int = DEFAULT_MIN_BITRATE_KBPS,
+                 adaptive: bool = False, interval: float = 1.0,
+                 high_utilisation: float = 0.85, low_utilisation: float = 0.5):
+        """
+        Initialize bitrate controller
+
+        Args:
+            max_bitrate_kbps: Hard cap on the sender bitrate
+            min_bitrate_kbps: Lowest bitrate adaptation will request
+            adaptive: Whether to follow the client's own processing throughput
+            interval: Seconds between adaptation steps / REMB reports
+            high_utilisation: Busy fraction above which the bitrate is reduced
+            low_utilisation: Busy fraction below which the bitrate is raised again
+        """
+        self.max_bitrate_kbps = max_bitrate_kbps or (DEFAULT_MAX_BITRATE_KBPS if adaptive else None)
+        self.min_bitrate_kbps = min(min_bitrate_kbps, self.max_bitrate_kbps or min_bitrate_kbps)
+        self.adaptive = adaptive
+        self.interval = interval
+        self.high_utilisation = high_utilisation
+        self.low_utilisation = low_utilisation
+
+        self.target_bitrate_kbps = self.max_bitrate_kbps
+        self.utilisation = 0.0
+        self.received_fps = 0.0
+
+        self._taps = []
+        self._busy_time = 0.0
+        self._frames = 0
+        self._window_start = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bitrate_kbps is not None
+
+    def attach(self, tap):
+        """Apply the cap to a receiver observed by a ReceiverTap"""
+        self._taps.append(tap)
+        if self.target_bitrate_kbps:
+            tap.max_bitrate = self.target_bitrate_kbps * 1000
+        if self._task is None and self.enabled:
+            self._task = asyncio.create_task(self._run())
+
+    def record_frame(self, processing_time: float):
+        """
+        Report one frame handled by the client
+
+        Args:
+            processing_time: Seconds the client spent on the frame
+        """
+        self._frames += 1
+        self._busy_time += processing_time
+
+    def _adapt(self):
+        """Update the target bitrate from the last interval's throughput"""
+        now = time.monotonic()
+        elapsed = max(now - self._window_start, 1e-6)
+        self.utilisation = self._busy_time / elapsed
+        self.received_fps = self._frames / elapsed
+        self._busy_time = 0.0
+        self._frames = 0
+        self._window_start = now
+
+        if not self.adaptive or not self.received_fps:
+            return
+
+        previous = self.target_bitrate_kbps
+        if self.utilisation > self.high_utilisation:
+            # Back off multiplicatively when the client can't keep up
+            self.target_bitrate_kbps = max(self.min_bitrate_kbps, int(previous * 0.85))
+        elif self.utilisation < self.low_utilisation:
+            self.target_bitrate_kbps = min(self.max_bitrate_kbps, int(previous * 1.08) + 1)
+
+        if self.target_bitrate_kbps != previous:
+            self.logger.info(f"Adaptive bitrate: {previous} -> {self.target_bitrate_kbps} kbps "
+                             f"(utilisation {self.utilisation:.0%}, {self.received_fps:.1f} fps)")
+
+    async def _run(self):
+        """Periodically adapt and send REMB so the sender follows the target"""
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                self._adapt()
+                for tap in self._taps:
+                    tap.max_bitrate = self.target_bitrate_kbps * 1000
+                    await tap.send_remb(tap.max_bitrate)
+        except asyncio.CancelledError:
+            pass
+
+    def stop(self):
+        """Stop sending bitrate feedback"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+class FrameRateLimiter:
+    """Skips frames that arrive faster than a maximum rate"""
+
+    def __init__(self, max_framerate: Optional[float] = None):
+        self.min_interval = 1.0 / max_framerate if max_framerate else 0.0
+        self._next_time = 0.0
+        self.frames_skipped = 0
+
+    def accept(self, now: Optional[float] = None) -> bool:
+        """Return True if a frame arriving now should be processed"""
+        if not self.min_interval:
+            return True
+        now = time.monotonic() if now is None else now
+        if now < self._next_time:
+            self.frames_skipped += 1
+            return False
+        # Stay on a fixed grid so the average rate matches the limit, but
+        # restart the grid after a gap instead of letting a burst through
+        self._next_time = max(self._next_time + self.min_interval, now + self.min_interval / 2)
+        return True
@@ -6,14 +6,18 @@ import asyncio
 import logging
 from typing import Optional, Callable
 import aiortc
-from aiortc import RTCPeerConnection, RTCSessionDescription, RTCIceCandidate
-from aiortc.contrib.media import MediaPlayer, MediaRelay
+from aiortc import RTCPeerConnection, RTCRtpSender, RTCSessionDescription, RTCIceCandidate
+from aiortc.sdp import SessionDescription, candidate_to_sdp
+
+from .sdp_utils import codec_rank, negotiated_codec, order_codec_capabilities, prefer_codec
 
 
 class WebRTCPeer:
     """WebRTC peer connection for receiving video streams"""
     
-    def __init__(self, signaling, rtc_config=None, connection_id: str = None, is_polite: bool = False):
+    def __init__(self, signaling, rtc_config=None, connection_id: str = None, is_polite: bool = False,
+                 video_codec: Optional[str] = None, h264_profile: Optional[str] = None,
+                 sdp_filter: Optional[Callable[[str], str]] = None):
         """
         Initialize WebRTC peer connection
         
@@ -22,10 +26,17 @@ class WebRTCPeer:
             rtc_config: Optional RTCConfiguration object
             connection_id: Connection identifier (optional for enhanced client)
             is_polite: Whether this peer is "polite" in the negotiation
+            video_codec: Video codec to prefer when answering (e.g. 'h264', 'vp8')
+            h264_profile: H.264 profile to prefer when answering or offering
+            sdp_filter: Optional rewrite applied to local offers and answers
+                (e.g. bitrate constraints)
         """
         self.signaling = signaling
         self.connection_id = connection_id
         self.is_polite = is_polite
+        self.video_codec = video_codec
+        self.h264_profile = h264_profile
+        self.sdp_filter = sdp_filter
         
         # Use provided config or create default
         if rtc_config:
@@ -89,7 +100,7 @@ class WebRTCPeer:
         try:
             await self.signaling.send_candidate(
                 self.connection_id,
-                candidate.candidate,
+                f"candidate:{candidate_to_sdp(candidate)}",
                 candidate.sdpMid,
                 candidate.sdpMLineIndex
             )
@@ -115,8 +126,14 @@ class WebRTCPeer:
             offer = RTCSessionDescription(sdp=sdp, type="offer")
             await self.pc.setRemoteDescription(offer)
             
-            # Create and send answer
+            # Create and send answer; aiortc lists codecs in the offer's a=rtpmap
+            # order, so the answer is reordered for the sender to pick our codec
             answer = await self.pc.createAnswer()
+            if self.video_codec:
+                answer = RTCSessionDescription(
+                    sdp=prefer_codec(answer.sdp, self.video_codec, self.h264_profile), type=answer.type)
+                self._check_answer_codec(answer.sdp)
+            answer = self._filter_description(answer)
             await self.pc.setLocalDescription(answer)
             
             await self.signaling.send_answer(self.connection_id, answer.sdp)
@@ -126,6 +143,21 @@ class WebRTCPeer:
             self.logger.error(f"Error handling offer: {e}")
             raise
     
+    async def send_local_candidates(self):
+        """
+        Send the ICE candidates of the local description
+        
+        aiortc gathers every candidate in setLocalDescription() and emits no
+        icecandidate events. Peers that only learn candidates by trickling
+        (e.g. downstream relay peers offering without candidates) need them
+        sent explicitly.
+        """
+        description = SessionDescription.parse(self.pc.localDescription.sdp)
+        for index, media in enumerate(description.media):
+            for candidate in media.ice_candidates:
+                await self.signaling.send_candidate(
+                    self.connection_id, f"candidate:{candidate_to_sdp(candidate)}", media.rtp.muxId, index)
+    
     async def handle_answer(self, sdp: str):
         """
         Handle incoming SDP answer
@@ -138,6 +170,10 @@ class WebRTCPeer:
             await self.pc.setRemoteDescription(answer)
             self.logger.info("Set remote description from answer")
             
+            selected = negotiated_codec(sdp)
+            if selected:
+                self.logger.info(f"Remote selected video codec: {selected.name} {selected.parameters or ''}")
+            
         except Exception as e:
             self.logger.error(f"Error handling answer: {e}")
             raise
@@ -152,75 +188,10 @@ class WebRTCPeer:
         try:
             self.logger.debug(f"ICE candidate data: {candidate_data}")
             if candidate_data.get('candidate'):
-                candidate_str = candidate_data['candidate']
-                
-                # Parse the candidate string if it's in the format "candidate:..."
-                if isinstance(candidate_str, str):
-                    # Unity sends ICE candidates in the standard SDP format
-                    # We need to create the RTCIceCandidate from the string
-                    
-                    # Handle sdpMid - convert to string if it's an int or None
-                    sdp_mid = candidate_data.get('sdpMid')
-                    if sdp_mid is not None:
-                        sdp_mid = str(sdp_mid)
-                    
-                    # Handle sdpMLineIndex - ensure it's an int
-                    sdp_mline_index = candidate_data.get('sdpMLineIndex')
-                    if isinstance(sdp_mline_index, str):
-                        sdp_mline_index = int(sdp_mline_index)
-                    
-                    # Parse the candidate string to extract fields
-                    # Unity sends candidates in the format:
-                    # "candidate:foundation component protocol priority ip port typ type ..."
-                    
-                    # Remove "candidate:" prefix if present
-                    if candidate_str.startswith('candidate:'):
-                        candidate_str = candidate_str[10:]
-                    
-                    # Split into components
-                    parts = candidate_str.split()
-                    if len(parts) >= 6:
-                        foundation = parts[0]
-                        component = int(parts[1])
-                        protocol = parts[2]
-                        priority = int(parts[3])
-                        ip = parts[4]
-                        port = int(parts[5])
-                        
-                        # Find the type (after "typ")
-                        typ = "host"  # default
-                        if "typ" in parts:
-                            typ_index = parts.index("typ")
-                            if typ_index + 1 < len(parts):
-                                typ = parts[typ_index + 1]
-                        
-                        candidate = RTCIceCandidate(
-                            foundation=foundation,
-                            component=component,
-                            protocol=protocol,
-                            priority=priority,
-                            ip=ip,
-                            port=port,
-                            type=typ,
-                            sdpMid=sdp_mid,
-                            sdpMLineIndex=sdp_mline_index
-                        )
-                    else:
-                        self.logger.error(f"Invalid candidate format: {candidate_str}")
-                        return
-                else:
-                    # If it's already parsed, use the individual fields
-                    candidate = RTCIceCandidate(
-                        foundation=candidate_data.get('foundation'),
-                        component=candidate_data.get('component', 1),
-                        protocol=candidate_data.get('protocol', 'udp'),
-                        priority=candidate_data.get('priority', 0),
-                        ip=candidate_data.get('ip'),
-                        port=candidate_data.get('port'),
-                        type=candidate_data.get('type', 'host'),
-                        sdpMid=candidate_data.get('sdpMid'),
-                        sdpMLineIndex=candidate_data.get('sdpMLineIndex')
-                    )
+                candidate = parse_ice_candidate(candidate_data)
+                if candidate is None:
+                    self.logger.error(f"Invalid candidate format: {candidate_data['candidate']}")
+                    return
                 
                 await self.pc.addIceCandidate(candidate)
                 self.logger.debug("Added ICE candidate")
@@ -234,6 +205,16 @@ class WebRTCPeer:
         try:
             self.is_making_offer = True
             offer = await self.pc.createOffer()
+            
+            # Reorder payload types in the SDP as well as the transceiver preferences
+            if self.video_codec:
+                offer = RTCSessionDescription(
+                    sdp=prefer_codec(offer.sdp, self.video_codec, self.h264_profile), type=offer.type)
+            offer = self._filter_description(offer)
+            preferred = negotiated_codec(offer.sdp)
+            if preferred:
+                self.logger.info(f"Preferred video codec: {preferred.name} (payload type "
+                                 f"{preferred.payload_type}, {preferred.parameters or 'no fmtp'})")
             await self.pc.setLocalDescription(offer)
             
             await self.signaling.send_offer(self.connection_id, offer.sdp)
@@ -245,6 +226,43 @@ class WebRTCPeer:
         finally:
             self.is_making_offer = False
     
+    def _check_answer_codec(self, sdp: str):
+        """Log the video codec the answer selects, warning if it is not the preferred one"""
+        selected = negotiated_codec(sdp)
+        if selected is None:
+            return
+        description = f"{selected.name} (payload type {selected.payload_type}, {selected.parameters or 'no fmtp'})"
+        if codec_rank(selected.name, selected.parameters, self.video_codec, self.h264_profile):
+            preferred = self.video_codec + (f" {self.h264_profile}" if self.h264_profile else "")
+            self.logger.warning(f"Offer has no {preferred} video codec, answering with {description}")
+        else:
+            self.logger.info(f"Answering with video codec {description}")
+    
+    def _filter_description(self, description: RTCSessionDescription) -> RTCSessionDescription:
+        """Apply sdp_filter to a local description"""
+        if not self.sdp_filter:
+            return description
+        return RTCSessionDescription(sdp=self.sdp_filter(description.sdp), type=description.type)
+    
+    def add_transceiver(self, kind: str, direction: str = "recvonly"):
+        """
+        Add a transceiver, ordering video codecs by the configured preference
+        
+        Args:
+            kind: 'video' or 'audio'
+            direction: Transceiver direction
+            
+        Returns:
+            RTCRtpTransceiver: Created transceiver
+        """
+        transceiver = self.pc.addTransceiver(kind, direction=direction)
+        if kind == "video" and self.video_codec:
+            # aiortc orders the offer's m-line from these preferences
+            transceiver.setCodecPreferences(order_codec_capabilities(
+                RTCRtpSender.getCapabilities("video").codecs, self.video_codec, self.h264_profile))
+        self.logger.info(f"Added {kind} transceiver ({direction})")
+        return transceiver
+    
     async def close(self):
         """Close peer connection"""
         if self.pc:
@@ -277,4 +295,70 @@ class WebRTCPeer:
             return channel
         else:
             self.logger.error("Cannot create data channel: no peer connection")
-            return None
\ No newline at end of file
+            return None
+
+
+def parse_ice_candidate(candidate_data: dict) -> Optional[RTCIceCandidate]:
+    """
+    Build an RTCIceCandidate from a signaling candidate message
+    
+    Args:
+        candidate_data: Dict with 'candidate' (SDP candidate string or dict of
+            parsed fields), 'sdpMid' and 'sdpMLineIndex'
+        
+    Returns:
+        RTCIceCandidate, or None if the candidate string is malformed
+    """
+    candidate_str = candidate_data['candidate']
+    
+    # Parse the candidate string if it's in the format "candidate:..."
+    if not isinstance(candidate_str, str):
+        # If it's already parsed, use the individual fields
+        return RTCIceCandidate(
+            foundation=candidate_data.get('foundation'),
+            component=candidate_data.get('component', 1),
+            protocol=candidate_data.get('protocol', 'udp'),
+            priority=candidate_data.get('priority', 0),
+            ip=candidate_data.get('ip'),
+            port=candidate_data.get('port'),
+            type=candidate_data.get('type', 'host'),
+            sdpMid=candidate_data.get('sdpMid'),
+            sdpMLineIndex=candidate_data.get('sdpMLineIndex')
+        )
+    
+    # Handle sdpMid - convert to string if it's an int or None
+    sdp_mid = candidate_data.get('sdpMid')
+    if sdp_mid is not None:
+        sdp_mid = str(sdp_mid)
+    
+    # Handle sdpMLineIndex - ensure it's an int
+    sdp_mline_index = candidate_data.get('sdpMLineIndex')
+    if isinstance(sdp_mline_index, str):
+        sdp_mline_index = int(sdp_mline_index)
+    
+    # Unity sends candidates in the standard SDP format:
+    # "candidate:foundation component protocol priority ip port typ type ..."
+    if candidate_str.startswith('candidate:'):
+        candidate_str = candidate_str[10:]
+    parts = candidate_str.split()
+    if len(parts) < 6:
+        return None
+    
+    # Find the type (after "typ")
+    typ = "host"  # default
+    if "typ" in parts:
+        typ_index = parts.index("typ")
+        if typ_index + 1 < len(parts):
+            typ = parts[typ_index + 1]
+    
+    return RTCIceCandidate(
+        foundation=parts[0],
+        component=int(parts[1]),
+        protocol=parts[2],
+        priority=int(parts[3]),
+        ip=parts[4],
+        port=int(parts[5]),
+        type=typ,
+        sdpMid=sdp_mid,
+        sdpMLineIndex=sdp_mline_index
+    )
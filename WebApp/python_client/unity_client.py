@@ -8,24 +8,37 @@ import asyncio
 import logging
 import argparse
 import signal
+import sys
 import uuid
 import json
-import cv2
 import os
 import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable
 
-import aiortc
-from aiortc import RTCPeerConnection, RTCSessionDescription
-from aiortc.codecs import get_capabilities
 import numpy as np
-from PIL import Image
 
-# Import our existing modules
-from src.signaling import WebSocketSignaling
-from src.media_handlers import VideoReceiver
+# Import our existing modules. aiortc, OpenCV and websockets are imported
+# where they are first needed, so --help, argument errors and headless
+# runs start without loading them.
+from src.media_handlers import AudioReceiver, VideoReceiver, track_output_path
+from src.sdp_utils import H264_PROFILES, SUPPORTED_CODECS
+from src.stream_constraints import (BitrateController, FrameRateLimiter, StreamConstraints,
+                                    apply_sdp_constraints)
+from src.input_remoting import InputRemotingSender
+from src.closed_loop import FrameWaiters, StepResult
+from src.frame_stream import DROP_OLDEST, FrameHub
+from src.frame_archive import ENCODINGS, FrameArchive
+from src.sinks import CallbackSink, FrameSink, SharedMemoryRingSink
+from src.rebroadcast import RebroadcastSink, parse_address
+from src.keyframe_recovery import KEYFRAME_METHODS, KeyframeRecovery
+from src.playout import DEFAULT, PLAYOUT_MODES, create_jitter_buffer
+from src.decoder_config import THREAD_TYPES, DecoderConfig
+from src.loop_watchdog import LoopWatchdog, install_uvloop
+from src.profiler import StageProfiler
+from src.daemon import DEFAULT_SOCKET, StreamingDaemon
 
 # Set up logging
 logging.basicConfig(
@@ -39,16 +52,35 @@ logger = logging.getLogger(__name__)
 class EnhancedVideoReceiver(VideoReceiver):
     """Enhanced video receiver with screenshot and control capabilities"""
     
-    def __init__(self, enable_screenshots=False, screenshot_dir="screenshots", screenshot_format="jpg"):
-        super().__init__()
+    def __init__(self, enable_screenshots=False, screenshot_dir="screenshots", screenshot_format="jpg",
+                 max_framerate=None, bitrate_controller=None, frame_waiters=None, display=True,
+                 playout=DEFAULT, detect_duplicates=False, track=0, convert_in_thread=False):
+        # Frames beyond max_framerate are dropped before conversion; the
+        # display sink is added below with the interactive controls. Extra
+        # tracks get their own window, cascaded from the first one
+        window_name = "Unity Render Streaming" if track == 0 else f"Unity Render Streaming - Track {track + 1}"
+        super().__init__(display_window=False, frame_limiter=FrameRateLimiter(max_framerate),
+                         frame_waiters=frame_waiters, receive_timeout=5.0,
+                         max_consecutive_timeouts=None, start_delay=0.0, playout=playout,
+                         detect_duplicates=detect_duplicates, window_name=window_name,
+                         window_position=(100 + 40 * track, 100 + 40 * track),
+                         convert_in_thread=convert_in_thread)
+        self.track = track
+        self.display_window = display
         self.enable_screenshots = enable_screenshots
         self.screenshot_dir = Path(screenshot_dir)
         self.screenshot_format = screenshot_format.lower()
         self.screenshot_handler = None
         self.frame_handler = None
-        self.current_frame = None
         self.quit_requested = False
         
+        self.bitrate_controller = bitrate_controller
+        if bitrate_controller:
+            self.pipeline.on_frame_processed = bitrate_controller.record_frame
+        
+        if self.display_window:
+            self.pipeline.add_sink(self._display_frame_with_controls, name="display", writes=True)
+        
         # Create screenshot directory
         if self.enable_screenshots:
             self.screenshot_dir.mkdir(exist_ok=True)
@@ -60,76 +92,62 @@ class EnhancedVideoReceiver(VideoReceiver):
         
     def set_frame_handler(self, handler: Callable[[np.ndarray, int], np.ndarray]):
         """Set custom frame processing handler"""
+        # Registered on first use: a transform costs a frame copy per frame
+        if self.frame_handler is None:
+            self.pipeline.add_transform(self._apply_frame_handler)
         self.frame_handler = handler
         
+    def _apply_frame_handler(self, frame, frame_count):
+        if self.frame_handler:
+            return self.frame_handler(frame, frame_count)
+        return None
+        
     async def handle_track(self, track):
         """Handle incoming video track with enhanced features"""
-        frame_count = 0
-        
+        if self.quit_requested:
+            return
         try:
-            # Create window if displaying
-            if not self.quit_requested:
-                cv2.namedWindow("Unity Render Streaming", cv2.WINDOW_AUTOSIZE | cv2.WINDOW_KEEPRATIO)
-                cv2.moveWindow("Unity Render Streaming", 100, 100)
-                logger.info("Created video window with enhanced controls")
-            
-            # Main video loop using track.recv()
-            while not self.quit_requested:
-                try:
-                    # Receive frame from track
-                    frame = await asyncio.wait_for(track.recv(), timeout=5.0)
-                    
-                    if frame is None:
-                        logger.warning("Received None frame")
-                        break
-                        
-                    frame_count += 1
-                    
-                    # Convert to numpy array
-                    img = frame.to_ndarray(format="bgr24")
-                    self.current_frame = img.copy()
-                    
-                    # Call custom frame handler if set
-                    if self.frame_handler:
-                        try:
-                            img = self.frame_handler(img, frame_count)
-                        except Exception as e:
-                            logger.error(f"Error in frame handler: {e}")
-                            
-                    # Display frame with enhanced controls
-                    if not self.quit_requested:
-                        self._display_frame_with_controls(img, frame_count)
-                        
-                    # Log progress every 30 frames (1 second at 30fps)
-                    if frame_count % 30 == 0:
-                        logger.info(f"Processed {frame_count} frames")
-                        
-                except asyncio.TimeoutError:
-                    logger.warning("Frame receive timeout")
-                    continue
-                except Exception as e:
-                    logger.error(f"Error receiving frame: {e}")
-                    break
+            # Create window if displaying; headless never touches HighGUI
+            if self.display_window:
+                import cv2
+                cv2.namedWindow(self.window_name, cv2.WINDOW_AUTOSIZE | cv2.WINDOW_KEEPRATIO)
+                cv2.moveWindow(self.window_name, *self.window_position)
+                logger.info(f"Created video window with enhanced controls: {self.window_name}")
+            
+            await self.pipeline.run(track)
                     
         except Exception as e:
             logger.error(f"Error in video track handler: {e}")
         finally:
             logger.info("Video track ended")
-            cv2.destroyAllWindows()
+            if self.display_window:
+                import cv2
+                try:
+                    cv2.destroyWindow(self.window_name)
+                except cv2.error:
+                    pass  # Already closed
+            
+    def _draw_overlay(self, frame, frame_count):
+        """Draw the frame info and key help onto the frame"""
+        import cv2
+        
+        info_text = f"Frame: {frame_count} | Press 'Q' to quit"
+        if self.enable_screenshots:
+            info_text += " | 'S' to screenshot"
             
+        cv2.putText(frame, info_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 
+                   0.7, (0, 255, 0), 2, cv2.LINE_AA)
+        
     def _display_frame_with_controls(self, frame, frame_count):
         """Display frame with interactive controls"""
+        import cv2
+        
         try:
             # Add frame info overlay
-            info_text = f"Frame: {frame_count} | Press 'Q' to quit"
-            if self.enable_screenshots:
-                info_text += " | 'S' to screenshot"
-                
-            cv2.putText(frame, info_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 
-                       0.7, (0, 255, 0), 2, cv2.LINE_AA)
+            self._draw_overlay(frame, frame_count)
             
             # Display frame
-            cv2.imshow("Unity Render Streaming", frame)
+            cv2.imshow(self.window_name, frame)
             
             # Handle key presses (non-blocking)
             key = cv2.waitKey(1) & 0xFF
@@ -137,6 +155,7 @@ class EnhancedVideoReceiver(VideoReceiver):
             if key == ord('q') or key == ord('Q') or key == 27:  # Q or ESC
                 logger.info("Quit key pressed")
                 self.quit_requested = True
+                self.pipeline.stop()
                 
             elif key == ord('s') or key == ord('S'):  # S for screenshot
                 if self.enable_screenshots:
@@ -149,9 +168,11 @@ class EnhancedVideoReceiver(VideoReceiver):
             
     def _save_screenshot(self, frame, frame_count):
         """Save screenshot in specified format(s)"""
+        import cv2
+        
         try:
             timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            base_filename = f"unity_frame_{timestamp}"
+            base_filename = f"unity_frame_{timestamp}" + (f"_track{self.track + 1}" if self.track else "")
             
             saved_files = []
             
@@ -185,29 +206,145 @@ class UnityStreamingClient:
     def __init__(self, server_url: str = "ws://localhost/", 
                  enable_screenshots: bool = False,
                  screenshot_dir: str = "screenshots",
-                 screenshot_format: str = "jpg"):
+                 screenshot_format: str = "jpg",
+                 video_codec: str = "h264",
+                 h264_profile: Optional[str] = None,
+                 max_bitrate_kbps: Optional[int] = None,
+                 max_framerate: Optional[float] = None,
+                 max_resolution: Optional[str] = None,
+                 adaptive_bitrate: bool = False,
+                 capture_file: Optional[str] = None,
+                 archive_file: Optional[str] = None,
+                 archive_encoding: str = "raw",
+                 archive_capacity_gb: float = 8.0,
+                 archive_preallocate: bool = False,
+                 headless: bool = False,
+                 shm_ring: Optional[str] = None,
+                 rebroadcast: Optional[str] = None,
+                 rebroadcast_ws_port: Optional[int] = None,
+                 relay: Optional[str] = None,
+                 relay_only: bool = False,
+                 keyframe_request: Optional[str] = "pli",
+                 playout: str = DEFAULT,
+                 jitter_buffer_packets: Optional[int] = None,
+                 detect_duplicates: bool = False,
+                 video_tracks: int = 1,
+                 audio_tracks: int = 0,
+                 audio_file: Optional[str] = None,
+                 decoder_threads: Optional[int] = None,
+                 decoder_thread_type: str = "slice",
+                 watchdog_threshold: Optional[float] = None,
+                 profile_file: Optional[str] = None,
+                 profile_frames: int = 300):
+        if video_tracks < 1 or audio_tracks < 0:
+            raise ValueError(f"Invalid track counts: {video_tracks} video (at least 1), {audio_tracks} audio")
         self.server_url = server_url
+        self.headless = headless
         self.enable_screenshots = enable_screenshots
         self.screenshot_dir = screenshot_dir
         self.screenshot_format = screenshot_format
+        self.video_codec = video_codec.lower()
+        self.h264_profile = h264_profile
+        
+        # Receive-side buffering: DEFAULT (aiortc) or LOW_LATENCY
+        self.playout = playout
+        self.jitter_buffer_packets = jitter_buffer_packets
+        
+        # Static scenes: repeated pictures skip conversion and the frame handler
+        self.detect_duplicates = detect_duplicates
+        
+        # Several cameras per connection: each video track gets its own
+        # transceiver, pipeline, metrics and sinks; track 0 drives step()
+        self.video_tracks = video_tracks
+        self.audio_tracks = audio_tracks
+        self.audio_file = audio_file
+        
+        # Receiver-driven stream limits
+        max_width, max_height = (StreamConstraints.parse_resolution(max_resolution)
+                                 if max_resolution else (None, None))
+        self.constraints = StreamConstraints(max_bitrate_kbps, max_framerate, max_width, max_height)
+        self.bitrate_controller = BitrateController(max_bitrate_kbps, adaptive=adaptive_bitrate)
+        
+        # Decoder threading for high-resolution streams (None keeps FFmpeg's defaults)
+        self.decoder_config = None
+        if decoder_threads is not None or decoder_thread_type != "slice":
+            self.decoder_config = DecoderConfig(decoder_threads or 0, decoder_thread_type)
+        
+        # Loop lag and stack samples of whatever stalls the loop (opt-in)
+        self.loop_watchdog = LoopWatchdog(watchdog_threshold) if watchdog_threshold else None
+        
+        # Sampling profile of setup and the first profile_frames frames (opt-in)
+        self.profiler = None
+        if profile_file:
+            self.profiler = StageProfiler(profile_file, profile_frames)
+            self.profiler.frame_counter = lambda: self.video_receiver.frame_count if self.video_receiver else 0
+            self.profiler.stats_source = lambda: {track: self.pipeline_stats(track)
+                                                  for track in range(len(self.video_receivers))}
+        
+        # Encoded-frame forwarding to downstream WebRTC peers (opt-in); with
+        # relay_only the tracks are not decoded here at all
+        self.relay_server = None
+        self.relay_only = relay_only and bool(relay)
+        if relay:
+            from src.relay import RelayServer
+            host, port = parse_address(relay)
+            self.relay_server = RelayServer(host, port, video_tracks, video_codec)
+        
+        # PLI/FIR keyframe requests after decode errors, freezes and timeouts (per track)
+        self.keyframe_request = keyframe_request
+        
+        # Session capture for offline replay
+        self.session_recorder = None
+        if capture_file:
+            from src.session_capture import SessionRecorder
+            self.session_recorder = SessionRecorder(capture_file)
+        
+        # Memory-mapped frame archives for dataset generation, one per video track
+        self.frame_archives: List[FrameArchive] = []
+        if archive_file:
+            self.frame_archives = [FrameArchive(track_output_path(archive_file, track), "w",
+                                                encoding=archive_encoding,
+                                                capacity=int(archive_capacity_gb * (1 << 30)),
+                                                preallocate=archive_preallocate)
+                                   for track in range(video_tracks)]
         
         self.signaling = None
+        self.peer = None
         self.pc = None
         self.video_receiver = None
+        self.video_receivers: List[EnhancedVideoReceiver] = []
+        self.audio_receivers: List[AudioReceiver] = []
+        self.input_channel = None
+        self.input_sender: Optional[InputRemotingSender] = None
+        self.input_ready = asyncio.Event()
+        self.frame_waiters = FrameWaiters()
+        self.frame_hubs = [FrameHub() for _ in range(video_tracks)]
+        self.frame_hub = self.frame_hubs[0]
+        # (track, sink) pairs, re-added when receivers are created
+        self.sinks: list = []
+        # Kept here so handlers set before run() reach the receiver it creates
+        self.frame_handler: Optional[Callable[[np.ndarray, int], np.ndarray]] = None
+        self.screenshot_handler: Optional[Callable[[str], None]] = None
+        if shm_ring:
+            # Other processes read frames with SharedMemoryRingReader(shm_ring);
+            # extra tracks use shm_ring_track2, shm_ring_track3, ...
+            for track in range(video_tracks):
+                self.add_sink(SharedMemoryRingSink(track_output_path(shm_ring, track), worker="thread"),
+                              track=track)
+        if rebroadcast or rebroadcast_ws_port:
+            # Local viewers share this session instead of opening their own;
+            # track N is served on the given ports + N
+            host, port = parse_address(rebroadcast) if rebroadcast else ("127.0.0.1", None)
+            for track in range(video_tracks):
+                self.add_sink(RebroadcastSink(host, port + track if port else None,
+                                              rebroadcast_ws_port + track if rebroadcast_ws_port else None),
+                              track=track)
         self.connection_id = str(uuid.uuid4())
         self.shutdown_event = asyncio.Event()
         
         # Setup signal handlers for graceful shutdown
         self._setup_signal_handlers()
         
-        # WebRTC configuration
-        self.pc = RTCPeerConnection(configuration=aiortc.RTCConfiguration(
-            iceServers=[
-                aiortc.RTCIceServer(urls=["stun:stun.l.google.com:19302"]),
-                aiortc.RTCIceServer(urls=["stun:stun1.l.google.com:19302"]),
-            ]
-        ))
-        
     def _setup_signal_handlers(self):
         """Setup signal handlers for Ctrl+C"""
         def signal_handler(signum, frame):
@@ -220,27 +357,214 @@ class UnityStreamingClient:
             
     def set_frame_handler(self, handler: Callable[[np.ndarray, int], np.ndarray]):
         """Set custom frame processing handler"""
-        if self.video_receiver:
-            self.video_receiver.set_frame_handler(handler)
+        self.frame_handler = handler
+        for video_receiver in self.video_receivers:
+            video_receiver.set_frame_handler(handler)
             
     def set_screenshot_handler(self, handler: Callable[[str], None]):
         """Set custom screenshot handler"""
-        if self.video_receiver:
-            self.video_receiver.set_screenshot_handler(handler)
+        self.screenshot_handler = handler
+        for video_receiver in self.video_receivers:
+            video_receiver.set_screenshot_handler(handler)
+        
+    def frames(self, maxsize: int = 1, policy: str = DROP_OLDEST, track: int = 0):
+        """
+        Iterate over received frames: async for frame in client.frames()
+        
+        Subscribers are independent, each with its own bounded queue and drop
+        policy, and can be created before run().
+        
+        Args:
+            maxsize: Frames buffered while the consumer is busy
+            policy: DROP_OLDEST (keep newest) or DROP_NEWEST (keep backlog)
+            track: Video track to follow (0 = first camera)
+        """
+        return self.frame_hubs[track].frames(maxsize, policy)
+        
+    def add_frame_handler(self, handler, maxsize: int = 1, policy: str = DROP_OLDEST, track: int = 0):
+        """
+        Run a sync or async frame handler without blocking reception
+        
+        Returns:
+            asyncio.Task: Consumer task; cancel it to remove the handler
+        """
+        return self.frame_hubs[track].add_handler(handler, maxsize, policy)
+        
+    def add_sink(self, sink, track: int = 0, **options) -> FrameSink:
+        """
+        Add a frame sink with its own rate, format and worker
+        
+        Example: client.add_sink(detect, max_rate=2, frame_format="rgb24", worker="thread")
+        
+        Args:
+            sink: FrameSink, or a callable taking (frame, frame_count)
+            track: Video track whose frames the sink receives
+            **options: FrameSink options for callables (max_rate, frame_format, worker, writes)
+            
+        Returns:
+            FrameSink: The added sink
+        """
+        if not isinstance(sink, FrameSink):
+            sink = CallbackSink(sink, **options)
+        self.sinks.append((track, sink))
+        if self.video_receivers:
+            self.video_receivers[track].pipeline.add_sink(sink)
+        return sink
+        
+    def submit_step(self, action: Optional[Callable[[InputRemotingSender], None]] = None,
+                    settle_frames: int = 1, settle_time: float = 0.0,
+                    predicate: Optional[Callable[[np.ndarray], bool]] = None) -> asyncio.Future:
+        """
+        Send an action now and get a future for the frame that reflects it
+        
+        Several steps can be outstanding at once; each resolves independently
+        from the frame stream. Requires the input channel to be open when an
+        action is given (see step(), which waits for it).
+        
+        Args:
+            action: Callable that queues input on the InputRemotingSender
+            settle_frames: Frame to return among those counted (1 = first)
+            settle_time: Seconds after sending before frames count
+            predicate: Optional check a frame must pass to resolve the step
+            
+        Returns:
+            asyncio.Future: Resolves to a StepResult
+        """
+        if action is not None:
+            if not self.input_ready.is_set():
+                raise RuntimeError("Input channel is not open")
+            action(self.input_sender)
+            self.input_sender.flush()
+        return self.frame_waiters.wait(time.monotonic(), settle_frames, settle_time, predicate)
+        
+    async def step(self, action: Optional[Callable[[InputRemotingSender], None]] = None,
+                   settle_frames: int = 1, settle_time: float = 0.0,
+                   predicate: Optional[Callable[[np.ndarray], bool]] = None,
+                   timeout: Optional[float] = 5.0) -> StepResult:
+        """
+        Send an action and wait for the first frame received after it settled
+        
+        Args:
+            action: Callable that queues input, e.g. lambda i: i.mouse_click(640, 360)
+            settle_frames: Frame to return among those counted (1 = first)
+            settle_time: Seconds after sending before frames count
+            predicate: Optional check a frame must pass to resolve the step
+            timeout: Seconds to wait for the input channel and the frame
+            
+        Returns:
+            StepResult: Frame with action-to-frame latency
+        """
+        if action is not None and not self.input_ready.is_set():
+            await asyncio.wait_for(self.input_ready.wait(), timeout)
+        future = self.submit_step(action, settle_frames, settle_time, predicate)
+        return await asyncio.wait_for(future, timeout)
+        
+    def pipeline_stats(self, track: int = 0) -> Dict[str, float]:
+        """Frame counters and per-stage timings of a track's video pipeline, and loop lag"""
+        stats = self.video_receivers[track].stats() if track < len(self.video_receivers) else {}
+        if self.loop_watchdog:
+            stats["loop"] = self.loop_watchdog.stats()
+        if self.relay_server and track < len(self.relay_server.relays):
+            stats["relay"] = self.relay_server.stats(track)
+        return stats
+        
+    def _mark(self, milestone: str):
+        """Record a connection setup milestone in the profile"""
+        if self.profiler:
+            self.profiler.mark(milestone)
+        
+    def _create_video_receiver(self, track: int = 0) -> EnhancedVideoReceiver:
+        """Create the video receiver for a track with the client's settings"""
+        # Closed-loop steps wait on the first track. With several tracks each
+        # pipeline converts frames on its own thread, so they run in parallel
+        video_receiver = EnhancedVideoReceiver(
+            enable_screenshots=self.enable_screenshots,
+            screenshot_dir=self.screenshot_dir, 
+            screenshot_format=self.screenshot_format,
+            max_framerate=self.constraints.max_framerate,
+            bitrate_controller=self.bitrate_controller,
+            frame_waiters=self.frame_waiters if track == 0 else None,
+            display=not self.headless,
+            playout=self.playout,
+            detect_duplicates=self.detect_duplicates,
+            track=track,
+            convert_in_thread=self.video_tracks > 1
+        )
+        video_receiver.frame_hub = self.frame_hubs[track]
+        if self.keyframe_request:
+            video_receiver.pipeline.recovery = KeyframeRecovery(self.keyframe_request)
+        if self.frame_handler:
+            video_receiver.set_frame_handler(self.frame_handler)
+        if self.screenshot_handler:
+            video_receiver.set_screenshot_handler(self.screenshot_handler)
+        for sink_track, sink in self.sinks:
+            if sink_track == track:
+                video_receiver.pipeline.add_sink(sink)
+        return video_receiver
+        
+    def _create_receivers(self):
+        """Create one receiver per negotiated video and audio track"""
+        self.video_receivers = [self._create_video_receiver(track) for track in range(self.video_tracks)]
+        self.video_receiver = self.video_receivers[0]
+        self.audio_receivers = [AudioReceiver(save_audio=bool(self.audio_file),
+                                              output_file=track_output_path(self.audio_file or "audio.wav", track))
+                                for track in range(self.audio_tracks)]
+        # Live sessions and replays both fill the archives
+        for track, frame_archive in enumerate(self.frame_archives):
+            self.add_frame_handler(frame_archive.append_frame, maxsize=8, track=track)
+        
+    async def replay(self, capture_file: str, speed: Optional[float] = 1.0):
+        """
+        Feed a capture through the video pipeline without any network
+        
+        Args:
+            capture_file: File written with --capture
+            speed: Playback rate relative to the capture; None or 0 for max speed
+        """
+        from src.session_capture import ReplayTrack
+        
+        if self.loop_watchdog:
+            self.loop_watchdog.start()
+        if self.profiler:
+            self.profiler.start()
+        self._create_receivers()
+        video_tracks = [ReplayTrack(capture_file, "video", speed, playout=self.playout, track=track,
+                                    decoder_config=self.decoder_config)
+                        for track in range(self.video_tracks)]
+        audio_tracks = [ReplayTrack(capture_file, "audio", speed, playout=self.playout, track=track)
+                        for track in range(self.audio_tracks)]
+        logger.info(f"⏯️ Replaying {capture_file} at {f'{speed}x' if speed else 'max'} speed")
+        
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(
+                *(receiver.handle_track(track) for receiver, track in zip(self.video_receivers, video_tracks)),
+                *(receiver.handle_track(track) for receiver, track in zip(self.audio_receivers, audio_tracks)))
+            elapsed = time.perf_counter() - start
+            frames_decoded = sum(track.frames_decoded for track in video_tracks)
+            logger.info(f"📊 Replayed {frames_decoded} frames in {elapsed:.2f}s "
+                        f"({frames_decoded / max(elapsed, 1e-6):.1f} fps)")
+        finally:
+            # Stops sink workers and releases shared memory
+            await self.cleanup()
         
     async def run(self):
         """Start the Unity streaming client"""
+        from src.signaling import WebSocketSignaling
+        
         try:
+            if self.loop_watchdog:
+                self.loop_watchdog.start()
+            if self.profiler:
+                self.profiler.start()
+            if self.relay_server:
+                await self.relay_server.start()
+                
             # Initialize components
             self.signaling = WebSocketSignaling(self.server_url)
-            self.video_receiver = EnhancedVideoReceiver(
-                enable_screenshots=self.enable_screenshots,
-                screenshot_dir=self.screenshot_dir, 
-                screenshot_format=self.screenshot_format
-            )
-            
-            # Set up WebRTC event handlers
-            self._setup_webrtc_handlers()
+            self._create_receivers()
+            if self.session_recorder:
+                self.session_recorder.attach_signaling(self.signaling)
             
             # Set up signaling callbacks
             self.signaling.on_offer = self._on_signaling_offer
@@ -250,17 +574,23 @@ class UnityStreamingClient:
             # Connect to signaling server
             logger.info("🔌 Connecting to Unity server...")
             await self.signaling.start()
+            self._mark("signaling_connected")
             
             # Create connection ID
             self.connection_id = await self.signaling.create_connection(self.connection_id)
+            self._mark("connection_created")
             logger.info(f"🆔 Created connection: {self.connection_id}")
             
+            # Same peer connection handling as UnityRenderStreamingClient
+            self._create_peer()
+            
             # Browser-like negotiation: wait a bit then create data channel and offer
             await asyncio.sleep(0.1)
             await self._create_data_channel_and_offer()
             
             # Wait for shutdown
-            logger.info("🎮 Unity client started. Press Q to quit or Ctrl+C to exit.")
+            logger.info("🎮 Unity client started. "
+                        + ("Press Ctrl+C to exit." if self.headless else "Press Q to quit or Ctrl+C to exit."))
             await self.shutdown_event.wait()
             
         except KeyboardInterrupt:
@@ -271,231 +601,182 @@ class UnityStreamingClient:
         finally:
             await self.cleanup()
             
-    def _setup_webrtc_handlers(self):
-        """Set up WebRTC peer connection event handlers"""
-        
-        @self.pc.on("icecandidate")
-        def on_icecandidate(candidate):
-            if candidate:
-                asyncio.create_task(self._send_ice_candidate(candidate))
-        
-        @self.pc.on("connectionstatechange")
-        async def on_connectionstatechange():
-            state = self.pc.connectionState
-            logger.info(f"🔗 WebRTC connection state: {state}")
-            
-            if state == "connected":
-                logger.info("🎉 WebRTC connection established with H.264 preference!")
-            elif state in ["failed", "closed"]:
-                logger.warning(f"❌ Connection {state}, shutting down...")
-                self.shutdown_event.set()
-        
-        @self.pc.on("track")
-        def on_track(track):
-            logger.info(f"📺 Received {track.kind} track")
-            if track.kind == "video":
-                logger.info("🎬 Starting H.264 video playback...")
-                asyncio.create_task(self.video_receiver.handle_track(track))
-                
+    def _create_peer(self):
+        """Create the WebRTC peer and hook up its events"""
+        from src.webrtc_peer import WebRTCPeer
+        
+        sdp_filter = None
+        if not self.constraints.is_empty:
+            sdp_filter = lambda sdp: apply_sdp_constraints(sdp, self.constraints)
+        self.peer = WebRTCPeer(self.signaling, connection_id=self.connection_id,
+                               video_codec=self.video_codec, h264_profile=self.h264_profile,
+                               sdp_filter=sdp_filter)
+        self.pc = self.peer.pc
+        self.peer.on_track = self._on_track
+        self.peer.on_connection_state_change = self._on_connection_state_change
+        
         # Monitor for quit requests from video receiver
         async def monitor_quit():
             while not self.shutdown_event.is_set():
-                if self.video_receiver and self.video_receiver.quit_requested:
+                if any(video_receiver.quit_requested for video_receiver in self.video_receivers):
                     logger.info("Quit requested from video display")
                     self.shutdown_event.set()
                     break
                 await asyncio.sleep(0.1)
                 
         asyncio.create_task(monitor_quit())
+        
+    def _on_connection_state_change(self, state: str):
+        """Handle WebRTC connection state changes"""
+        logger.info(f"🔗 WebRTC connection state: {state}")
+        
+        if state == "connected":
+            self._mark("connected")
+            logger.info(f"🎉 WebRTC connection established with {self.video_codec.upper()} preference!")
+        elif state in ["failed", "closed"]:
+            logger.warning(f"❌ Connection {state}, shutting down...")
+            self.shutdown_event.set()
+            
+    def _on_track(self, track):
+        """Handle incoming media track"""
+        from src.receiver_tap import find_receiver, tap_receiver, track_index
+        
+        index = track_index(self.pc, track)
+        receiver = find_receiver(self.pc, track)
+        if receiver and (self.playout != DEFAULT or self.jitter_buffer_packets):
+            capacity = self.jitter_buffer_packets if track.kind == "video" else None
+            tap_receiver(receiver).replace_jitter_buffer(
+                create_jitter_buffer(track.kind, self.playout, capacity))
+        if receiver and self.session_recorder:
+            self.session_recorder.attach_receiver(tap_receiver(receiver), index)
+            
+        if track.kind == "audio":
+            if index < len(self.audio_receivers):
+                logger.info(f"🔊 Receiving audio track {index + 1}")
+                asyncio.create_task(self.audio_receivers[index].handle_track(track))
+            return
+        if track.kind != "video" or index >= len(self.video_receivers):
+            return
+        video_receiver = self.video_receivers[index]
+        if receiver and self.relay_server:
+            self.relay_server.relays[index].attach(tap_receiver(receiver), decode=not self.relay_only)
+            if self.relay_only:
+                # Nothing reaches the decoder, so there is no pipeline to run or recover
+                logger.info(f"🔁 Forwarding track {index + 1} without decoding it")
+                return
+        if receiver and self.decoder_config:
+            tap_receiver(receiver).configure_decoder(self.decoder_config)
+            logger.info(f"🧵 Decoding with {self.decoder_config.effective_threads} "
+                        f"{self.decoder_config.thread_type} threads")
+        if receiver and video_receiver.pipeline.recovery:
+            video_receiver.pipeline.recovery.attach(tap_receiver(receiver))
+        if self.bitrate_controller.enabled and receiver:
+            self.bitrate_controller.attach(tap_receiver(receiver))
+            logger.info(f"📉 Requesting at most {self.bitrate_controller.target_bitrate_kbps} kbps via REMB")
+        logger.info("🎬 Starting video playback..." if self.video_tracks == 1
+                    else f"🎬 Starting video playback of track {index + 1}/{self.video_tracks}...")
+        asyncio.create_task(video_receiver.handle_track(track))
                 
     async def _create_data_channel_and_offer(self):
         """Create data channel and send offer (browser behavior)"""
+        from src.session_capture import OUTGOING
+        
         try:
             # Create data channel (this triggers Unity)
-            data_channel = self.pc.createDataChannel("input")
-            logger.info("📡 Created data channel: input")
-            
-            # Add video transceiver for receiving
-            video_transceiver = self.pc.addTransceiver("video", direction="recvonly")
-            logger.info("📹 Added video transceiver (recvonly)")
-            
-            # Create offer
-            offer = await self.pc.createOffer()
-            
-            # Modify offer to prefer H.264
-            modified_offer = self._modify_offer_for_h264(offer)
-            
-            await self.pc.setLocalDescription(modified_offer)
-            logger.info("📝 Set local description (H.264-preferred offer)")
-            
-            # Send offer
-            await self.signaling.send_offer(self.connection_id, modified_offer.sdp)
-            logger.info("📤 Sent H.264-preferred offer to Unity")
+            self.input_channel = self.peer.create_data_channel("input")
+            self.input_sender = InputRemotingSender(self.input_channel)
+            if self.session_recorder:
+                self.input_sender.on_send = lambda message: self.session_recorder.record_data(
+                    OUTGOING, "input", message)
+            
+            @self.input_channel.on("open")
+            def on_input_open():
+                # Unity ignores events for devices it hasn't been told about
+                self.input_sender.add_devices()
+                self.input_ready.set()
+                logger.info("🕹️ Input channel open, remote devices added")
+            
+            # Add video transceivers for receiving (one per camera), preferred codec first
+            for _ in range(self.video_tracks):
+                self.peer.add_transceiver("video", direction="recvonly")
+            for _ in range(self.audio_tracks):
+                self.peer.add_transceiver("audio", direction="recvonly")
+            
+            # Create, reorder and send the offer
+            await self.peer.create_offer()
+            self._mark("offer_sent")
+            logger.info(f"📤 Sent {self.video_codec.upper()}-preferred offer to Unity")
             
         except Exception as e:
             logger.error(f"Error creating offer: {e}")
             raise
             
-    def _modify_offer_for_h264(self, offer: RTCSessionDescription) -> RTCSessionDescription:
-        """Modify SDP offer to prefer H.264 over VP8"""
-        lines = offer.sdp.split('\r\n')
-        modified_lines = []
-        
-        logger.info("🔧 Modifying SDP to prefer H.264...")
-        
-        for line in lines:
-            if line.startswith('m=video'):
-                # Reorder codecs in video media line to prefer H.264
-                parts = line.split(' ')
-                if len(parts) > 3:
-                    codecs = parts[3:]
-                    
-                    # Separate H.264 and other codecs
-                    h264_codecs = []
-                    rtx_codecs = []
-                    other_codecs = []
-                    
-                    for codec in codecs:
-                        # Common H.264 payload types: 123, 122, 121, 120
-                        if codec in ['123', '122', '121', '120']:
-                            h264_codecs.append(codec)
-                        # RTX (retransmission) for H.264: 115, 114, 111, 109
-                        elif codec in ['115', '114', '111', '109']:
-                            rtx_codecs.append(codec)
-                        else:
-                            other_codecs.append(codec)
-                    
-                    # Reorder: H.264 first, then RTX, then others (VP8, etc.)
-                    reordered_codecs = h264_codecs + rtx_codecs + other_codecs
-                    modified_line = ' '.join(parts[:3] + reordered_codecs)
-                    modified_lines.append(modified_line)
-                    
-                    logger.info(f"Original codec order: {codecs}")
-                    logger.info(f"H.264-preferred order: {reordered_codecs}")
-                else:
-                    modified_lines.append(line)
-            else:
-                modified_lines.append(line)
-        
-        modified_sdp = '\r\n'.join(modified_lines)
-        return RTCSessionDescription(sdp=modified_sdp, type=offer.type)
-        
     async def _on_signaling_offer(self, offer_data: Dict[str, Any]):
         """Handle offer from Unity - respond with answer"""
+        if not self.peer or not offer_data.get('sdp'):
+            logger.error("No SDP in offer" if self.peer else "Offer received before the peer was created")
+            return
+        logger.info("📨 Received offer from Unity - setting as remote description and sending answer")
         try:
-            sdp = offer_data.get('sdp')
-            if not sdp:
-                logger.error("No SDP in offer")
-                return
-                
-            logger.info("📨 Received offer from Unity - setting as remote description and sending answer")
-            
-            # Set remote description
-            offer = RTCSessionDescription(sdp=sdp, type="offer")
-            await self.pc.setRemoteDescription(offer)
-            logger.info("✅ Remote description set from Unity offer")
-            
-            # Create answer
-            answer = await self.pc.createAnswer()
-            await self.pc.setLocalDescription(answer)
-            logger.info("📝 Created and set local answer")
-            
-            # Send answer
-            await self.signaling.send_answer(self.connection_id, answer.sdp)
-            logger.info("📤 Sent answer to Unity")
-            
+            await self.peer.handle_offer(offer_data['sdp'])
         except Exception as e:
             logger.error(f"Error handling Unity offer: {e}")
             
     async def _on_signaling_answer(self, answer_data: Dict[str, Any]):
         """Handle answer from signaling"""
+        if not self.peer or not answer_data.get('sdp'):
+            logger.error("No SDP in answer" if self.peer else "Answer received before the peer was created")
+            return
+        logger.info("📨 Received answer from signaling")
         try:
-            sdp = answer_data.get('sdp')
-            if not sdp:
-                logger.error("No SDP in answer")
-                return
-                
-            logger.info("📨 Received answer from signaling")
-            answer = RTCSessionDescription(sdp=sdp, type="answer")
-            await self.pc.setRemoteDescription(answer)
-            logger.info("✅ Remote description set from answer")
-            
+            await self.peer.handle_answer(answer_data['sdp'])
         except Exception as e:
             logger.error(f"Error handling answer: {e}")
             
     async def _on_signaling_candidate(self, candidate_data: Dict[str, Any]):
         """Handle ICE candidate from signaling"""
-        try:
-            # Handle ICE candidate properly
-            if isinstance(candidate_data, dict) and 'candidate' in candidate_data:
-                candidate_str = candidate_data['candidate']
-                sdp_m_line_index = candidate_data.get('sdpMLineIndex', 0)
-                
-                # Create ICE candidate
-                ice_candidate = aiortc.RTCIceCandidate(
-                    component=1,
-                    foundation="1",
-                    ip="0.0.0.0",  # Will be parsed from candidate string
-                    port=9,
-                    priority=2113667326,
-                    protocol="udp",
-                    type="host",
-                    sdpMLineIndex=sdp_m_line_index
-                )
-                
-                # Parse the candidate string to extract actual values
-                if candidate_str.startswith("candidate:"):
-                    parts = candidate_str.split()
-                    if len(parts) >= 8:
-                        ice_candidate.foundation = parts[1]
-                        ice_candidate.component = int(parts[2])
-                        ice_candidate.protocol = parts[3]
-                        ice_candidate.priority = int(parts[4])
-                        ice_candidate.ip = parts[5]
-                        ice_candidate.port = int(parts[6])
-                        ice_candidate.type = parts[8]
-                
-                await self.pc.addIceCandidate(ice_candidate)
-                logger.debug(f"Added ICE candidate: {candidate_str}")
-                
-        except Exception as e:
-            logger.debug(f"Error handling ICE candidate: {e}")
-            # Don't fail on ICE candidate errors, just log them
-            
-    async def _send_ice_candidate(self, candidate):
-        """Send ICE candidate to signaling server"""
-        try:
-            candidate_data = {
-                "candidate": f"candidate:{candidate.foundation} {candidate.component} {candidate.protocol} {candidate.priority} {candidate.ip} {candidate.port} typ {candidate.type}",
-                "sdpMLineIndex": candidate.sdpMLineIndex,
-                "sdpMid": None
-            }
-            
-            await self.signaling.send_candidate(self.connection_id, candidate_data)
-            logger.debug(f"Sent ICE candidate: {candidate_data['candidate']}")
-            
-        except Exception as e:
-            logger.error(f"Error sending ICE candidate: {e}")
+        if self.peer:
+            await self.peer.handle_ice_candidate(candidate_data)
             
     async def cleanup(self):
         """Cleanup resources"""
         logger.info("🧹 Cleaning up resources...")
         
         try:
-            # Set quit flag for video receiver
-            if self.video_receiver:
-                self.video_receiver.quit_requested = True
+            # Set quit flag for video receivers
+            for video_receiver in self.video_receivers:
+                video_receiver.quit_requested = True
+                if video_receiver.pipeline.recovery:
+                    video_receiver.pipeline.recovery.stop()
+                
+            self.frame_waiters.cancel_all()
+            for frame_hub in self.frame_hubs:
+                frame_hub.close()
+            self.bitrate_controller.stop()
+            if self.relay_server:
+                await self.relay_server.stop()
+            if self.loop_watchdog:
+                self.loop_watchdog.stop()
+            if self.profiler:
+                # Writes a partial profile if the window did not complete
+                self.profiler.stop()
                 
             # Close peer connection
-            if self.pc:
-                await self.pc.close()
+            if self.peer:
+                await self.peer.close()
                 
             # Close signaling - use stop() method instead of close()
             if self.signaling:
                 await self.signaling.stop()
                 
+            if self.session_recorder:
+                await asyncio.get_running_loop().run_in_executor(None, self.session_recorder.close)
+            for frame_archive in self.frame_archives:
+                frame_archive.close()
+                
             # Close any OpenCV windows
-            cv2.destroyAllWindows()
+            for video_receiver in self.video_receivers:
+                video_receiver.cleanup()
             
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
@@ -518,6 +799,16 @@ Examples:
   python unity_client.py --server ws://192.168.1.100:8080  # Custom server
   python unity_client.py --screenshots --verbose           # With screenshots and debug
   python unity_client.py --screenshots --screenshot-format png  # PNG screenshots
+  python unity_client.py --codec h264 --h264-profile constrained-baseline  # Cheapest H.264 decode
+  python unity_client.py --max-bitrate 1500 --max-framerate 5 --adaptive-bitrate  # Lighter stream
+  python unity_client.py --capture session.urs                 # Capture for offline replay
+  python unity_client.py --replay session.urs --replay-speed 0  # Max-speed pipeline benchmark
+  python unity_client.py --headless --archive frames.frm      # Container/server capture, no window
+  python unity_client.py --video-tracks 3 --headless --archive cams.frm  # cams.frm, cams_track2.frm, ...
+  python unity_client.py --headless --profile run.folded      # Per-stage profile of 300 frames
+  python unity_client.py --headless --rebroadcast 8080        # Viewers open http://localhost:8080/
+  python unity_client.py --headless --relay 0.0.0.0:8770 --relay-only  # WebRTC fan-out node
+  python unity_client.py --daemon --host sim1=ws://10.0.0.5 --host sim2=ws://10.0.0.6  # Warm sessions for jobs
         """)
     
     parser.add_argument("--server", default="ws://localhost/", 
@@ -531,10 +822,95 @@ Examples:
     parser.add_argument("--screenshot-format", default="jpg", 
                        choices=["jpg", "jpeg", "png", "both"],
                        help="Screenshot format: jpg, png, or both (default: jpg)")
+    parser.add_argument("--codec", default="h264", choices=SUPPORTED_CODECS,
+                       help="Preferred video codec (default: h264)")
+    parser.add_argument("--h264-profile", default=None, choices=H264_PROFILES,
+                       help="Preferred H.264 profile (default: any)")
+    parser.add_argument("--max-bitrate", type=int, default=None, metavar="KBPS",
+                       help="Maximum video bitrate requested from Unity (SDP b=AS/TIAS and REMB)")
+    parser.add_argument("--max-framerate", type=float, default=None, metavar="FPS",
+                       help="Maximum frame rate to request and process")
+    parser.add_argument("--max-resolution", default=None, metavar="WxH",
+                       help="Maximum resolution to request (advisory, e.g. 640x360)")
+    parser.add_argument("--adaptive-bitrate", action="store_true",
+                       help="Lower the requested bitrate when frame processing can't keep up")
+    parser.add_argument("--playout", default=DEFAULT, choices=PLAYOUT_MODES,
+                       help="low-latency releases frames as soon as they are complete and "
+                            "skips stale ones (default: default)")
+    parser.add_argument("--jitter-buffer", type=int, default=None, metavar="PACKETS",
+                       help="Video jitter buffer capacity, a power of two (default: 128)")
+    parser.add_argument("--detect-duplicates", action="store_true",
+                       help="Skip conversion and the frame handler for repeated pictures")
+    parser.add_argument("--decoder-threads", type=int, default=None, metavar="N",
+                       help="Video decoder threads, 0 for one per core (default: FFmpeg's)")
+    parser.add_argument("--decoder-thread-type", default="slice", choices=THREAD_TYPES,
+                       help="slice (no added latency), frame (any stream, +1 frame latency per "
+                            "extra thread) or auto (default: slice)")
+    parser.add_argument("--keyframe-request", default="pli", choices=list(KEYFRAME_METHODS) + ["off"],
+                       help="Keyframe request sent after decode errors, freezes and timeouts (default: pli)")
+    parser.add_argument("--capture", metavar="FILE", default=None,
+                       help="Capture RTP, signaling and input traffic to FILE for replay")
+    parser.add_argument("--replay", metavar="FILE", default=None,
+                       help="Replay a capture through the video pipeline instead of connecting")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                       help="Replay rate relative to the capture, 0 for max speed (default: 1.0)")
+    parser.add_argument("--archive", metavar="FILE", default=None,
+                       help="Append received frames to a memory-mapped frame archive")
+    parser.add_argument("--archive-encoding", default="raw", choices=list(ENCODINGS),
+                       help="Frame encoding in the archive (default: raw, zero-copy reads)")
+    parser.add_argument("--archive-size", type=float, default=8.0, metavar="GB",
+                       help="Maximum space for archived frames; unused space is freed on exit (default: 8 GB)")
+    parser.add_argument("--archive-preallocate", action="store_true",
+                       help="Reserve the whole --archive-size on disk up front instead of a sparse file")
+    parser.add_argument("--shm-ring", metavar="NAME", default=None,
+                       help="Publish frames to a shared-memory ring other processes can read")
+    parser.add_argument("--rebroadcast", metavar="[HOST:]PORT", default=None,
+                       help="Serve the video to local viewers as MJPEG over HTTP (/stream.mjpg)")
+    parser.add_argument("--rebroadcast-ws", type=int, metavar="PORT", default=None,
+                       help="Serve the video to local viewers as JPEG messages on a WebSocket")
+    parser.add_argument("--relay", metavar="[HOST:]PORT", default=None,
+                       help="Forward the video, still encoded, to WebRTC peers signaling on this port")
+    parser.add_argument("--relay-only", action="store_true",
+                       help="With --relay, don't decode or process the video locally")
+    parser.add_argument("--video-tracks", type=int, default=1, metavar="N",
+                       help="Video tracks (cameras) to receive, each with its own pipeline (default: 1)")
+    parser.add_argument("--audio-tracks", type=int, default=0, metavar="N",
+                       help="Audio tracks to receive (default: 0)")
+    parser.add_argument("--audio-file", metavar="FILE", default=None,
+                       help="Save received audio to FILE (.wav or .flac; extra tracks get _trackN)")
+    parser.add_argument("--headless", action="store_true",
+                       help="Run without a video window (no OpenCV HighGUI; works with opencv-python-headless)")
+    parser.add_argument("--watchdog", type=float, default=None, metavar="MS",
+                       help="Measure event loop lag and sample the stack of stalls longer than MS")
+    parser.add_argument("--uvloop", action="store_true",
+                       help="Run on uvloop instead of asyncio's loop (pip install uvloop)")
+    parser.add_argument("--profile", metavar="FILE", default=None,
+                       help="Sample all threads over setup and the first frames; write flamegraph "
+                            "stacks to FILE and a per-stage report to FILE's .json")
+    parser.add_argument("--profile-frames", type=int, default=300, metavar="N",
+                       help="Frames to profile with --profile (default: 300)")
+    parser.add_argument("--daemon", nargs="?", const=DEFAULT_SOCKET, default=None, metavar="SOCKET",
+                       help=f"Keep warm headless sessions and serve jobs on a Unix socket "
+                            f"(default: {DEFAULT_SOCKET})")
+    parser.add_argument("--host", action="append", default=None, metavar="NAME=URL",
+                       help="Unity host kept connected by --daemon, repeatable (default: default=--server)")
     parser.add_argument("--verbose", action="store_true",
                        help="Enable verbose logging")
     
     args = parser.parse_args()
+    if args.daemon:
+        # Per-session outputs would be overwritten by every reconnect, and
+        # per-session servers would fight over their ports across hosts
+        for option in ("capture", "replay", "archive", "shm_ring", "profile", "relay",
+                       "rebroadcast", "rebroadcast_ws"):
+            if getattr(args, option):
+                parser.error(f"--{option.replace('_', '-')} cannot be used with --daemon")
+    hosts = {"default": args.server}
+    if args.host:
+        try:
+            hosts = dict(host.split("=", 1) for host in args.host)
+        except ValueError:
+            parser.error("--host takes NAME=URL")
     
     # Configure logging
     if args.verbose:
@@ -547,24 +923,75 @@ Examples:
         
     # Print startup information
     logger.info("🎮 Unity Render Streaming Python Client")
-    logger.info(f"🔗 Server: {args.server}")
+    logger.info(f"🔗 Server: {', '.join(hosts.values()) if args.daemon else args.server}")
+    logger.info(f"🎞️ Preferred codec: {args.codec.upper()}"
+                + (f" ({args.h264_profile})" if args.codec == "h264" and args.h264_profile else ""))
     if args.screenshots:
         logger.info(f"📸 Screenshots: Enabled ({args.screenshot_format} format)")
         logger.info(f"📁 Screenshot directory: {args.screenshot_dir}")
-    logger.info("⌨️  Controls: Press Q to quit, Ctrl+C to exit")
-    if args.screenshots:
-        logger.info("📷 Press S to save screenshot")
+    if args.daemon:
+        logger.info(f"🛰️ Daemon: jobs attach on {args.daemon}, Ctrl+C to exit")
+    elif args.headless:
+        logger.info("🖥️  Headless: no video window, Ctrl+C to exit")
+    else:
+        logger.info("⌨️  Controls: Press Q to quit, Ctrl+C to exit")
+        if args.screenshots:
+            logger.info("📷 Press S to save screenshot")
         
-    # Create and start client
-    client = UnityStreamingClient(
-        server_url=args.server,
+    options = dict(
         enable_screenshots=args.screenshots,
         screenshot_dir=args.screenshot_dir,
-        screenshot_format=args.screenshot_format
+        screenshot_format=args.screenshot_format,
+        video_codec=args.codec,
+        h264_profile=args.h264_profile,
+        max_bitrate_kbps=args.max_bitrate,
+        max_framerate=args.max_framerate,
+        max_resolution=args.max_resolution,
+        adaptive_bitrate=args.adaptive_bitrate,
+        capture_file=args.capture,
+        archive_file=args.archive,
+        archive_encoding=args.archive_encoding,
+        archive_capacity_gb=args.archive_size,
+        archive_preallocate=args.archive_preallocate,
+        headless=args.headless,
+        shm_ring=args.shm_ring,
+        rebroadcast=args.rebroadcast,
+        rebroadcast_ws_port=args.rebroadcast_ws,
+        relay=args.relay,
+        relay_only=args.relay_only,
+        keyframe_request=None if args.keyframe_request == "off" else args.keyframe_request,
+        playout=args.playout,
+        jitter_buffer_packets=args.jitter_buffer,
+        detect_duplicates=args.detect_duplicates,
+        video_tracks=args.video_tracks,
+        audio_tracks=args.audio_tracks,
+        audio_file=args.audio_file,
+        decoder_threads=args.decoder_threads,
+        decoder_thread_type=args.decoder_thread_type,
+        watchdog_threshold=args.watchdog / 1000 if args.watchdog else None,
+        profile_file=args.profile,
+        profile_frames=args.profile_frames
     )
     
+    if args.daemon:
+        options["headless"] = True
+        daemon = StreamingDaemon(hosts, lambda url: UnityStreamingClient(server_url=url, **options),
+                                 socket_path=args.daemon)
+        try:
+            await daemon.serve()
+        except Exception as e:
+            logger.error(f"❌ Error running daemon: {e}")
+        logger.info("👋 Unity Render Streaming daemon stopped")
+        return
+    
+    # Create and start client
+    client = UnityStreamingClient(server_url=args.server, **options)
+    
     try:
-        await client.run()
+        if args.replay:
+            await client.replay(args.replay, args.replay_speed)
+        else:
+            await client.run()
     except KeyboardInterrupt:
         logger.info("🛑 Interrupted by user")
     except Exception as e:
@@ -574,4 +1001,7 @@ Examples:
 
 
 if __name__ == "__main__":
+    # The loop policy has to be in place before asyncio.run creates the loop
+    if "--uvloop" in sys.argv[1:]:
+        install_uvloop()
     asyncio.run(main())
\ No newline at end of file